@@ -5,7 +5,11 @@ from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 from contextlib import asynccontextmanager
 
+from .alerts import alerts
 from .bilibili import init_client, close_client
+from .executor import adb, db_executor
+from .hub import hub
+from .ingest import ingest
 from .scheduler import start_scheduler, shutdown_scheduler
 from .store import close_db
 from .routes import router
@@ -16,11 +20,19 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """应用生命周期管理：启动时初始化资源，关闭时清理"""
+    db_executor.start()    # 启动数据库读写线程
+    await adb.migrate_all()  # 迁移旧格式数据
     init_client()          # 初始化共享 HTTP 客户端
-    start_scheduler()      # 启动定时采集
+    ingest.start()         # 启动写入缓冲后台刷盘
+    alerts.start()         # 启动告警 webhook 推送（已配置时）
+    await start_scheduler()  # 启动定时采集
     yield
-    shutdown_scheduler()   # 停止定时采集
+    hub.close()            # 结束所有实时推送连接
+    await shutdown_scheduler()  # 停止定时采集
+    await ingest.stop()    # 写入缓冲中剩余的数据
+    await alerts.stop()    # 停止告警推送
     await close_client()   # 关闭共享 HTTP 客户端
+    db_executor.shutdown() # 等待数据库任务完成
     close_db()             # 关闭 SQLite 连接
 
 
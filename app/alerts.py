@@ -0,0 +1,361 @@
+"""告警规则 - 采集到新数据时增量评估，触发后写日志并可推送到 webhook
+
+两类规则（阈值均为“达到”，即 ≥）：
+
+- 累计值：指标达到阈值，如“点赞达到 100 万”（window 为 0）
+- 窗口增量：指标在最近一段时间内的增量达到阈值，如“10 分钟内播放增加 1 万”
+
+规则可以只针对一个视频，也可以作用于所有视频。评估不访问数据库，单条数据的代价与规则总数无关：
+
+- 每个视频的每个 (指标, 窗口) 在内存中维护一个水位：累计值规则为最新值，窗口增量规则为
+  当前值减去窗口内最早的样本（窗口内样本按窗口长度的 1/RESOLUTION 抽稀，最多约 RESOLUTION 个）
+- 同一 (视频范围, 指标, 窗口) 的规则按阈值排序；新数据使水位从 lo 升到 hi 时，
+  二分查找出阈值落在 (lo, hi] 的规则即为触发的规则
+- 每个水位记住它所在的阈值区间（相邻两个阈值之间）；新水位仍在区间内时不可能越过任何阈值，
+  不查找规则。只有离开区间（或规则有增删）时才二分查找并更新区间，
+  代价约为 O(涉及的 (指标, 窗口) 数 + 离开区间次数 × log 规则数 + 触发数)
+- 只在水位向上越过阈值时触发，回落后再次越过才会再次触发；同一规则同一视频
+  COOLDOWN 秒内最多触发一次，避免在阈值附近反复触发
+- 视频的第一条数据只建立水位、不触发（无从判断是否“越过”）；启动时用各视频的最新数据预热
+
+触发的告警写入日志、保存在最近告警列表中；设置了环境变量 BV_MONITOR_ALERT_WEBHOOK 时，
+由后台任务逐条 POST 到该地址，队列满时丢弃并计数。窗口状态只在内存中，重启后重新积累。
+所有操作都在事件循环线程内进行，无需加锁。
+"""
+
+import asyncio
+import logging
+import math
+import os
+from bisect import bisect_left, bisect_right
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+
+import httpx
+
+from .bilibili import VideoStat
+from .leaderboard import WINDOWS
+
+logger = logging.getLogger(__name__)
+
+# webhook 地址的环境变量名
+WEBHOOK_ENV = "BV_MONITOR_ALERT_WEBHOOK"
+# 等待推送的告警数上限与单次推送超时（秒）
+WEBHOOK_QUEUE = 256
+WEBHOOK_TIMEOUT = 5.0
+# 同一规则同一视频两次触发的最短间隔（秒，按数据时间计）
+COOLDOWN = 600
+# 窗口内最多保留的样本数（近似值）：样本间隔不小于窗口长度的 1/RESOLUTION
+RESOLUTION = 60
+# 保留的最近告警条数
+RECENT = 200
+
+_WINDOW_LABELS = {seconds: label for label, seconds in WINDOWS.items()}
+
+
+def window_seconds(window: str | None) -> int:
+    """规则的时间窗口参数 → 秒数（None 表示累计值规则，返回 0），不合法时抛出 ValueError"""
+    if window is None:
+        return 0
+    seconds = WINDOWS.get(window)
+    if seconds is None:
+        raise ValueError(f"无效的时间窗口: {window!r}，可选 {'/'.join(WINDOWS)}，不填为累计值")
+    return seconds
+
+
+def window_label(seconds: int) -> str | None:
+    """秒数 → 时间窗口参数（累计值规则为 None）"""
+    return _WINDOW_LABELS.get(seconds, f"{seconds}s") if seconds else None
+
+
+@dataclass(frozen=True)
+class Rule:
+    """告警规则：bvid 为 None 时作用于所有视频，window 为 0 表示累计值"""
+    id: int
+    bvid: str | None
+    metric: str
+    window: int
+    threshold: int
+
+
+class _RuleSet:
+    """同一 (视频范围, 指标, 窗口) 的规则，按阈值排序"""
+
+    __slots__ = ("thresholds", "rules")
+
+    def __init__(self):
+        self.thresholds: list[int] = []
+        self.rules: list[Rule] = []
+
+    def add(self, rule: Rule):
+        i = bisect_right(self.thresholds, rule.threshold)
+        self.thresholds.insert(i, rule.threshold)
+        self.rules.insert(i, rule)
+
+    def remove(self, rule: Rule):
+        i = self.rules.index(rule, bisect_left(self.thresholds, rule.threshold))
+        del self.thresholds[i], self.rules[i]
+
+    def crossed(self, lo: int, hi: int) -> list[Rule]:
+        """阈值落在 (lo, hi] 的规则"""
+        return self.rules[bisect_right(self.thresholds, lo):bisect_right(self.thresholds, hi)]
+
+    def gap(self, level: int) -> tuple[float, float]:
+        """level 所在的阈值区间 [不超过 level 的最大阈值, 大于 level 的最小阈值)，两端可为无穷"""
+        i = bisect_right(self.thresholds, level)
+        return (self.thresholds[i - 1] if i else -math.inf,
+                self.thresholds[i] if i < len(self.thresholds) else math.inf)
+
+
+class _Series:
+    """单个视频单项指标在一个窗口上的水位"""
+
+    __slots__ = ("level", "points", "floor", "ceil", "generation")
+
+    def __init__(self, ts: int, value: int, window: int):
+        self.level = value if not window else 0
+        # 窗口增量规则：窗口内抽稀后的 (ts, value)，最早的一个即增量的起点
+        self.points = deque(((ts, value),)) if window else None
+        # 水位所在的阈值区间 [floor, ceil)，generation 与引擎不一致时（规则有增删）需重新计算
+        self.floor = self.ceil = 0.0
+        self.generation = -1
+
+    def advance(self, ts: int, value: int, window: int) -> int:
+        """加入一条新数据，返回新的水位"""
+        if not window:
+            self.level = value
+            return value
+        points = self.points
+        if ts - points[-1][0] >= window // RESOLUTION:
+            points.append((ts, value))
+        cutoff = ts - window
+        while points[0][0] < cutoff:
+            points.popleft()
+        self.level = value - points[0][1]
+        return self.level
+
+
+class _Video:
+    """单个视频的评估状态"""
+
+    __slots__ = ("ts", "series", "keys", "generation")
+
+    def __init__(self, ts: int):
+        self.ts = ts  # 最近一条数据的时间，更早的数据忽略
+        self.series: dict[tuple[str, int], _Series] = {}
+        # 该视频涉及的 (指标, 窗口)（全局规则与针对它的规则之并），generation 不一致时重新计算
+        self.keys: set[tuple[str, int]] = set()
+        self.generation = -1
+
+
+class AlertEngine:
+    """在采集路径上增量评估告警规则"""
+
+    def __init__(self, cooldown: int = COOLDOWN, recent: int = RECENT):
+        self.cooldown = cooldown
+        self._rules: dict[int, Rule] = {}
+        self._sets: dict[tuple[str | None, str, int], _RuleSet] = {}
+        # 视频范围（None 为所有视频）→ 其规则涉及的 (指标, 窗口)
+        self._keys: dict[str | None, set[tuple[str, int]]] = {}
+        self._videos: dict[str, _Video] = {}
+        self._fired_at: dict[tuple[int, str], int] = {}
+        self._generation = 0  # 规则每次增删后递增，使各视频缓存的 keys 与阈值区间失效
+        self.recent: deque[dict] = deque(maxlen=recent)  # 最近的告警，新的在前
+        self._webhook: str | None = None
+        self._queue: asyncio.Queue[dict] | None = None
+        self._task: asyncio.Task | None = None
+        # 计数器
+        self.samples = 0      # 参与评估的数据条数
+        self.fired = 0        # 触发的告警数
+        self.suppressed = 0   # 冷却期内被忽略的触发数
+        self.sent = 0         # webhook 推送成功数
+        self.failed = 0       # webhook 推送失败数
+        self.dropped = 0      # webhook 队列满被丢弃的告警数
+
+    # ── 规则 ──
+
+    def load(self, rows: list[dict]):
+        """载入全部规则（DataStore.get_alert_rules 的结果，启动时调用）"""
+        for row in rows:
+            self.add(Rule(row["id"], row["bvid"], row["metric"], row["window"], row["threshold"]))
+
+    def add(self, rule: Rule):
+        """加入规则，从涉及视频的下一条数据开始评估"""
+        self._rules[rule.id] = rule
+        self._generation += 1
+        key = (rule.bvid, rule.metric, rule.window)
+        rules = self._sets.get(key)
+        if rules is None:
+            rules = self._sets[key] = _RuleSet()
+        rules.add(rule)
+        self._keys.setdefault(rule.bvid, set()).add((rule.metric, rule.window))
+
+    def remove(self, rule_id: int):
+        """移除规则；不再有规则的 (指标, 窗口) 同时释放各视频的水位状态"""
+        rule = self._rules.pop(rule_id, None)
+        if rule is None:
+            return
+        self._generation += 1
+        self._fired_at = {k: v for k, v in self._fired_at.items() if k[0] != rule_id}
+        key = (rule.bvid, rule.metric, rule.window)
+        rules = self._sets[key]
+        rules.remove(rule)
+        if rules.rules:
+            return
+        del self._sets[key]
+        series_key = (rule.metric, rule.window)
+        keys = self._keys[rule.bvid]
+        keys.discard(series_key)
+        if not keys:
+            del self._keys[rule.bvid]
+        shared = self._keys.get(None, ())
+        for bvid, video in self._videos.items():
+            if series_key not in shared and series_key not in self._keys.get(bvid, ()):
+                video.series.pop(series_key, None)
+
+    def forget(self, bvid: str):
+        """视频移出监控时调用（针对该视频的规则保留，重新加入监控后继续生效）"""
+        self._videos.pop(bvid, None)
+        self._fired_at = {k: v for k, v in self._fired_at.items() if k[1] != bvid}
+
+    # ── 评估 ──
+
+    def _video_keys(self, bvid: str) -> set[tuple[str, int]]:
+        """视频涉及的 (指标, 窗口)：全局规则与针对该视频的规则之并"""
+        keys = self._keys.get(None) or set()
+        own = self._keys.get(bvid)
+        return keys | own if own else keys
+
+    def _gap(self, bvid: str, key: tuple[str, int], level: int) -> tuple[float, float]:
+        """水位所在的阈值区间（合并全局规则与针对该视频的规则）"""
+        floor, ceil = -math.inf, math.inf
+        for scope in (None, bvid):
+            rules = self._sets.get((scope, *key))
+            if rules is not None:
+                lo, hi = rules.gap(level)
+                floor, ceil = max(floor, lo), min(ceil, hi)
+        return floor, ceil
+
+    def observe(self, stat: VideoStat):
+        """评估一条新采集的数据（采集成功后调用）"""
+        bvid = stat.bvid
+        generation = self._generation
+        video = self._videos.get(bvid)
+        if video is not None and video.generation == generation:
+            keys = video.keys
+        else:
+            keys = self._video_keys(bvid)
+        if not keys:
+            return
+        ts = int(datetime.fromisoformat(stat.timestamp).timestamp())
+        if video is None:
+            video = self._videos[bvid] = _Video(ts)
+        elif ts > video.ts:
+            video.ts = ts
+        else:
+            return  # 重复或乱序到达的旧数据
+        video.keys, video.generation = keys, generation
+        self.samples += 1
+        for key in keys:
+            metric, window = key
+            value = getattr(stat, metric)
+            series = video.series.get(key)
+            if series is None:
+                video.series[key] = _Series(ts, value, window)
+                continue
+            lo = series.level
+            hi = series.advance(ts, value, window)
+            if series.generation == generation and series.floor <= hi < series.ceil:
+                continue  # 仍在原阈值区间内，没有越过任何阈值
+            if hi > lo:
+                for scope in (None, bvid):
+                    rules = self._sets.get((scope, metric, window))
+                    if rules is not None:
+                        for rule in rules.crossed(lo, hi):
+                            self._fire(rule, stat, ts, hi)
+            series.floor, series.ceil = self._gap(bvid, key, hi)
+            series.generation = generation
+
+    def _fire(self, rule: Rule, stat: VideoStat, ts: int, level: int):
+        """触发告警：冷却检查、写日志、加入最近告警、放入 webhook 队列"""
+        key = (rule.id, stat.bvid)
+        last = self._fired_at.get(key)
+        if last is not None and ts - last < self.cooldown:
+            self.suppressed += 1
+            return
+        self._fired_at[key] = ts
+        self.fired += 1
+        window = window_label(rule.window)
+        what = f"{window} 内增量" if window else "累计"
+        event = {
+            "rule_id": rule.id,
+            "bvid": stat.bvid,
+            "metric": rule.metric,
+            "window": window,
+            "threshold": rule.threshold,
+            "value": level,
+            "current": getattr(stat, rule.metric),
+            "timestamp": stat.timestamp,
+            "message": f"{stat.bvid} {rule.metric} {what} {level:,} 已达到 {rule.threshold:,}（规则 #{rule.id}）",
+        }
+        logger.warning("告警: %s", event["message"])
+        self.recent.appendleft(event)
+        if self._queue is not None:
+            try:
+                self._queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self.dropped += 1
+
+    # ── webhook ──
+
+    async def _run(self):
+        """后台推送循环：逐条 POST JSON"""
+        async with httpx.AsyncClient(timeout=WEBHOOK_TIMEOUT) as client:
+            while True:
+                event = await self._queue.get()
+                try:
+                    response = await client.post(self._webhook, json=event)
+                    response.raise_for_status()
+                    self.sent += 1
+                except httpx.HTTPError as e:
+                    self.failed += 1
+                    logger.warning("告警 webhook 推送失败: %s", e)
+
+    def start(self):
+        """设置了 webhook 地址时启动后台推送任务（应用启动时调用）"""
+        self._webhook = os.environ.get(WEBHOOK_ENV) or None
+        if self._webhook and self._task is None:
+            self._queue = asyncio.Queue(maxsize=WEBHOOK_QUEUE)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """停止后台推送任务（应用关闭时调用，尚未推送的告警丢弃）"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._queue = None
+
+    def metrics(self) -> dict:
+        """告警运行指标"""
+        return {
+            "rules": len(self._rules),
+            "videos": len(self._videos),
+            "samples": self.samples,
+            "fired": self.fired,
+            "suppressed": self.suppressed,
+            "webhook": {
+                "enabled": self._webhook is not None,
+                "pending": self._queue.qsize() if self._queue is not None else 0,
+                "sent": self.sent,
+                "failed": self.failed,
+                "dropped": self.dropped,
+            },
+        }
+
+
+alerts = AlertEngine()
@@ -0,0 +1,74 @@
+"""冷数据归档 - 把一个视频一个月的原始数据打包为一个压缩块
+
+归档清理把早于最粗一档保留策略（90 天）的整月数据从原始数据表移入 archive 表，
+每个视频每个月一行，数据以本模块的格式编码后存为一个 BLOB；查询时解码还原。
+
+块格式（zlib 压缩前）：
+  版本 (1 字节) | 列数 (varint) | 行数 (varint) | 各列依次存放
+
+每行为 (ts, view, like, coin, favorite, share, danmaku, reply)。按列存放：
+每列按时间顺序做差分（第一个值与 0 差分），差分值 zigzag 编码为非负整数后以 varint 存放。
+时间间隔基本固定、计数类指标缓慢增长，差分后绝大多数只占一两个字节；
+同一列的相似字节相邻，zlib 再消除重复模式，体积远小于逐行存放的 SQLite 表。
+"""
+
+import zlib
+from collections.abc import Sequence
+from itertools import accumulate
+
+VERSION = 1
+# zlib 压缩级别：块只在归档时写入一次，取最高压缩率
+LEVEL = 9
+
+
+def _put_varint(out: bytearray, n: int):
+    """非负整数 → 小端 7 位一组的 varint"""
+    while n >= 0x80:
+        out.append(n & 0x7F | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _zigzag(n: int) -> int:
+    """有符号整数 → 非负整数（0, -1, 1, -2, … → 0, 1, 2, 3, …）"""
+    return n << 1 if n >= 0 else (-n << 1) - 1
+
+
+def encode(rows: Sequence[Sequence[int]]) -> bytes:
+    """按时间排序的行 → 压缩块（所有行列数相同）"""
+    ncols = len(rows[0]) if rows else 0
+    out = bytearray((VERSION,))
+    _put_varint(out, ncols)
+    _put_varint(out, len(rows))
+    for col in zip(*rows):
+        prev = 0
+        for v in col:
+            _put_varint(out, _zigzag(v - prev))
+            prev = v
+    return zlib.compress(bytes(out), LEVEL)
+
+
+def decode(blob: bytes) -> list[tuple[int, ...]]:
+    """压缩块 → 行（按时间排序的元组），格式不合法时抛出 ValueError"""
+    try:
+        data = zlib.decompress(blob)
+    except zlib.error as e:
+        raise ValueError("归档数据块已损坏") from e
+    if not data or data[0] != VERSION:
+        raise ValueError(f"不支持的归档数据块版本: {data[:1]!r}")
+
+    # 一次性解出全部 varint，再按列切分、还原 zigzag 与差分
+    raw, n, shift = [], 0, 0
+    for byte in memoryview(data)[1:]:
+        n |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        raw.append(n)
+        n, shift = 0, 0
+    if len(raw) < 2 or len(raw) != 2 + raw[0] * raw[1]:
+        raise ValueError("归档数据块已损坏")
+    ncols, nrows = raw[0], raw[1]
+    deltas = [v >> 1 if not v & 1 else -((v + 1) >> 1) for v in raw[2:]]
+    cols = [accumulate(deltas[i * nrows:(i + 1) * nrows]) for i in range(ncols)]
+    return list(zip(*cols))
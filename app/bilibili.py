@@ -2,12 +2,52 @@
 
 优化：使用共享 httpx.AsyncClient 复用连接池与 SSL 上下文，
 避免每次 API 调用都创建新客户端实例。
+
+视频信息与统计数据来自同一个接口（/x/web-interface/view），fetch_video 一次请求
+同时解析两者。
+
+容错：
+- 失败按原因抛出不同异常：视频不存在 / 被限流（-412）/ 上游错误 / 网络错误
+- 可重试的失败（限流、5xx、网络）按指数退避 + 随机抖动重试
+- 熔断器：最近请求失败率过高时暂停所有请求一段时间，到期后放行一个探测请求，
+  成功则恢复；采集引擎据此暂停派发，不再让每个视频都等到超时
+- 接口地址可通过环境变量 BV_MONITOR_API_BASE 指向本地模拟服务器
+  （scripts/fake_bilibili.py）进行测试
 """
 
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import Counter, deque
+
 import httpx
 from dataclasses import dataclass
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
+# 接口地址，可通过环境变量指向本地模拟服务器（创建客户端时读取）
+API_BASE_ENV = "BV_MONITOR_API_BASE"
+DEFAULT_API_BASE = "https://api.bilibili.com"
+
+# 分阶段超时（秒）：建立连接、读取响应、发送请求、等待连接池空闲连接
+TIMEOUT = httpx.Timeout(connect=3.0, read=5.0, write=5.0, pool=2.0)
+# 连接池：与采集并发数相当，保持长连接复用
+LIMITS = httpx.Limits(max_connections=16, max_keepalive_connections=8, keepalive_expiry=30)
+
+# 可重试失败的最大重试次数与退避参数（秒）
+RETRIES = 2
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 4.0
+
+try:
+    import h2  # noqa: F401  安装 httpx[http2] 后自动启用 HTTP/2
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
 
 @dataclass
 class VideoInfo:
@@ -33,6 +73,128 @@ class VideoStat:
     timestamp: str  # 采集时间
 
 
+# ── 异常 ──
+
+class BilibiliError(Exception):
+    """B 站接口调用失败（异常信息可直接展示给用户）"""
+    transient = False  # 是否为暂时性失败（值得重试、计入熔断统计）
+
+
+class VideoNotFound(BilibiliError):
+    """BV 号无效、视频不存在或不可见"""
+
+
+class RateLimited(BilibiliError):
+    """被 B 站风控限流（-412 / HTTP 412 / 429）"""
+    transient = True
+
+
+class UpstreamError(BilibiliError):
+    """上游返回错误（5xx、非预期的错误码或响应格式）"""
+    transient = True
+
+
+class NetworkError(BilibiliError):
+    """网络错误或超时"""
+    transient = True
+
+
+class CircuitOpen(BilibiliError):
+    """熔断中，暂不请求上游"""
+
+
+# 视为“视频不存在”的业务错误码
+_NOT_FOUND_CODES = {-400, -403, -404, 62002, 62004, 62012}
+
+
+# ── 熔断器 ──
+
+class CircuitBreaker:
+    """按最近请求失败率熔断（仅在事件循环线程内使用，无需加锁）
+
+    closed：正常放行；最近 window 次请求中暂时性失败占比达到 threshold 时转为 open
+    open：拒绝所有请求 cooldown 秒，连续熔断时冷却时间翻倍（不超过 max_cooldown）
+    half_open：冷却结束后只放行一个探测请求，成功则 closed，失败则再次 open
+    """
+
+    def __init__(
+        self,
+        window: int = 50,
+        min_calls: int = 20,
+        threshold: float = 0.5,
+        cooldown: float = 30.0,
+        max_cooldown: float = 300.0,
+    ):
+        self.min_calls = min_calls
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._results: deque[bool] = deque(maxlen=window)
+        self._cooldown = cooldown
+        self._opened_at = 0.0
+        self._probing = False
+        self.state = "closed"
+        self.trips = 0  # 累计熔断次数
+
+    def retry_after(self) -> float:
+        """距离允许发起请求还需等待的秒数，0 表示可以请求"""
+        if self.state == "open":
+            remaining = self._opened_at + self._cooldown - time.monotonic()
+            if remaining > 0:
+                return remaining
+            self.state = "half_open"
+        if self.state == "half_open" and self._probing:
+            return 1.0  # 等待探测结果
+        return 0.0
+
+    def before_call(self):
+        """请求前调用，熔断中抛出 CircuitOpen"""
+        if self.retry_after() > 0:
+            raise CircuitOpen("B 站接口暂不可用，请稍后再试")
+        if self.state == "half_open":
+            self._probing = True
+
+    def release(self):
+        """请求未得出结果（如被取消）时调用：半开状态下允许下一次请求重新探测"""
+        self._probing = False
+
+    def record(self, ok: bool):
+        """记录一次请求结果（ok=False 仅用于暂时性失败）"""
+        if self.state == "half_open":
+            self._probing = False
+            if ok:
+                self.state = "closed"
+                self._cooldown = self.base_cooldown
+                self._results.clear()
+            else:
+                self._cooldown = min(self._cooldown * 2, self.max_cooldown)
+                self._open()
+            return
+        self._results.append(ok)
+        failures = self._results.count(False)
+        if len(self._results) >= self.min_calls and failures / len(self._results) >= self.threshold:
+            self._open()
+
+    def _open(self):
+        self.state = "open"
+        self._opened_at = time.monotonic()
+        self._results.clear()
+        self.trips += 1
+        logger.warning("B 站接口失败率过高，暂停请求 %.0f 秒", self._cooldown)
+
+    def metrics(self) -> dict:
+        return {
+            "state": self.state,
+            "trips": self.trips,
+            "retry_after": round(self.retry_after(), 1) if self.state == "open" else 0.0,
+        }
+
+
+breaker = CircuitBreaker()
+# 按结果分类的请求计数（ok / not_found / rate_limited / upstream / network / circuit_open）
+request_counts: Counter[str] = Counter()
+retries = 0
+
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
                   "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -49,7 +211,10 @@ def init_client():
     """初始化共享客户端（应用启动时调用）"""
     global _client
     if _client is None or _client.is_closed:
-        _client = httpx.AsyncClient(headers=HEADERS, timeout=10)
+        _client = httpx.AsyncClient(
+            base_url=os.environ.get(API_BASE_ENV, DEFAULT_API_BASE),
+            headers=HEADERS, timeout=TIMEOUT, limits=LIMITS, http2=HTTP2,
+        )
 
 
 async def close_client():
@@ -68,40 +233,106 @@ def _get_client() -> httpx.AsyncClient:
     return _client
 
 
-async def fetch_video_info(bvid: str) -> VideoInfo | None:
-    """获取视频基本信息"""
-    url = "https://api.bilibili.com/x/web-interface/view"
-    params = {"bvid": bvid}
+def _classify(exc: Exception) -> str:
+    """异常 → 计数分类"""
+    return {
+        VideoNotFound: "not_found", RateLimited: "rate_limited", UpstreamError: "upstream",
+        NetworkError: "network", CircuitOpen: "circuit_open",
+    }.get(type(exc), "upstream")
+
 
+async def _get_view(bvid: str) -> dict:
+    """请求 /x/web-interface/view 一次，成功返回 data 字段，失败抛出对应异常"""
+    try:
+        resp = await _get_client().get("/x/web-interface/view", params={"bvid": bvid})
+    except httpx.TimeoutException as e:
+        raise NetworkError("请求 B 站接口超时") from e
+    except httpx.TransportError as e:
+        raise NetworkError("网络错误，无法连接 B 站接口") from e
+    except httpx.HTTPError as e:  # 响应解码失败、重定向过多等
+        raise NetworkError("网络错误，B 站接口响应异常") from e
+
+    if resp.status_code in (412, 429):
+        raise RateLimited("请求过于频繁，已被 B 站限流，请稍后再试")
+    if resp.status_code >= 500:
+        raise UpstreamError(f"B 站接口异常（HTTP {resp.status_code}）")
     try:
-        resp = await _get_client().get(url, params=params)
         data = resp.json()
-        if data["code"] != 0:
-            return None
-        d = data["data"]
-        return VideoInfo(
+        code = data["code"]
+        body = data["data"] if code == 0 else None
+    except (ValueError, KeyError, TypeError) as e:
+        raise UpstreamError("B 站接口返回格式异常") from e
+    if code == -412:
+        raise RateLimited("请求过于频繁，已被 B 站限流，请稍后再试")
+    if code in _NOT_FOUND_CODES:
+        raise VideoNotFound("BV 号无效或视频不存在")
+    if code != 0:
+        raise UpstreamError(f"B 站接口返回错误：{data.get('message') or code}")
+    return body
+
+
+async def _request_view(bvid: str) -> dict:
+    """带熔断与重试的 _get_view：暂时性失败按指数退避 + 随机抖动重试
+
+    每次请求都会向熔断器给出结果：未预期的异常按上游错误处理，被取消时释放探测名额，
+    半开状态的探测请求不会一直占着名额。
+    """
+    global retries
+    for attempt in range(RETRIES + 1):
+        try:
+            breaker.before_call()
+            try:
+                d = await _get_view(bvid)
+            except BilibiliError:
+                raise
+            except Exception as e:
+                logger.exception("请求 B 站接口时发生未预期的异常")
+                raise UpstreamError("B 站接口调用异常") from e
+            except BaseException:
+                breaker.release()  # 被取消：不计结果
+                raise
+        except BilibiliError as e:
+            request_counts[_classify(e)] += 1
+            if isinstance(e, CircuitOpen):
+                raise
+            breaker.record(not e.transient)
+            if not e.transient or attempt == RETRIES:
+                raise
+            retries += 1
+            await asyncio.sleep(random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)))
+            continue
+        request_counts["ok"] += 1
+        breaker.record(True)
+        return d
+
+
+def client_metrics() -> dict:
+    """上游请求运行指标"""
+    return {
+        "api_base": str(_get_client().base_url),
+        "http2": HTTP2,
+        "requests": dict(request_counts),
+        "retries": retries,
+        "circuit": breaker.metrics(),
+    }
+
+
+async def fetch_video(bvid: str) -> tuple[VideoInfo, VideoStat]:
+    """一次请求同时获取视频基本信息与统计数据
+
+    失败时抛出 BilibiliError 的子类。
+    """
+    d = await _request_view(bvid)
+    try:
+        stat = d["stat"]
+        info = VideoInfo(
             bvid=bvid,
             title=d["title"],
             pic=d["pic"].replace("http://", "https://"),
             owner_name=d["owner"]["name"],
             desc=d["desc"],
         )
-    except Exception:
-        return None
-
-
-async def fetch_video_stat(bvid: str) -> VideoStat | None:
-    """获取视频统计数据"""
-    url = "https://api.bilibili.com/x/web-interface/view"
-    params = {"bvid": bvid}
-
-    try:
-        resp = await _get_client().get(url, params=params)
-        data = resp.json()
-        if data["code"] != 0:
-            return None
-        stat = data["data"]["stat"]
-        return VideoStat(
+        return info, VideoStat(
             bvid=bvid,
             view=stat["view"],
             like=stat["like"],
@@ -112,5 +343,5 @@ async def fetch_video_stat(bvid: str) -> VideoStat | None:
             reply=stat["reply"],
             timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         )
-    except Exception:
-        return None
+    except (KeyError, TypeError, AttributeError) as e:
+        raise UpstreamError("B 站接口返回格式异常") from e
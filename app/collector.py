@@ -0,0 +1,325 @@
+"""采集引擎 - 单一调度循环统一安排所有视频的采集
+
+替代“每个视频一个 APScheduler 定时任务”的方式，避免大量视频在同一时刻集中请求
+触发 B 站风控（-412）：
+
+- 最小堆按到期时间排列所有视频，一个后台协程依次取出到期的视频发起采集
+- 相位错开：每个视频的采集时刻 = 间隔整数倍 + 由 BV 号 CRC32 决定的固定偏移，
+  同一间隔的视频均匀分散在整个周期内，重启后相位不变
+- 全局令牌桶限制每秒请求数，信号量限制同时进行中的请求数
+- 同一视频上一次采集尚未结束时跳过本次，落后超过一个周期时直接跳到下一个相位
+- 可选的闸门（gate）：上游熔断期间暂停派发，恢复后继续
+- 记录到期时间与实际发起请求之间的延迟（lag），用于观察限速是否过紧
+- 自动间隔（AdaptiveInterval）：按数据变化速度调整间隔，增长快的视频加快采集，
+  长时间不变的视频逐步退避（最长可到数小时），同样的请求预算能覆盖更多视频
+"""
+
+import asyncio
+import heapq
+import logging
+import math
+import time
+import zlib
+from collections import deque
+from collections.abc import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+# 全局请求速率上限（次/秒）与突发容量
+RATE_LIMIT = 10.0
+BURST = 10
+# 同时进行中的采集请求数上限
+MAX_CONCURRENCY = 8
+# lag 分位数统计使用的最近样本数
+LAG_WINDOW = 1024
+
+# 自动间隔：期望两次采集之间的变化量（播放增量 + 点赞增量 × 权重）
+AUTO_TARGET_CHANGE = 20
+AUTO_LIKE_WEIGHT = 5
+# 数据未变化时每次采集后间隔放大的倍数
+AUTO_BACKOFF = 2
+
+
+def phase_offset(bvid: str, interval: int) -> float:
+    """视频在采集周期内的固定相位偏移（秒），由 BV 号决定"""
+    return zlib.crc32(bvid.encode()) % (interval * 1000) / 1000
+
+
+class TokenBucket:
+    """令牌桶限速器（仅在事件循环线程内使用，无需加锁）"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+
+    async def acquire(self):
+        """取得一个令牌，令牌不足时等待"""
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class AdaptiveInterval:
+    """自动采集间隔：按两次采集之间的数据变化速度调整每个视频的间隔
+
+    - 有变化：按变化速度计算使每次采集约有 AUTO_TARGET_CHANGE 变化量的间隔，
+      加速可一步到位，放慢每次最多翻倍，避免偶发的平稳期让热门视频掉队
+    - 无变化：间隔乘以 AUTO_BACKOFF 逐步退避
+    - 结果限制在 [min_interval, max_interval] 之间
+    状态只保存在内存中，重启后由最近的播放增速重新估计初始间隔。
+    """
+
+    def __init__(self, min_interval: int = 10, max_interval: int = 3600):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        # bvid → [当前间隔, 上次采集时间, 播放量, 点赞数]
+        self._state: dict[str, list] = {}
+
+    def set_bounds(self, min_interval: int, max_interval: int) -> dict[str, int]:
+        """修改间隔上下限，返回因此改变了间隔的视频 {bvid: 新间隔}"""
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        changed = {}
+        for bvid, st in self._state.items():
+            clamped = self._clamp(st[0])
+            if clamped != st[0]:
+                st[0] = changed[bvid] = clamped
+        return changed
+
+    def _clamp(self, seconds: float) -> int:
+        return int(min(max(seconds, self.min_interval), self.max_interval))
+
+    def track(self, bvid: str, growth: float | None = None) -> int:
+        """开始自动调整视频的间隔，返回初始间隔
+
+        growth 为最近的播放增速（次/小时），未知时取上下限的几何平均。
+        """
+        if bvid in self._state:
+            return self._state[bvid][0]
+        if growth and growth > 0:
+            interval = self._clamp(AUTO_TARGET_CHANGE * 3600 / growth)
+        else:
+            interval = self._clamp(math.sqrt(self.min_interval * self.max_interval))
+        self._state[bvid] = [interval, None, 0, 0]
+        return interval
+
+    def forget(self, bvid: str):
+        """停止自动调整"""
+        self._state.pop(bvid, None)
+
+    def tracks(self, bvid: str) -> bool:
+        return bvid in self._state
+
+    def observe(self, bvid: str, view: int, like: int) -> int:
+        """记录一次采集结果，返回调整后的间隔"""
+        st = self._state[bvid]
+        now = time.time()
+        interval, last, last_view, last_like = st
+        if last is not None:
+            change = (view - last_view) + (like - last_like) * AUTO_LIKE_WEIGHT
+            if change > 0:
+                wanted = AUTO_TARGET_CHANGE * (now - last) / change
+                interval = self._clamp(min(wanted, interval * 2))
+            else:
+                interval = self._clamp(interval * AUTO_BACKOFF)
+        st[:] = [interval, now, view, like]
+        return interval
+
+    def metrics(self) -> dict:
+        intervals = [st[0] for st in self._state.values()]
+        return {
+            "videos": len(intervals),
+            "min_interval": self.min_interval,
+            "max_interval": self.max_interval,
+            "avg_interval": round(sum(intervals) / len(intervals), 1) if intervals else 0.0,
+        }
+
+
+class Collector:
+    """按到期时间调度所有视频采集的引擎"""
+
+    def __init__(
+        self,
+        rate: float = RATE_LIMIT,
+        burst: int = BURST,
+        concurrency: int = MAX_CONCURRENCY,
+    ):
+        self.concurrency = concurrency
+        self._bucket = TokenBucket(rate, burst)
+        self._sem = asyncio.Semaphore(concurrency)
+        # 堆元素 (到期时间, 序号, bvid)；视频改期 / 移除后旧元素留在堆中，取出时按 _due 校验丢弃
+        self._heap: list[tuple[float, int, str]] = []
+        self._seq = 0
+        self._due: dict[str, float] = {}
+        self._intervals: dict[str, int] = {}
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._collect: Callable[[str], Awaitable[bool]] | None = None
+        self._gate: Callable[[], float] | None = None
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        # 计数器
+        self.fetched = 0      # 成功采集次数
+        self.failed = 0       # 采集失败次数（接口错误、风控、网络异常）
+        self.skipped = 0      # 因上一次采集未结束或严重落后而跳过的次数
+        self.paused = 0.0     # 因闸门关闭（上游熔断）累计暂停的秒数
+        self.max_lag = 0.0
+        self._total_lag = 0.0
+        self._lag_count = 0
+        self._lags: deque[float] = deque(maxlen=LAG_WINDOW)
+
+    # ── 调度 ──
+
+    def schedule(self, bvid: str, interval: int):
+        """加入或更新视频的采集计划，下一次采集在该视频的下一个相位时刻"""
+        now = time.time()
+        due = now + (phase_offset(bvid, interval) - now) % interval
+        self._intervals[bvid] = interval
+        self._push(bvid, due)
+
+    def retime(self, bvid: str, interval: int):
+        """修改视频的采集间隔，下一次采集 = 上一次到期时间 + 新间隔（不早于现在）"""
+        old = self._intervals.get(bvid)
+        if old is None or old == interval:
+            return
+        self._intervals[bvid] = interval
+        self._push(bvid, max(self._due[bvid] - old + interval, time.time()))
+
+    def interval_of(self, bvid: str) -> int | None:
+        """视频当前的采集间隔，不在计划中返回 None"""
+        return self._intervals.get(bvid)
+
+    def unschedule(self, bvid: str):
+        """移除视频的采集计划（进行中的采集不受影响）"""
+        self._intervals.pop(bvid, None)
+        self._due.pop(bvid, None)
+
+    def is_scheduled(self, bvid: str) -> bool:
+        """视频是否在采集计划中"""
+        return bvid in self._intervals
+
+    def _push(self, bvid: str, due: float):
+        self._seq += 1
+        self._due[bvid] = due
+        item = (due, self._seq, bvid)
+        heapq.heappush(self._heap, item)
+        if self._heap[0] is item:
+            self._wake.set()  # 新的最早到期项，唤醒调度循环重新计算等待时间
+
+    # ── 调度循环 ──
+
+    async def _run(self):
+        while True:
+            # 丢弃已失效的堆元素
+            while self._heap and self._due.get(self._heap[0][2]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            if not self._heap:
+                await self._wake.wait()
+                self._wake.clear()
+                continue
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+                continue
+
+            due, _, bvid = heapq.heappop(self._heap)
+            interval = self._intervals[bvid]
+            now = time.time()
+            nxt = due + interval
+            if nxt <= now:
+                # 落后超过一个周期：不补采，直接跳到下一个相位
+                missed = int((now - nxt) // interval) + 1
+                nxt += missed * interval
+                self.skipped += missed
+            self._push(bvid, nxt)
+
+            if bvid in self._inflight:
+                self.skipped += 1
+                continue
+            # 闸门关闭时暂停派发，期间到期的视频在恢复后按落后处理
+            while self._gate is not None and (wait := self._gate()) > 0:
+                self.paused += wait
+                await asyncio.sleep(wait)
+            # 先限速、再占用并发名额，均满足后才发起请求
+            await self._bucket.acquire()
+            await self._sem.acquire()
+            task = asyncio.get_running_loop().create_task(self._fetch(bvid, due))
+            self._inflight[bvid] = task
+
+    async def _fetch(self, bvid: str, due: float):
+        lag = max(time.time() - due, 0.0)
+        self._lags.append(lag)
+        self._total_lag += lag
+        self._lag_count += 1
+        self.max_lag = max(self.max_lag, lag)
+        try:
+            ok = await self._collect(bvid)
+        except Exception:
+            logger.exception("采集 %s 失败", bvid)
+            ok = False
+        finally:
+            self._sem.release()
+            self._inflight.pop(bvid, None)
+        if ok:
+            self.fetched += 1
+        else:
+            self.failed += 1
+
+    # ── 生命周期 ──
+
+    def start(
+        self,
+        collect: Callable[[str], Awaitable[bool]],
+        gate: Callable[[], float] | None = None,
+    ):
+        """启动调度循环（应用启动时调用）
+
+        collect(bvid) 返回是否采集成功；gate() 返回还需暂停的秒数，0 表示可以派发。
+        """
+        self._collect = collect
+        self._gate = gate
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """停止调度循环并取消进行中的采集（应用关闭时调用）"""
+        tasks = list(self._inflight.values())
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._inflight.clear()
+
+    def metrics(self) -> dict:
+        """采集引擎运行指标（lag 单位为毫秒）"""
+        lags = sorted(self._lags)
+        return {
+            "scheduled": len(self._intervals),
+            "inflight": len(self._inflight),
+            "concurrency": self.concurrency,
+            "rate_limit": self._bucket.rate,
+            "fetched": self.fetched,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "paused_s": round(self.paused, 1),
+            "last_lag_ms": round(self._lags[-1] * 1000, 1) if self._lags else 0.0,
+            "avg_lag_ms": round(self._total_lag / self._lag_count * 1000, 1) if self._lag_count else 0.0,
+            "p95_lag_ms": round(lags[int(len(lags) * 0.95)] * 1000, 1) if lags else 0.0,
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+        }
+
+
+collector = Collector()
+adaptive = AdaptiveInterval()
@@ -0,0 +1,141 @@
+"""降采样算法 - 单次遍历、按时间分桶
+
+可选方法：
+- stride：等间隔取点（原有方法，由 SQL 窗口函数实现，见 DataStore._query_range）
+- minmax：每个时间桶保留 y 最小、最大的两条记录，突增 / 突降不会在两个取样点之间消失
+- lttb：Largest-Triangle-Three-Buckets，每个时间桶保留与“上一个选中点、下一个桶的均值点”
+  构成三角形面积最大的一条，视觉上最接近原曲线
+
+minmax / lttb 按时间而非行号分桶，无需预先 COUNT，可直接消费数据库游标；
+先读入至多 n + 1 行，不超过 n 行时原样返回（与 stride 一致，稀疏或有大段空白的数据
+不会被时间分桶合并），否则继续分桶，内存占用只与 n 及单个桶内的行数有关。
+取值函数由调用方传入，行可以是任意类型。
+"""
+
+from collections.abc import Callable, Iterable, Iterator
+from itertools import chain, islice
+from typing import Any
+
+METHODS = ("stride", "minmax", "lttb")
+
+Row = Any
+KeyFunc = Callable[[Row], float]
+
+
+def _prefetch(rows: Iterable[Row], n: int) -> tuple[list[Row], Iterator[Row] | None]:
+    """读入至多 n + 1 行：不超过 n 行时返回 (全部行, None)，否则返回 ([], 含已读行的迭代器)"""
+    it = iter(rows)
+    head = list(islice(it, n + 1))
+    if len(head) <= n:
+        return head, None
+    return [], chain(head, it)
+
+
+def _time_buckets(
+    rows: Iterable[Row],
+    n_buckets: int,
+    t0: float,
+    t1: float,
+    t_of: KeyFunc,
+) -> Iterator[list[Row]]:
+    """把按时间排序的行切分为 n_buckets 个等宽时间桶，依次产出非空桶"""
+    width = max((t1 - t0) / n_buckets, 1e-9)
+    edge = t0  # 当前桶的右边界（不含），最后一个桶无右边界
+    cur: list[Row] = []
+    for r in rows:
+        t = t_of(r)
+        if t >= edge:
+            if cur:
+                yield cur
+                cur = []
+            idx = int((t - t0) / width) + 1
+            edge = t0 + idx * width if idx < n_buckets else float("inf")
+        cur.append(r)
+    if cur:
+        yield cur
+
+
+def minmax(
+    rows: Iterable[Row],
+    n: int,
+    t1: float,
+    t_of: KeyFunc,
+    y_of: KeyFunc,
+) -> list[Row]:
+    """min-max 降采样：约 n 个点，首尾两点总是保留，不超过 n 行时原样返回
+
+    时间桶从第一条记录的时间到 t1 均分（t1 通常为查询范围终点或当前时间）。
+    """
+    few, it = _prefetch(rows, n)
+    if it is None:
+        return few
+    first = next(it)
+    out = [first]
+    last = first
+    for bucket in _time_buckets(it, max((n - 2) // 2, 1), t_of(first), t1, t_of):
+        last = bucket[-1]
+        lo = min(bucket, key=y_of)
+        hi = max(bucket, key=y_of)
+        if lo is hi:
+            out.append(lo)
+        elif t_of(lo) <= t_of(hi):
+            out.extend((lo, hi))
+        else:
+            out.extend((hi, lo))
+    if out[-1] is not last:
+        out.append(last)
+    return out
+
+
+def _largest_triangle(
+    bucket: list[Row],
+    a_t: float,
+    a_y: float,
+    c_t: float,
+    c_y: float,
+    t_of: KeyFunc,
+    y_of: KeyFunc,
+) -> Row:
+    """在桶内找与 A、C 两点构成三角形面积最大的点（省略常数 1/2）"""
+    dt, dy = a_t - c_t, c_y - a_y
+    best, best_area = bucket[0], -1.0
+    for r in bucket:
+        area = abs(dt * (y_of(r) - a_y) - (a_t - t_of(r)) * dy)
+        if area > best_area:
+            best, best_area = r, area
+    return best
+
+
+def lttb(
+    rows: Iterable[Row],
+    n: int,
+    t1: float,
+    t_of: KeyFunc,
+    y_of: KeyFunc,
+) -> list[Row]:
+    """Largest-Triangle-Three-Buckets 降采样：约 n 个点，首尾两点总是保留，不超过 n 行时原样返回
+
+    流式实现：选择某个桶的代表点需要下一个桶的均值，因此只缓存一个桶。
+    """
+    few, it = _prefetch(rows, n)
+    if it is None:
+        return few
+    first = next(it)
+    out = [first]
+    a_t, a_y = t_of(first), y_of(first)
+    pending: list[Row] | None = None
+    for bucket in _time_buckets(it, max(n - 2, 1), t_of(first), t1, t_of):
+        if pending is not None:
+            c_t = sum(t_of(r) for r in bucket) / len(bucket)
+            c_y = sum(y_of(r) for r in bucket) / len(bucket)
+            sel = _largest_triangle(pending, a_t, a_y, c_t, c_y, t_of, y_of)
+            out.append(sel)
+            a_t, a_y = t_of(sel), y_of(sel)
+        pending = bucket
+    if pending:
+        # 最后一个桶：以最后一条记录作为“下一个桶”，并保留最后一条
+        last = pending[-1]
+        if len(pending) > 1:
+            out.append(_largest_triangle(pending[:-1], a_t, a_y, t_of(last), y_of(last), t_of, y_of))
+        out.append(last)
+    return out
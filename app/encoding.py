@@ -0,0 +1,182 @@
+"""HTTP 响应编码 - 快速 JSON 序列化、按请求协商的压缩与条件请求
+
+- 安装 orjson 后用它序列化 JSON（比标准库 json 快数倍），否则回退到标准库
+- 按请求头 Accept-Encoding 协商压缩：优先 br（需安装 brotli），其次 gzip；
+  小于 MIN_COMPRESS 字节的响应不压缩（压缩收益抵不过 CPU 与头部开销）
+- 条件请求：响应带弱 ETag / Last-Modified 与 Cache-Control: no-cache，浏览器每次轮询
+  都会带上 If-None-Match / If-Modified-Since，数据未变化时直接返回 304，不执行查询
+- NDJSON 流式响应（批量统计）逐行序列化，压缩器每行 flush 一次，客户端收到即可解析
+- 只用于统计数据与首页接口；SSE 推送不经过这里
+"""
+
+import gzip
+import json
+import zlib
+from collections import Counter
+from collections.abc import Iterable
+from email.utils import formatdate, parsedate_to_datetime
+
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 小于此字节数的响应不压缩
+MIN_COMPRESS = 1024
+# 动态响应的压缩级别：在压缩率与 CPU 之间折中
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 5
+
+# 按内容编码统计的响应数与压缩前后字节数（identity 表示未压缩，not_modified 为 304）
+response_counts: Counter[str] = Counter()
+bytes_in = 0
+bytes_out = 0
+
+
+def dumps(obj) -> bytes:
+    """序列化为 UTF-8 编码的紧凑 JSON"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def negotiate(accept_encoding: str) -> str | None:
+    """按 Accept-Encoding 选择压缩方式（br / gzip），都不接受时返回 None
+
+    q=0 表示明确拒绝；未列出的编码按 * 的 q 值处理。
+    """
+    weights: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name.strip():
+            weights[name.strip().lower()] = q
+    for coding in ("br", "gzip") if brotli is not None else ("gzip",):
+        if weights.get(coding, weights.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+
+def compress(body: bytes, coding: str) -> bytes:
+    if coding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def json_response(
+    request: Request,
+    payload,
+    status_code: int = 200,
+    headers: dict[str, str] | None = None,
+) -> Response:
+    """序列化 payload 并按请求协商压缩的 JSON 响应"""
+    global bytes_in, bytes_out
+    body = dumps(payload)
+    headers = {"Vary": "Accept-Encoding", **(headers or {})}
+    coding = None
+    if len(body) >= MIN_COMPRESS:
+        coding = negotiate(request.headers.get("accept-encoding", ""))
+    bytes_in += len(body)
+    if coding is not None:
+        body = compress(body, coding)
+        headers["Content-Encoding"] = coding
+    bytes_out += len(body)
+    response_counts[coding or "identity"] += 1
+    return Response(body, status_code=status_code, media_type="application/json", headers=headers)
+
+
+def ndjson_response(request: Request, items: Iterable) -> StreamingResponse:
+    """逐条序列化为 NDJSON（每行一个 JSON 对象）的流式响应，按请求协商压缩
+
+    流式压缩器在每行之后 flush，已生成的行不必等待整个响应完成即可送达客户端并解压；
+    压缩上下文在行之间保留，各行相似的字段名仍能被压缩。
+    """
+    coding = negotiate(request.headers.get("accept-encoding", ""))
+    headers = {"Vary": "Accept-Encoding"}
+    if coding is not None:
+        headers["Content-Encoding"] = coding
+    response_counts[coding or "identity"] += 1
+
+    def stream():
+        global bytes_in, bytes_out
+        if coding == "br":
+            compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            feed, flush, finish = compressor.process, compressor.flush, compressor.finish
+        elif coding == "gzip":
+            compressor = zlib.compressobj(GZIP_LEVEL, wbits=31)  # wbits=31: gzip 封装
+            feed, finish = compressor.compress, compressor.flush
+            flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)  # noqa: E731
+        for item in items:
+            line = dumps(item) + b"\n"
+            bytes_in += len(line)
+            if coding is not None:
+                line = feed(line) + flush()
+            bytes_out += len(line)
+            yield line
+        if coding is not None:
+            tail = finish()
+            bytes_out += len(tail)
+            yield tail
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson", headers=headers)
+
+
+# ── 条件请求 ──
+
+def validators(etag: str, last_modified: float | None = None) -> dict[str, str]:
+    """校验响应头：弱 ETag（内容语义相同即可复用，不区分压缩方式）与可选的 Last-Modified
+
+    Cache-Control: no-cache 允许浏览器缓存响应，但每次使用前必须向服务器验证。
+    """
+    headers = {"ETag": f'W/"{etag}"', "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+    return headers
+
+
+def not_modified(request: Request, headers: dict[str, str]) -> bool:
+    """请求的缓存是否仍然有效（If-None-Match 优先，没有时才比较 If-Modified-Since）"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        return "*" in tags or headers["ETag"].removeprefix("W/") in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    last_modified = headers.get("Last-Modified")
+    if if_modified_since and last_modified:
+        try:
+            return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def not_modified_response(headers: dict[str, str]) -> Response:
+    """304 响应（带上与 200 响应相同的校验头）"""
+    response_counts["not_modified"] += 1
+    return Response(status_code=304, headers={"Vary": "Accept-Encoding", **headers})
+
+
+def metrics() -> dict:
+    """响应编码运行指标"""
+    return {
+        "json": "orjson" if orjson is not None else "json",
+        "brotli": brotli is not None,
+        "responses": dict(response_counts),
+        "bytes_in": bytes_in,
+        "bytes_out": bytes_out,
+    }
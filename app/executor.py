@@ -0,0 +1,117 @@
+"""数据库执行器 - 让 SQLite 读写离开事件循环
+
+DataStore 的方法都是同步阻塞的，直接在协程里调用会卡住整个事件循环。
+这里把它们分派到专用线程上执行：
+
+- 写：单线程执行器，使用共享写连接，所有写操作天然串行，无需争锁
+- 读：小线程池，每个线程一个只读 WAL 连接，读查询之间、读与写之间并行
+- AsyncDataStore：DataStore 的异步外观，方法名与 DataStore 一致，
+  路由与调度协程统一通过模块级实例 `adb` 访问数据
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from .store import DataStore, open_read_db
+
+# 读线程池大小
+READ_WORKERS = 4
+
+
+class DBExecutor:
+    """SQLite 读写线程池"""
+
+    def __init__(self, read_workers: int = READ_WORKERS):
+        self.read_workers = read_workers
+        self._writer: ThreadPoolExecutor | None = None
+        self._readers: ThreadPoolExecutor | None = None
+
+    def start(self):
+        """创建线程池（应用启动时调用）"""
+        if self._writer is None:
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+        if self._readers is None:
+            self._readers = ThreadPoolExecutor(
+                max_workers=self.read_workers,
+                thread_name_prefix="db-reader",
+                initializer=open_read_db,
+            )
+
+    def shutdown(self):
+        """等待已提交的任务完成并关闭线程池（应用关闭时调用）"""
+        if self._writer is not None:
+            self._writer.shutdown(wait=True)
+            self._writer = None
+        if self._readers is not None:
+            self._readers.shutdown(wait=True)
+            self._readers = None
+
+    async def read(self, fn, *args, **kwargs):
+        """在读线程池中执行只读操作"""
+        if self._readers is None:
+            self.start()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._readers, partial(fn, *args, **kwargs))
+
+    async def each_reader(self, fn, timeout: float = 30.0):
+        """在每个读线程上各执行一次 fn（处理各线程自己的只读连接）
+
+        同时提交与线程数相同的任务，在屏障处互相等待，保证每个线程恰好领到一个；
+        timeout 秒内未能全部就位（读线程池繁忙）时各任务直接执行，可能有线程没有执行到。
+        """
+        if self._readers is None:
+            return
+        barrier = threading.Barrier(self.read_workers)
+
+        def run():
+            try:
+                barrier.wait(timeout)
+            except threading.BrokenBarrierError:
+                pass
+            fn()
+
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._readers, run) for _ in range(self.read_workers)))
+
+    async def write(self, fn, *args, **kwargs):
+        """在写线程中执行写操作"""
+        if self._writer is None:
+            self.start()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._writer, partial(fn, *args, **kwargs))
+
+
+db_executor = DBExecutor()
+
+
+class AsyncDataStore:
+    """DataStore 的异步外观：读方法走读线程池，写方法走写线程"""
+
+    _READS = frozenset({
+        "get_config", "get_info", "get_stats", "get_stats_since", "get_stats_ranged",
+        "get_latest_stat", "get_monitored_bvids", "get_monitors", "get_video_interval",
+        "get_effective_interval", "count_monitors", "get_stats_version", "get_stats_batch",
+        "get_baselines", "get_alert_rules",
+    })
+    _WRITES = frozenset({
+        "set_config", "save_info", "save_stat", "save_stats", "add_monitor",
+        "remove_monitor", "set_video_interval", "add_alert_rule", "remove_alert_rule",
+        "cleanup_old_data", "cleanup_step",
+        "vacuum_step", "migrate_all", "migrate_legacy_step", "backfill_rollups_step",
+        "partition_step", "warm_hot_step", "drop_retired_partitions",
+    })
+
+    def __init__(self, executor: DBExecutor):
+        self._executor = executor
+
+    def __getattr__(self, name: str):
+        if name in self._READS:
+            return partial(self._executor.read, getattr(DataStore, name))
+        if name in self._WRITES:
+            return partial(self._executor.write, getattr(DataStore, name))
+        raise AttributeError(name)
+
+
+adb = AsyncDataStore(db_executor)
@@ -0,0 +1,98 @@
+"""实时推送模块 - 进程内发布/订阅
+
+采集任务写入新数据后立即发布到 hub，浏览器通过 SSE 订阅感兴趣的 BV 号，
+无需轮询即可在采集完成的瞬间拿到新数据。
+
+- 每个订阅者一个有界队列，发布端只做 put_nowait，不会被慢客户端阻塞
+- 队列溢出的订阅者直接判定为慢消费者：清空队列并投递结束标记，
+  由客户端重连后自行增量补齐
+- 所有操作都在事件循环线程内进行，无需加锁
+"""
+
+import asyncio
+from dataclasses import asdict
+
+from .bilibili import VideoStat
+
+# 每个订阅者最多积压的消息数
+QUEUE_SIZE = 64
+
+
+class Subscription:
+    """单个订阅者（一个 SSE 连接）"""
+
+    def __init__(self, bvids: frozenset[str], maxsize: int):
+        self.bvids = bvids
+        self.queue: asyncio.Queue[dict | None] = asyncio.Queue(maxsize=maxsize)
+        self.dropped = False  # 是否因积压过多被踢出
+
+    async def get(self) -> dict | None:
+        """等待下一条消息，返回 None 表示订阅已结束"""
+        return await self.queue.get()
+
+
+class StatsHub:
+    """按 BV 号分发新采集数据的发布/订阅中心"""
+
+    def __init__(self, queue_size: int = QUEUE_SIZE):
+        self._queue_size = queue_size
+        self._subs: dict[str, set[Subscription]] = {}
+        self.published = 0   # 累计发布条数
+        self.dropped = 0     # 累计踢出的慢消费者数
+
+    def subscribe(self, bvids: list[str]) -> Subscription:
+        """订阅一个或多个视频的新数据"""
+        sub = Subscription(frozenset(bvids), self._queue_size)
+        for bvid in sub.bvids:
+            self._subs.setdefault(bvid, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        """取消订阅（连接断开时调用）"""
+        for bvid in sub.bvids:
+            subs = self._subs.get(bvid)
+            if subs is None:
+                continue
+            subs.discard(sub)
+            if not subs:
+                del self._subs[bvid]
+
+    def publish(self, stat: VideoStat):
+        """发布一条新数据给所有订阅了该视频的连接"""
+        subs = self._subs.get(stat.bvid)
+        if not subs:
+            return
+        self.published += 1
+        payload = asdict(stat)
+        for sub in list(subs):
+            try:
+                sub.queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                self._drop(sub)
+
+    def close(self):
+        """结束所有订阅（应用关闭时调用，让 SSE 连接尽快退出）"""
+        for sub in {s for subs in self._subs.values() for s in subs}:
+            self._end(sub)
+        self._subs.clear()
+
+    def subscriber_count(self) -> int:
+        """当前订阅连接数"""
+        return len({s for subs in self._subs.values() for s in subs})
+
+    def _drop(self, sub: Subscription):
+        """踢出慢消费者"""
+        sub.dropped = True
+        self.dropped += 1
+        self.unsubscribe(sub)
+        self._end(sub)
+
+    @staticmethod
+    def _end(sub: Subscription):
+        """清空积压并投递结束标记"""
+        while not sub.queue.empty():
+            sub.queue.get_nowait()
+        sub.queue.put_nowait(None)
+
+
+hub = StatsHub()
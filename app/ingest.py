@@ -0,0 +1,198 @@
+"""写入缓冲模块 - 采集数据批量落盘
+
+采集任务不再每条数据单独 INSERT + COMMIT，而是先放入内存缓冲，
+由后台任务按数量 / 时间阈值合并为一次 executemany + 一次提交，
+提交在数据库写线程中执行，不占用事件循环：
+
+- 缓冲达到 MAX_BATCH 条时立即唤醒刷盘
+- 否则每 FLUSH_INTERVAL 秒刷盘一次
+- 同一视频同一时间戳的重复数据在缓冲内合并，只保留最后一条
+- 刷盘失败时数据放回缓冲重试；连续失败 MAX_RETRIES 次后改为逐条写入，
+  仍然失败的数据（如时间格式错误）记录日志后丢弃，不会一直阻塞后续数据
+- 积压超过 MAX_PENDING 条时丢弃最早的数据，内存占用有上限
+- 应用关闭时 stop() 会把剩余数据全部写入
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+
+from .bilibili import VideoStat
+from .executor import adb
+
+logger = logging.getLogger(__name__)
+
+# 单次刷盘最多写入条数（达到即触发刷盘）
+MAX_BATCH = 500
+# 最长刷盘间隔（秒）
+FLUSH_INTERVAL = 1.0
+# 连续刷盘失败多少次后改为逐条写入
+MAX_RETRIES = 3
+# 缓冲最多积压条数（超过时丢弃最早的数据）
+MAX_PENDING = 100_000
+
+
+class IngestBuffer:
+    """统计数据写入缓冲（write-behind）"""
+
+    def __init__(
+        self,
+        max_batch: int = MAX_BATCH,
+        flush_interval: float = FLUSH_INTERVAL,
+        max_retries: int = MAX_RETRIES,
+        max_pending: int = MAX_PENDING,
+    ):
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.max_pending = max_pending
+        self._pending: dict[tuple[str, str], VideoStat] = {}
+        self._failures = 0       # 连续刷盘失败次数
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        # 计数器
+        self.enqueued = 0        # 累计入队条数
+        self.coalesced = 0       # 缓冲内被合并掉的重复条数
+        self.flushed = 0         # 累计写入条数
+        self.flushes = 0         # 累计刷盘次数
+        self.errors = 0          # 刷盘失败次数
+        self.dropped = 0         # 逐条写入仍失败而丢弃的条数
+        self.overflowed = 0      # 积压超过上限而丢弃的条数
+        self.max_depth = 0       # 历史最大积压
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    @property
+    def depth(self) -> int:
+        """当前积压条数"""
+        return len(self._pending)
+
+    def put(self, stat: VideoStat):
+        """放入一条采集数据（不阻塞，不落盘）"""
+        key = (stat.bvid, stat.timestamp)
+        if key in self._pending:
+            self.coalesced += 1
+        self._pending[key] = stat
+        self.enqueued += 1
+        self._trim()
+        depth = len(self._pending)
+        if depth > self.max_depth:
+            self.max_depth = depth
+        if depth >= self.max_batch:
+            self._wake.set()
+
+    async def flush(self):
+        """将当前缓冲的数据一次性写入数据库（在数据库写线程中执行）"""
+        if not self._pending:
+            return
+        batch = list(self._pending.values())
+        self._pending = {}
+        if self._failures >= self.max_retries:
+            await self._flush_each(batch)
+            return
+        t0 = time.perf_counter()
+        try:
+            await adb.save_stats(batch)
+        except Exception:
+            # 写入失败：放回缓冲等待下次重试（新数据排在后面，保持时间顺序）
+            self.errors += 1
+            self._failures += 1
+            logger.exception("统计数据刷盘失败（连续第 %d 次），%d 条数据将重试",
+                             self._failures, len(batch))
+            self._restore(batch)
+            return
+        self._failures = 0
+        self._record(batch, t0)
+
+    async def _flush_each(self, batch: list[VideoStat]):
+        """逐条写入（批量写入连续失败后使用），仍然失败的数据记录日志后丢弃"""
+        t0 = time.perf_counter()
+        saved = []
+        for stat in batch:
+            try:
+                await adb.save_stats([stat])
+            except Exception:
+                self.dropped += 1
+                logger.exception("统计数据写入失败，已丢弃: %s %s", stat.bvid, stat.timestamp)
+            else:
+                saved.append(stat)
+        self._failures = 0
+        if saved:
+            self._record(saved, t0)
+
+    def _restore(self, batch: list[VideoStat]):
+        """把写入失败的数据放回缓冲（排在写入期间新到的数据之前）"""
+        restored = {(s.bvid, s.timestamp): s for s in batch}
+        restored.update(self._pending)
+        self._pending = restored
+        self._trim()
+
+    def _trim(self):
+        """积压超过上限（数据库长时间不可写）时丢弃最早的数据"""
+        excess = len(self._pending) - self.max_pending
+        if excess <= 0:
+            return
+        for key in list(itertools.islice(self._pending, excess)):
+            del self._pending[key]
+        first = not self.overflowed
+        self.overflowed += excess
+        if first or self.overflowed // 10_000 != (self.overflowed - excess) // 10_000:
+            logger.error("写入缓冲积压超过 %d 条，已累计丢弃 %d 条最早的数据",
+                         self.max_pending, self.overflowed)
+
+    def _record(self, batch: list[VideoStat], t0: float):
+        """记录一次成功的刷盘"""
+        elapsed = (time.perf_counter() - t0) * 1000
+        self.flushes += 1
+        self.flushed += len(batch)
+        self.last_flush_ms = elapsed
+        self.max_flush_ms = max(self.max_flush_ms, elapsed)
+        self._total_flush_ms += elapsed
+
+    async def _run(self):
+        """后台刷盘循环"""
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    def start(self):
+        """启动后台刷盘任务（应用启动时调用）"""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """停止后台任务并写入剩余数据（应用关闭时调用）"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def metrics(self) -> dict:
+        """写入缓冲运行指标"""
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "errors": self.errors,
+            "dropped": self.dropped,
+            "overflowed": self.overflowed,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "avg_flush_ms": round(self._total_flush_ms / self.flushes, 3) if self.flushes else 0.0,
+            "max_flush_ms": round(self.max_flush_ms, 3),
+        }
+
+
+ingest = IngestBuffer()
@@ -0,0 +1,113 @@
+"""涨幅排行 - 全部监控视频某项指标在最近一段时间内的增量排行
+
+回答“最近 1 小时哪些视频播放涨得最多”，不再需要逐个视频做时间范围查询：
+
+- 当前值：采集到新数据时随实时推送一起更新（observe），每个视频只保留最新一条，常驻内存
+- 基线：窗口起点的指标值由预聚合表一次查出（DataStore.get_baselines），按 (指标, 窗口) 缓存；
+  只有窗口起点跨入新的时间桶（1 小时 ~ 7 天窗口为 1 分钟）时才重新查询
+- 排行：当前值减基线，heapq.nlargest 取前 K 个；请求只遍历内存中的字典，不访问数据库
+
+所有操作都在事件循环线程内进行，无需加锁。
+"""
+
+import heapq
+import time
+from datetime import datetime
+from operator import itemgetter
+
+from .bilibili import VideoStat
+from .executor import adb
+from .store import DataStore
+
+# 可选的时间窗口 → 秒
+WINDOWS: dict[str, int] = {
+    "10m": 600,
+    "1h":  3600,
+    "6h":  6 * 3600,
+    "24h": 86400,
+    "7d":  7 * 86400,
+    "30d": 30 * 86400,
+}
+
+# 单次最多返回的条数
+MAX_LIMIT = 100
+
+
+class Leaderboard:
+    """按指标增量排行监控中的视频"""
+
+    def __init__(self):
+        self._current: dict[str, VideoStat] = {}
+        # (指标, 窗口秒数) → (基线所在时间桶, {bvid: (标题, 基线值, 基线时间)})
+        self._baselines: dict[tuple[str, int], tuple[int, dict[str, tuple]]] = {}
+        self.queries = 0     # 累计排行请求数
+        self.refreshes = 0   # 累计基线查询数
+
+    def observe(self, stat: VideoStat):
+        """记录视频的最新数据（采集成功后调用，乱序到达的旧数据忽略）"""
+        current = self._current.get(stat.bvid)
+        if current is None or stat.timestamp >= current.timestamp:
+            self._current[stat.bvid] = stat
+
+    def forget(self, bvid: str):
+        """视频移出监控时调用"""
+        self._current.pop(bvid, None)
+
+    async def _baselines_for(self, metric: str, seconds: int) -> dict[str, tuple]:
+        """窗口起点的基线（缓存到窗口起点跨入下一个时间桶为止）"""
+        start = int(time.time()) - seconds
+        width = DataStore.baseline_width(seconds)
+        bucket = start - start % width
+        cached = self._baselines.get((metric, seconds))
+        if cached is None or cached[0] != bucket:
+            cached = (bucket, await adb.get_baselines(metric, start))
+            self._baselines[(metric, seconds)] = cached
+            self.refreshes += 1
+        return cached[1]
+
+    async def top(self, metric: str = "view", window: str = "1h", limit: int = 10) -> list[dict]:
+        """窗口内指标增量最大的 limit 个视频，参数不合法时抛出 ValueError
+
+        返回 [{"bvid", "title", "gain", "rate", "current", "baseline", "since", "timestamp"}, ...]：
+        gain 为当前值与基线之差，rate 为按基线到当前值的实际时间折算的每小时增量，
+        since / timestamp 为基线与当前值的时间。刚加入监控、尚无基线的视频在下次刷新基线后出现。
+        """
+        seconds = WINDOWS.get(window)
+        if seconds is None:
+            raise ValueError(f"无效的时间窗口: {window!r}，可选 {'/'.join(WINDOWS)}")
+        baselines = await self._baselines_for(metric, seconds)
+        self.queries += 1
+
+        def gains():
+            for bvid, stat in self._current.items():
+                base = baselines.get(bvid)
+                if base is not None:
+                    yield getattr(stat, metric) - base[1], bvid, stat, base
+
+        result = []
+        top = heapq.nlargest(limit, gains(), key=itemgetter(0))
+        for gain, bvid, stat, (title, value, base_ts) in top:
+            elapsed = datetime.strptime(stat.timestamp, "%Y-%m-%d %H:%M:%S").timestamp() - base_ts
+            result.append({
+                "bvid": bvid,
+                "title": title,
+                "gain": gain,
+                "rate": round(gain * 3600 / elapsed, 1) if elapsed > 0 else None,
+                "current": getattr(stat, metric),
+                "baseline": value,
+                "since": datetime.fromtimestamp(base_ts).strftime("%Y-%m-%d %H:%M:%S"),
+                "timestamp": stat.timestamp,
+            })
+        return result
+
+    def metrics(self) -> dict:
+        """涨幅排行运行指标"""
+        return {
+            "videos": len(self._current),
+            "cached_baselines": len(self._baselines),
+            "queries": self.queries,
+            "refreshes": self.refreshes,
+        }
+
+
+leaderboard = Leaderboard()
@@ -0,0 +1,307 @@
+"""热数据缓存 - 每个视频最近几小时的原始数据常驻内存
+
+图表最常用的 1 小时 / 6 小时范围、增量轮询与最新值查询直接由内存回答，不再访问 SQLite：
+
+- 每个视频一个环形缓冲（Ring）：行 (ts, view, like, coin, favorite, share, danmaku, reply)
+  连续存放在一个 array('q') 中，每行 64 字节，不为每条数据创建对象；容量为 2 的幂，
+  写满时若最旧的一行仍在 HOT_SECONDS 内则翻倍（至多 MAX_ROWS 行），否则覆盖最旧的一行
+- 内容与数据库一致：写入 stats 的样本在同一事务提交前追加（提交失败时丢弃该视频的缓冲），
+  另记录最新一条（包括因未变化而未写入的样本，查询时与数据库一样补在末尾）；
+  加载同样在数据库写线程中进行，不会与写入交错。迟到的旧样本使该视频的缓冲失效
+- 每个缓冲记录完整覆盖的起点 covered：起点不早于 covered 的查询才由缓冲回答，其余照常查询数据库
+- 启动时在后台按监控顺序加载各视频最近 HOT_SECONDS 的数据，直到内存上限；之后查询未命中时
+  登记该视频，由后台任务加载。总内存超过上限时淘汰最久未被查询的视频（LRU）
+
+读（读线程池）写（写线程）在不同线程中进行，共用一把锁；锁内只做二分查找与切片复制。
+"""
+
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+# 缓冲保留的时间跨度（秒）：覆盖图表的 6 小时范围，另留 10 分钟余量
+HOT_SECONDS = 6 * 3600 + 600
+# 单个视频缓冲的最小 / 最大行数（最短采集间隔 10 秒时 HOT_SECONDS 约 2200 行）
+MIN_ROWS = 64
+MAX_ROWS = 4096
+# 每行的列数：ts + 7 项指标
+WIDTH = 8
+# 默认内存上限（字节）
+MAX_BYTES = 64 * 2**20
+
+
+class Ring:
+    """单个视频的环形缓冲，逻辑下标 0 为最旧的一行"""
+
+    __slots__ = ("buf", "cap", "head", "size", "covered", "latest")
+
+    def __init__(self, rows: list[tuple], covered: int, latest: tuple | None):
+        cap = MIN_ROWS
+        while cap < len(rows) and cap < MAX_ROWS:
+            cap *= 2
+        if len(rows) > cap:
+            covered = rows[-cap - 1][0] + 1
+            rows = rows[-cap:]
+        self.buf = array("q", [0]) * (cap * WIDTH)
+        self.buf[:len(rows) * WIDTH] = array("q", [v for r in rows for v in r])
+        self.cap = cap
+        self.head = 0
+        self.size = len(rows)
+        self.covered = covered   # 不早于此时间的已写入样本都在缓冲中
+        self.latest = latest     # 最新一条（可能因未变化而未写入 stats）
+
+    @property
+    def nbytes(self) -> int:
+        return self.cap * WIDTH * self.buf.itemsize
+
+    def _ts(self, i: int) -> int:
+        return self.buf[(self.head + i) % self.cap * WIDTH]
+
+    def _bisect(self, ts: int) -> int:
+        """第一个时间不早于 ts 的逻辑下标"""
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._ts(mid) < ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _slice(self, i: int, j: int) -> list[tuple]:
+        """逻辑下标 [i, j) 的行"""
+        if i >= j:
+            return []
+        start = (self.head + i) % self.cap
+        end = start + j - i
+        if end <= self.cap:
+            flat = self.buf[start * WIDTH:end * WIDTH]
+        else:
+            flat = self.buf[start * WIDTH:] + self.buf[:(end - self.cap) * WIDTH]
+        return list(zip(*[iter(flat)] * WIDTH))
+
+    def _grow(self):
+        """容量翻倍，行按逻辑顺序重新排列"""
+        rows = self.buf[self.head * WIDTH:] + self.buf[:self.head * WIDTH]
+        self.buf = rows + array("q", [0]) * (self.cap * WIDTH)
+        self.cap *= 2
+        self.head = 0
+
+    def append(self, row: tuple) -> int | None:
+        """追加一行，返回内存增量（字节）；早于最后一行时返回 None（缓冲应作废）"""
+        if self.size:
+            last = self._ts(self.size - 1)
+            if row[0] < last:
+                return None
+            if row[0] == last:  # 同一秒的重复数据以后写入的为准
+                pos = (self.head + self.size - 1) % self.cap
+                self.buf[pos * WIDTH:(pos + 1) * WIDTH] = array("q", row)
+                return 0
+        grown = 0
+        if self.size == self.cap:
+            oldest = self._ts(0)
+            if self.cap < MAX_ROWS and oldest >= row[0] - HOT_SECONDS:
+                grown = self.nbytes
+                self._grow()
+            else:
+                self.covered = oldest + 1
+                self.head = (self.head + 1) % self.cap
+                self.size -= 1
+        pos = (self.head + self.size) % self.cap
+        self.buf[pos * WIDTH:(pos + 1) * WIDTH] = array("q", row)
+        self.size += 1
+        return grown
+
+    def select(self, t0: int, t1: int | None) -> list[tuple]:
+        """[t0, t1] 内已写入的行（t1 为 None 表示不限）"""
+        return self._slice(self._bisect(t0), self.size if t1 is None else self._bisect(t1 + 1))
+
+    def tail(self, t0: int, t1: int | None) -> list[tuple]:
+        """未写入 stats 的最新一条（与 DataStore._unstored_tail 相同），不在 [t0, t1] 内时为空"""
+        latest = self.latest
+        if latest is None or self.size and latest[0] <= self._ts(self.size - 1):
+            return []
+        if latest[0] < t0 or t1 is not None and latest[0] > t1:
+            return []
+        return [latest]
+
+    def before(self, ts: int) -> tuple | None:
+        """时间不晚于 ts 的最后一行，缓冲中没有时为 None"""
+        i = self._bisect(ts + 1)
+        return self._slice(i - 1, i)[0] if i else None
+
+
+class HotCache:
+    """按视频 ID 索引的环形缓冲集合，总内存受 max_bytes 限制"""
+
+    def __init__(self, max_bytes: int = MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._rings: OrderedDict[int, Ring] = OrderedDict()  # 按最近查询排序，最久未查询的在前
+        self._wanted: dict[int, None] = {}  # 查询未命中、等待加载的视频（按登记顺序）
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # 计数器
+        self.hits = 0            # 由缓冲回答的查询数
+        self.misses = 0          # 可由缓冲回答但缓冲未加载 / 未覆盖的查询数
+        self.loads = 0           # 加载次数
+        self.evictions = 0       # 因内存上限淘汰的视频数
+        self.invalidations = 0   # 因迟到的旧数据或写入失败作废的视频数
+
+    @property
+    def nbytes(self) -> int:
+        """当前占用的内存（字节，仅计行数据）"""
+        return self._bytes
+
+    def _drop(self, vid: int) -> Ring | None:
+        ring = self._rings.pop(vid, None)
+        if ring is not None:
+            self._bytes -= ring.nbytes
+        return ring
+
+    def _evict(self, keep: int | None = None):
+        """淘汰最久未查询的视频，直到不超过内存上限"""
+        while self._bytes > self.max_bytes and self._rings:
+            vid = next(iter(self._rings))
+            if vid == keep:
+                if len(self._rings) == 1:
+                    break
+                self._rings.move_to_end(vid)
+                continue
+            self._drop(vid)
+            self.evictions += 1
+
+    # ── 写线程 ──
+
+    def set_max_bytes(self, max_bytes: int):
+        """修改内存上限（0 表示关闭缓存）"""
+        with self._lock:
+            self.max_bytes = max_bytes
+            if not max_bytes:
+                self._wanted.clear()
+            self._evict()
+
+    def load(self, vid: int, rows: list[tuple], covered: int, latest: tuple | None):
+        """装入一个视频的缓冲：rows 为 covered 之后的全部已写入行（按时间排序）"""
+        ring = Ring(rows, covered, latest)
+        with self._lock:
+            self._wanted.pop(vid, None)
+            if not self.max_bytes:
+                return
+            self._drop(vid)
+            self._rings[vid] = ring
+            self._bytes += ring.nbytes
+            self.loads += 1
+            self._evict(keep=vid)
+
+    def ingest(self, writes: list[tuple], latest: list[tuple]):
+        """追加新数据：writes 为写入 stats 的 (video_id, ts, view, ...)，latest 为更新最新值的样本
+
+        只更新已加载的视频，未加载的视频在被查询时再加载。
+        """
+        with self._lock:
+            if not self._rings:
+                return
+            for s in writes:
+                ring = self._rings.get(s[0])
+                if ring is None:
+                    continue
+                grown = ring.append(s[1:WIDTH + 1])
+                if grown is None:
+                    self._drop(s[0])
+                    self.invalidations += 1
+                else:
+                    self._bytes += grown
+            for s in latest:
+                ring = self._rings.get(s[0])
+                if ring is not None and (ring.latest is None or s[1] >= ring.latest[0]):
+                    ring.latest = tuple(s[1:WIDTH + 1])
+            self._evict()
+
+    def invalidate(self, vids):
+        """作废若干视频的缓冲（写入失败时调用）"""
+        with self._lock:
+            for vid in vids:
+                if self._drop(vid) is not None:
+                    self.invalidations += 1
+
+    def take_wanted(self, limit: int) -> list[int]:
+        """取出至多 limit 个等待加载的视频"""
+        with self._lock:
+            vids = list(self._wanted)[:limit]
+            for vid in vids:
+                del self._wanted[vid]
+            return vids
+
+    def has_wanted(self) -> bool:
+        return bool(self._wanted)
+
+    def __contains__(self, vid: int) -> bool:
+        return vid in self._rings
+
+    # ── 读线程 ──
+
+    def _get(self, vid: int, t0: int) -> Ring | None:
+        """覆盖 t0 之后全部数据的缓冲（调用方持有锁并计数命中）；未加载时登记等待加载"""
+        ring = self._rings.get(vid)
+        if ring is None or t0 < ring.covered:
+            self.misses += 1
+            if ring is None and self.max_bytes and t0 >= time.time() - HOT_SECONDS:
+                self._wanted[vid] = None
+            return None
+        self._rings.move_to_end(vid)
+        return ring
+
+    def range(self, vid: int, t0: int, t1: int | None) -> tuple[list[tuple], list[tuple]] | None:
+        """[t0, t1] 内的 (已写入的行, 未写入的最新一条)，缓冲不能完整回答时返回 None"""
+        with self._lock:
+            ring = self._get(vid, t0)
+            if ring is None:
+                return None
+            self.hits += 1
+            return ring.select(t0, t1), ring.tail(t0, t1)
+
+    def since(
+        self,
+        vid: int,
+        after: int,
+        until: int | None,
+        with_prev: bool,
+    ) -> tuple[list[tuple], tuple | None] | None:
+        """晚于 after 的 (行（含未写入的最新一条）, 不晚于 after 的最后一行)，不能完整回答时返回 None
+
+        with_prev=True 时缓冲中必须有不晚于 after 的行（否则更早的行只在数据库中）。
+        """
+        with self._lock:
+            ring = self._get(vid, after + 1)
+            if ring is None:
+                return None
+            prev = ring.before(after) if with_prev else None
+            if with_prev and prev is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return ring.select(after + 1, until) + ring.tail(after + 1, until), prev
+
+    def latest(self, vid: int) -> tuple | None:
+        """最新一条 (ts, view, ...)，未加载时返回 None（不登记加载）"""
+        with self._lock:
+            ring = self._rings.get(vid)
+            return ring.latest if ring is not None else None
+
+    def metrics(self) -> dict:
+        """热数据缓存运行指标"""
+        return {
+            "videos": len(self._rings),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "loads": self.loads,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "wanted": len(self._wanted),
+        }
+
+
+hot = HotCache()
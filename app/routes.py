@@ -1,17 +1,30 @@
 """API路由"""
 
+import asyncio
+import json
+import time
+from itertools import islice
+
 from fastapi import APIRouter, Request, Query
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from pathlib import Path
 from pydantic import BaseModel
 
-from .bilibili import fetch_video_info
+from . import encoding
+from .alerts import Rule, alerts, window_label, window_seconds
+from .bilibili import BilibiliError, client_metrics
+from .collector import adaptive, collector
+from .executor import adb
+from .hub import hub
+from .ingest import ingest
+from .leaderboard import MAX_LIMIT as MAX_LEADERBOARD, leaderboard
+from .ringbuf import hot
 from .scheduler import (
     collect_one, add_video_job, remove_video_job,
-    reschedule_video, reschedule_default_videos,
+    reschedule_video, reschedule_default_videos, set_auto_bounds,
 )
-from .store import DataStore
+from .store import AUTO_INTERVAL, DataStore
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
@@ -34,99 +47,424 @@ templates.env.filters["format_num"] = _format_num
 
 router = APIRouter()
 
-# 允许的采集间隔选项（秒）
-ALLOWED_INTERVALS = [10, 15, 30, 60, 120, 300]
+# 允许的采集间隔选项（秒），AUTO_INTERVAL 表示自动
+ALLOWED_INTERVALS = [AUTO_INTERVAL, 10, 15, 30, 60, 120, 300]
+
+# 自动间隔上下限的取值范围（秒）
+AUTO_BOUNDS = (10, 86400)
 
 
 def _fmt_interval(sec: int) -> str:
     """将秒数格式化为可读文本"""
+    if sec == AUTO_INTERVAL:
+        return "自动"
     if sec < 60:
         return f"{sec}秒"
-    return f"{sec // 60}分钟"
+    if sec < 3600:
+        return f"{sec // 60}分钟"
+    minutes = sec % 3600 // 60
+    return f"{sec // 3600}小时{minutes}分钟" if minutes else f"{sec // 3600}小时"
 
 
-@router.get("/", response_class=HTMLResponse)
-async def index(request: Request):
-    """首页 - 展示监控列表"""
-    bvids = DataStore.get_monitored_bvids()
-    config = DataStore.get_config()
-    global_interval = config.get("interval", 30)
+def _interval_label(bvid: str, interval: int) -> str:
+    """间隔显示文本，自动间隔附带当前实际间隔"""
+    current = collector.interval_of(bvid) if interval == AUTO_INTERVAL else None
+    if current is None:
+        return _fmt_interval(interval)
+    return f"自动·{_fmt_interval(current)}"
+
+
+# 监控列表排序选项：参数值 → (显示名, 默认倒序)
+SORT_OPTIONS = {
+    "added":  ("添加顺序", False),
+    "view":   ("播放量", True),
+    "growth": ("播放增速", True),
+    "title":  ("标题", False),
+}
+
+# 首页每页显示的视频数
+PAGE_SIZE = 50
+
+# 进程启动标识：DataStore.version 是进程内计数，重启后从 0 开始，拼上启动标识以免与重启前的 ETag 相同
+_BOOT_ID = f"{time.time_ns():x}"
+
 
-    monitors = []
-    for bvid in bvids:
-        info = DataStore.get_info(bvid)
-        video_interval = DataStore.get_video_interval(bvid)
-        effective = DataStore.get_effective_interval(bvid)
-        latest_stat = DataStore.get_latest_stat(bvid)
-        monitors.append({
-            "bvid": bvid,
-            "info": info,
-            "latest_stat": latest_stat,
+def _list_validators() -> dict[str, str]:
+    """首页与监控列表的校验头：任何数据、监控列表或配置的写入都会改变 DataStore.version"""
+    return encoding.validators(f"{_BOOT_ID}-{DataStore.version}")
+
+
+async def _list_monitors(sort: str, order: str | None, page: int, page_size: int) -> dict:
+    """分页查询监控列表，补充实际采集间隔"""
+    if sort not in SORT_OPTIONS:
+        raise ValueError(f"无效的排序方式: {sort!r}，可选 {'/'.join(SORT_OPTIONS)}")
+    desc = SORT_OPTIONS[sort][1] if order is None else order == "desc"
+    config = await adb.get_config()
+    global_interval = config.get("interval", 30)
+    total = await adb.count_monitors()
+    rows = await adb.get_monitors(sort=sort, desc=desc,
+                                  offset=(page - 1) * page_size, limit=page_size)
+
+    items = []
+    for m in rows:
+        effective = m["interval"] if m["interval"] is not None else global_interval
+        items.append({
+            "bvid": m["bvid"],
+            "info": m["info"],
+            "latest_stat": m["latest_stat"],
+            "growth": m["growth"],
             "effective_interval": effective,
-            "effective_label": _fmt_interval(effective),
-            "is_custom": video_interval is not None,
+            "effective_label": _interval_label(m["bvid"], effective),
+            "current_interval": collector.interval_of(m["bvid"]),
+            "is_custom": m["interval"] is not None,
         })
+    return {"total": total, "page": page, "page_size": page_size,
+            "sort": sort, "order": "desc" if desc else "asc",
+            "interval": global_interval, "items": items}
+
+
+@router.get("/", response_class=HTMLResponse)
+async def index(
+    request: Request,
+    sort: str = Query("added", description="排序: added/view/growth/title"),
+    order: str | None = Query(None, pattern="^(asc|desc)$", description="asc/desc，默认随排序方式"),
+    page: int = Query(1, ge=1),
+):
+    """首页 - 展示监控列表（分页）"""
+    if sort not in SORT_OPTIONS:
+        sort = "added"
+    cache = _list_validators()
+    if encoding.not_modified(request, cache):
+        return encoding.not_modified_response(cache)
+    result = await _list_monitors(sort, order, page, PAGE_SIZE)
+    global_interval = result["interval"]
+    pages = max((result["total"] + PAGE_SIZE - 1) // PAGE_SIZE, 1)
 
     interval_options = [{"value": s, "label": _fmt_interval(s)} for s in ALLOWED_INTERVALS]
+    sort_options = [{"value": k, "label": v[0]} for k, v in SORT_OPTIONS.items()]
 
     return templates.TemplateResponse(
         request=request,
         name="index.html",
         context={
-            "monitors": monitors,
+            "monitors": result["items"],
+            "total": result["total"],
+            "page": page,
+            "pages": pages,
+            "sort": sort,
+            "order": result["order"],
+            "sort_options": sort_options,
             "interval": global_interval,
             "interval_label": _fmt_interval(global_interval),
             "interval_options": interval_options,
         },
+        headers=cache,
     )
 
 
+@router.get("/api/monitors")
+async def list_monitors(
+    request: Request,
+    sort: str = Query("added", description="排序: added/view/growth/title"),
+    order: str | None = Query(None, pattern="^(asc|desc)$", description="asc/desc，默认随排序方式"),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(PAGE_SIZE, ge=1, le=500),
+):
+    """监控列表（含视频信息与最新数据），支持排序与分页；列表未变化时按条件请求返回 304"""
+    cache = _list_validators()
+    if encoding.not_modified(request, cache):
+        return encoding.not_modified_response(cache)
+    try:
+        result = await _list_monitors(sort, order, page, page_size)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"success": False, "msg": str(e)})
+    return encoding.json_response(request, result, headers=cache)
+
+
 @router.post("/api/monitor")
 async def add_monitor(bvid: str):
     """添加监控 - 输入BV号开始监控"""
-    ok = await collect_one(bvid)
-    if not ok:
-        return {"success": False, "msg": "BV号无效或网络错误"}
-    DataStore.add_monitor(bvid)
-    add_video_job(bvid)
-    info = DataStore.get_info(bvid)
+    try:
+        await collect_one(bvid)
+    except BilibiliError as e:
+        return {"success": False, "msg": str(e)}
+    await adb.add_monitor(bvid)
+    await add_video_job(bvid)
+    info = await adb.get_info(bvid)
     return {"success": True, "msg": "已添加监控", "info": info}
 
 
 @router.delete("/api/monitor")
 async def remove_monitor(bvid: str):
     """移除监控"""
-    DataStore.remove_monitor(bvid)
+    await adb.remove_monitor(bvid)
     remove_video_job(bvid)
     return {"success": True, "msg": "已移除监控"}
 
 
+# /api/stats 的返回格式
+STATS_FORMATS = ("rows", "columnar")
+
+
+def _stats_count(stats: list[dict] | dict) -> int:
+    """逐行 / 列式统计数据的点数"""
+    return stats["count"] if isinstance(stats, dict) else len(stats)
+
+
+def _last_timestamp(stats: list[dict] | dict) -> str | None:
+    """逐行 / 列式统计数据最后一个点的时间（增量游标），没有数据时为 None"""
+    if isinstance(stats, dict):
+        return stats["last_timestamp"]
+    return stats[-1]["timestamp"] if stats else None
+
+
 @router.get("/api/stats/{bvid}")
 async def get_stats(
+    request: Request,
     bvid: str,
     range: str | None = Query(None, alias="range", description="时间范围: 1h/6h/24h/7d/30d/90d/all"),
     start: str | None = Query(None, description="起始时间 YYYY-MM-DD HH:mm:ss"),
     end: str | None = Query(None, description="结束时间 YYYY-MM-DD HH:mm:ss"),
     limit: int | None = Query(None, ge=1, description="最多返回最近N条（旧参数，兼容保留）"),
+    since: str | None = Query(None, description="增量游标：只返回该时间戳之后的新数据"),
+    downsample: str | None = Query(None, description="降采样方法: lttb（默认）/minmax/stride"),
+    format: str = Query("rows", alias="format", description="返回格式: rows（默认，逐行）/columnar（列式）"),
+    derived: bool = Query(False, description="附带增量、每小时增速、互动率等派生序列"),
 ):
     """获取视频统计数据（供趋势图使用）
 
-    优先使用 range / start+end 进行时间范围查询（自动降采样），
+    优先使用 range / start+end 进行时间范围查询（自动降采样，downsample 选择方法），
     若未指定则回退到 limit 参数或全量返回。
+
+    指定 since 时为增量模式：只返回游标之后的新数据，附带 range_start 供前端
+    裁剪过期数据点。新增数据超过 max_points 时返回 reset=true，前端应重新全量拉取。
+
+    format=columnar 时 stats 为列式对象（每个指标一个数组，时间为起点 + 差分，
+    见 DataStore._to_columns），体积约为逐行格式的三分之一；响应按 Accept-Encoding 压缩。
+
+    derived=true 时附带派生序列（相邻两点的增量、按时间间隔折算的每小时增速、
+    点赞 / 投币 / 收藏与播放量之比，见 store._derive），增量模式下第一个点与游标处的点比较。
+
+    响应带 ETag（最新数据时间 + 视频信息 + 保留水位，相对时间范围再加上取整后的窗口起点）
+    与 Last-Modified（相对时间范围不提供），条件请求在数据未变化时直接返回 304，不执行范围查询。
     """
-    if range is not None or start is not None:
-        stats = DataStore.get_stats_ranged(bvid, range_str=range, start=start, end=end)
-    else:
-        stats = DataStore.get_stats(bvid, limit=limit)
-    info = DataStore.get_info(bvid)
-    return {"info": info, "stats": stats}
+    if format not in STATS_FORMATS:
+        return JSONResponse(status_code=400, content={
+            "success": False, "msg": f"无效的返回格式: {format!r}，可选 {'/'.join(STATS_FORMATS)}",
+        })
+    columnar = format == "columnar"
+    max_points = DataStore.MAX_POINTS
+    range_start, _ = DataStore.resolve_time_range(range, start, end)
+
+    # 先取版本再查询：查询结果不会比校验值旧；数据与视频信息都未变化时直接返回 304。
+    # 相对时间范围（如 24h）的窗口随时间滑动：起点计入 ETag，且不提供无法表达窗口变化的 Last-Modified
+    relative = range is not None and range_start is not None
+    version = await adb.get_stats_version(bvid, range_start if relative else None)
+    cache = {}
+    if version:
+        ts, crc, window = version
+        etag = f"{ts}-{crc:x}" + (f"-{window}" if relative else "")
+        cache = encoding.validators(etag, None if relative else ts)
+    if cache and encoding.not_modified(request, cache):
+        return encoding.not_modified_response(cache)
+
+    try:
+        if since is not None:
+            stats = await adb.get_stats_since(bvid, since, end=end, limit=max_points + 1,
+                                              columnar=columnar, derived=derived)
+            if _stats_count(stats) > max_points:
+                return encoding.json_response(request, {
+                    "stats": DataStore.format_stats(bvid, [], columnar, derived),
+                    "cursor": since, "range_start": range_start,
+                    "max_points": max_points, "reset": True,
+                }, headers=cache)
+            return encoding.json_response(request, {
+                "stats": stats, "cursor": _last_timestamp(stats) or since,
+                "range_start": range_start, "max_points": max_points, "reset": False,
+            }, headers=cache)
+
+        if range is not None or start is not None:
+            stats = await adb.get_stats_ranged(bvid, range_str=range, start=start, end=end,
+                                               method=downsample, columnar=columnar,
+                                               derived=derived)
+        else:
+            stats = await adb.get_stats(bvid, limit=limit, columnar=columnar, derived=derived)
+    except ValueError as e:
+        # 时间参数格式不合法
+        return JSONResponse(status_code=400, content={"success": False, "msg": str(e)})
+
+    info = await adb.get_info(bvid)
+    return encoding.json_response(request, {
+        "info": info, "stats": stats, "cursor": _last_timestamp(stats),
+        "range_start": range_start, "max_points": max_points,
+    }, headers=cache)
+
+
+class BatchStatsBody(BaseModel):
+    bvids: list[str]
+    range: str | None = None
+    start: str | None = None
+    end: str | None = None
+    downsample: str | None = None
+    format: str = "rows"
+    derived: bool = False
+
+
+@router.post("/api/stats/batch")
+async def get_stats_batch(request: Request, body: BatchStatsBody):
+    """批量获取多个视频同一时间范围的统计数据（供多视频对比 / 大屏使用）
+
+    参数含义同 GET /api/stats/{bvid} 的范围查询（含 derived），所有视频在一次集合查询中完成
+    （见 DataStore.get_stats_batch）。响应为 NDJSON：按 bvids 顺序每行一个视频
+    {"bvid", "stats", "cursor", "range_start", "max_points"}，逐行流式返回并按 Accept-Encoding 压缩。
+    """
+    if body.format not in STATS_FORMATS:
+        return JSONResponse(status_code=400, content={
+            "success": False, "msg": f"无效的返回格式: {body.format!r}，可选 {'/'.join(STATS_FORMATS)}",
+        })
+    bvids = list(dict.fromkeys(b.strip() for b in body.bvids if b.strip()))
+    if not bvids or len(bvids) > DataStore.BATCH_MAX:
+        return JSONResponse(status_code=400, content={
+            "success": False, "msg": f"bvids 应包含 1~{DataStore.BATCH_MAX} 个视频",
+        })
+    max_points = DataStore.MAX_POINTS
+    range_start, _ = DataStore.resolve_time_range(body.range, body.start, body.end)
+    try:
+        results = await adb.get_stats_batch(
+            bvids, range_str=body.range, start=body.start, end=body.end,
+            method=body.downsample, columnar=body.format == "columnar", derived=body.derived,
+        )
+    except ValueError as e:
+        # 时间参数或降采样方法不合法
+        return JSONResponse(status_code=400, content={"success": False, "msg": str(e)})
+
+    return encoding.ndjson_response(request, (
+        {"bvid": bvid, "stats": stats, "cursor": _last_timestamp(stats),
+         "range_start": range_start, "max_points": max_points}
+        for bvid, stats in results
+    ))
+
+
+@router.get("/api/leaderboard")
+async def get_leaderboard(
+    metric: str = Query("view", description="指标: view/like/coin/favorite/share/danmaku/reply"),
+    window: str = Query("1h", description="时间窗口: 10m/1h/6h/24h/7d/30d"),
+    limit: int = Query(10, ge=1, le=MAX_LEADERBOARD, description="返回条数"),
+):
+    """涨幅排行：全部监控视频中窗口内指标增量最大的视频（见 app/leaderboard.py）"""
+    try:
+        return {"metric": metric, "window": window,
+                "items": await leaderboard.top(metric, window, limit)}
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"success": False, "msg": str(e)})
+
+
+# ── 告警规则 ──
+
+class AlertRuleBody(BaseModel):
+    bvid: str | None = None     # 不填作用于所有视频
+    metric: str = "view"
+    window: str | None = None   # 不填为累计值达到阈值，否则为窗口内增量达到阈值
+    threshold: int
+
+
+def _rule_out(rule: dict) -> dict:
+    return {**rule, "window": window_label(rule["window"])}
+
+
+@router.get("/api/alerts/rules")
+async def get_alert_rules():
+    """告警规则列表"""
+    return {"rules": [_rule_out(r) for r in await adb.get_alert_rules()]}
+
+
+@router.post("/api/alerts/rules")
+async def add_alert_rule(body: AlertRuleBody):
+    """添加告警规则（见 app/alerts.py）"""
+    try:
+        window = window_seconds(body.window)
+        rule = await adb.add_alert_rule(body.bvid or None, body.metric, window, body.threshold)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"success": False, "msg": str(e)})
+    alerts.add(Rule(rule["id"], rule["bvid"], rule["metric"], rule["window"], rule["threshold"]))
+    return {"success": True, "msg": "已添加告警规则", "rule": _rule_out(rule)}
+
+
+@router.delete("/api/alerts/rules/{rule_id}")
+async def remove_alert_rule(rule_id: int):
+    """删除告警规则"""
+    if not await adb.remove_alert_rule(rule_id):
+        return JSONResponse(status_code=404, content={"success": False, "msg": "规则不存在"})
+    alerts.remove(rule_id)
+    return {"success": True, "msg": "已删除告警规则"}
+
+
+@router.get("/api/alerts")
+async def get_alerts(limit: int = Query(50, ge=1, le=alerts.recent.maxlen, description="返回条数")):
+    """最近触发的告警（新的在前）"""
+    return {"alerts": list(islice(alerts.recent, limit))}
+
+
+# ── 实时推送（SSE）──
+
+# 无数据时的心跳间隔（秒），用于保活连接并及时发现客户端断开
+_SSE_PING_SECONDS = 15
+
+
+def _sse_response(request: Request, bvids: list[str]) -> StreamingResponse:
+    """订阅 hub 并以 Server-Sent Events 形式推送新数据"""
+    sub = hub.subscribe(bvids)
+
+    async def event_stream():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    payload = await asyncio.wait_for(sub.get(), timeout=_SSE_PING_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": ping\n\n"
+                    continue
+                if payload is None:
+                    # 被判定为慢消费者或服务关闭，通知客户端增量补齐后重连
+                    yield "event: reset\ndata: {}\n\n"
+                    break
+                yield f"event: stat\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+        finally:
+            hub.unsubscribe(sub)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/api/stream/{bvid}")
+async def stream_stats(request: Request, bvid: str):
+    """实时推送单个视频的新采集数据"""
+    return _sse_response(request, [bvid])
+
+
+@router.get("/api/stream")
+async def stream_stats_multi(
+    request: Request,
+    bvids: str = Query(..., description="逗号分隔的 BV 号列表"),
+):
+    """实时推送多个视频的新采集数据（首页使用）"""
+    wanted = [b for b in (s.strip() for s in bvids.split(",")) if b]
+    return _sse_response(request, wanted)
 
 
 @router.get("/chart/{bvid}", response_class=HTMLResponse)
 async def chart_page(request: Request, bvid: str):
     """趋势图页面"""
-    info = DataStore.get_info(bvid)
-    effective_interval = DataStore.get_effective_interval(bvid)
+    info = await adb.get_info(bvid)
+    effective_interval = await adb.get_effective_interval(bvid)
+    if effective_interval == AUTO_INTERVAL:
+        # 自动间隔：按当前实际间隔刷新，未在采集计划中时取下限
+        effective_interval = collector.interval_of(bvid) or adaptive.min_interval
     return templates.TemplateResponse(
         request=request,
         name="chart.html",
@@ -134,12 +472,39 @@ async def chart_page(request: Request, bvid: str):
     )
 
 
+# ── 运行指标 ──
+
+@router.get("/api/metrics")
+async def get_metrics():
+    """运行指标：采集延迟 / 限速、上游请求结果与熔断状态、写入缓冲积压 / 刷盘耗时、响应压缩、涨幅排行缓存、告警评估与推送、热数据缓存命中、跳过写入的样本数、实时推送连接数等"""
+    return {
+        "collector": collector.metrics(),
+        "adaptive": adaptive.metrics(),
+        "upstream": client_metrics(),
+        "ingest": ingest.metrics(),
+        "encoding": encoding.metrics(),
+        "leaderboard": leaderboard.metrics(),
+        "alerts": alerts.metrics(),
+        "hot_cache": hot.metrics(),
+        "storage": {
+            "skip_unchanged": DataStore.SKIP_UNCHANGED,
+            "written": DataStore.written_samples,
+            "skipped": DataStore.skipped_samples,
+        },
+        "stream": {
+            "subscribers": hub.subscriber_count(),
+            "published": hub.published,
+            "dropped": hub.dropped,
+        },
+    }
+
+
 # ── 全局配置 API ──
 
 @router.get("/api/config")
 async def get_config():
     """获取全局配置"""
-    return DataStore.get_config()
+    return await adb.get_config()
 
 
 class IntervalBody(BaseModel):
@@ -153,9 +518,31 @@ async def set_interval(body: IntervalBody):
     if seconds not in ALLOWED_INTERVALS:
         return {"success": False, "msg": f"间隔必须是以下值之一: {ALLOWED_INTERVALS}"}
 
-    DataStore.set_config({"interval": seconds})
-    reschedule_default_videos(seconds)
-    return {"success": True, "msg": f"全局采集间隔已修改为 {seconds} 秒", "interval": seconds}
+    await adb.set_config({"interval": seconds})
+    await reschedule_default_videos(seconds)
+    return {"success": True, "msg": f"全局采集间隔已修改为 {_fmt_interval(seconds)}", "interval": seconds}
+
+
+class AutoBoundsBody(BaseModel):
+    auto_min: int
+    auto_max: int
+
+
+@router.put("/api/config/auto")
+async def set_auto_interval_bounds(body: AutoBoundsBody):
+    """修改自动间隔的上下限（秒）"""
+    lo, hi = AUTO_BOUNDS
+    if not lo <= body.auto_min <= body.auto_max <= hi:
+        return {"success": False, "msg": f"需满足 {lo} ≤ 下限 ≤ 上限 ≤ {hi}"}
+
+    await adb.set_config({"auto_min": body.auto_min, "auto_max": body.auto_max})
+    set_auto_bounds(body.auto_min, body.auto_max)
+    return {
+        "success": True,
+        "msg": f"自动间隔范围已修改为 {_fmt_interval(body.auto_min)} ~ {_fmt_interval(body.auto_max)}",
+        "auto_min": body.auto_min,
+        "auto_max": body.auto_max,
+    }
 
 
 # ── 单视频间隔 API ──
@@ -171,14 +558,15 @@ async def set_video_interval(bvid: str, body: VideoIntervalBody):
     if seconds is not None and seconds not in ALLOWED_INTERVALS:
         return {"success": False, "msg": f"间隔必须是以下值之一: {ALLOWED_INTERVALS}"}
 
-    DataStore.set_video_interval(bvid, seconds)
-    effective = DataStore.get_effective_interval(bvid)
+    await adb.set_video_interval(bvid, seconds)
+    effective = await adb.get_effective_interval(bvid)
     reschedule_video(bvid, effective)
 
     return {
         "success": True,
-        "msg": f"已设为 {_fmt_interval(effective)}" if seconds else f"已跟随全局（{_fmt_interval(effective)}）",
+        "msg": f"已设为 {_fmt_interval(effective)}" if seconds is not None
+               else f"已跟随全局（{_fmt_interval(effective)}）",
         "effective_interval": effective,
-        "effective_label": _fmt_interval(effective),
+        "effective_label": _interval_label(bvid, effective),
         "is_custom": seconds is not None,
     }
@@ -4,86 +4,168 @@
 - 与 FastAPI 共享事件循环，无需额外线程池（省 ~10MB）
 - 采集任务直接以协程运行，不再为每次采集创建/销毁事件循环
 - 可与共享 httpx 客户端协同，复用连接池
+
+视频采集由采集引擎（collector）统一调度：相位错开、全局限速与并发控制；
+APScheduler 只负责每日清理与后台迁移等低频任务。
+
+采集间隔为 AUTO_INTERVAL（自动）的视频，每次采集成功后按数据变化速度调整间隔
+（见 collector.AdaptiveInterval），上下限取自全局配置 auto_min / auto_max。
 """
 
+import asyncio
+
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
-from .bilibili import fetch_video_stat, fetch_video_info
-from .store import DataStore
+from .alerts import alerts
+from .bilibili import BilibiliError, VideoInfo, VideoStat, breaker, fetch_video
+from .collector import adaptive, collector
+from .executor import adb, db_executor
+from .hub import hub
+from .ingest import ingest
+from .leaderboard import leaderboard
+from .ringbuf import hot
+from .store import AUTO_INTERVAL, release_partitions
 
 scheduler = AsyncIOScheduler()
 
+# 加载查询未命中的视频到热数据缓存的间隔（秒）
+HOT_LOAD_INTERVAL = 2
+
+# 已保存的视频信息（标题、封面等），用于判断采集时拿到的信息是否有变化
+_known_info: dict[str, VideoInfo] = {}
+
+
+async def _refresh_info(info: VideoInfo):
+    """视频信息有变化时才写入（采集顺带拿到，不额外请求）"""
+    if _known_info.get(info.bvid) != info:
+        await adb.save_info(info)
+        _known_info[info.bvid] = info
+
+
+async def _collect_video(bvid: str) -> bool:
+    """采集单个视频数据，返回是否成功"""
+    try:
+        info, stat = await fetch_video(bvid)
+    except BilibiliError:
+        return False  # 失败原因已按类型计数（见 bilibili.client_metrics）
+    ingest.put(stat)   # 写入缓冲，由后台批量落盘
+    hub.publish(stat)
+    leaderboard.observe(stat)
+    alerts.observe(stat)
+    if adaptive.tracks(bvid):
+        collector.retime(bvid, adaptive.observe(bvid, stat.view, stat.like))
+    await _refresh_info(info)
+    return True
 
-def _job_id(bvid: str) -> str:
-    return f"collect_{bvid}"
 
+def _schedule(bvid: str, interval: int, growth: float | None = None):
+    """按配置的间隔加入采集计划，AUTO_INTERVAL 时由自动间隔给出初始值"""
+    if interval == AUTO_INTERVAL:
+        interval = adaptive.track(bvid, growth)
+    else:
+        adaptive.forget(bvid)
+    collector.schedule(bvid, interval)
+
+
+async def _cleanup_data():
+    """定时数据归档清理（每天凌晨 3:00）：分段在写线程中执行，每段之间让出写线程给采集写入；
+    清理完成后删除待删除的分区文件，再按配置逐步归还空闲页"""
+    while not await adb.cleanup_step():
+        await asyncio.sleep(0.05)
+    # 清理删除的分区文件：先让各读线程 DETACH，再删除文件
+    if not await adb.drop_retired_partitions():
+        await db_executor.each_reader(release_partitions)
+        await adb.drop_retired_partitions()
+    if (await adb.get_config()).get("retention_vacuum", True):
+        while not await adb.vacuum_step():
+            await asyncio.sleep(0.05)
+
+
+async def _background_migrations():
+    """后台分批迁移旧 video_stats 表、回填预聚合表，再把主库中的原始数据迁入按月分区
+    （每批之间让出写线程给采集写入；回填只读主库，必须先于分区迁移完成）；
+    全部完成后预热热数据缓存，并定期加载查询未命中的视频"""
+    while not await adb.migrate_legacy_step():
+        await asyncio.sleep(0.05)
+    while not await adb.backfill_rollups_step():
+        await asyncio.sleep(0.05)
+    while not await adb.partition_step():
+        await asyncio.sleep(0.05)
+    await _warm_hot(startup=True)
+    scheduler.add_job(
+        _warm_hot, "interval", seconds=HOT_LOAD_INTERVAL,
+        id="warm_hot", replace_existing=True,
+    )
 
-async def _collect_video(bvid: str):
-    """采集单个视频数据"""
-    stat = await fetch_video_stat(bvid)
-    if stat:
-        DataStore.save_stat(stat)
 
+async def _warm_hot(startup: bool = False):
+    """加载热数据缓存（每批之间让出写线程），非启动时没有待加载的视频则直接返回"""
+    if not startup and not hot.has_wanted():
+        return
+    while not await adb.warm_hot_step():
+        await asyncio.sleep(0.05)
 
-def _cleanup_data():
-    """定时数据归档清理（每天凌晨 3:00）"""
-    DataStore.cleanup_old_data()
 
+async def collect_one(bvid: str):
+    """采集单个视频数据（供API调用，一次请求同时保存视频信息与统计数据，立即落盘）
 
-async def collect_one(bvid: str) -> bool:
-    """采集单个视频数据（供API调用，含首次视频信息获取）"""
-    if not DataStore.get_info(bvid):
-        info = await fetch_video_info(bvid)
-        if not info:
-            return False
-        DataStore.save_info(info)
+    失败时抛出 BilibiliError，异常信息说明原因。
+    """
+    info, stat = await fetch_video(bvid)
+    await _refresh_info(info)
+    await adb.save_stat(stat)
+    hub.publish(stat)
+    leaderboard.observe(stat)
+    alerts.observe(stat)
 
-    stat = await fetch_video_stat(bvid)
-    if not stat:
-        return False
-    DataStore.save_stat(stat)
-    return True
 
-
-def add_video_job(bvid: str):
-    """为视频添加定时采集任务"""
-    interval = DataStore.get_effective_interval(bvid)
-    jid = _job_id(bvid)
-    if scheduler.get_job(jid):
-        scheduler.remove_job(jid)
-    scheduler.add_job(
-        _collect_video, "interval", seconds=interval,
-        id=jid, args=[bvid], replace_existing=True,
-    )
+async def add_video_job(bvid: str):
+    """将视频加入采集计划（间隔经读线程池查询）"""
+    _schedule(bvid, await adb.get_effective_interval(bvid))
 
 
 def remove_video_job(bvid: str):
-    """移除视频的定时采集任务"""
-    jid = _job_id(bvid)
-    if scheduler.get_job(jid):
-        scheduler.remove_job(jid)
+    """将视频移出采集计划"""
+    collector.unschedule(bvid)
+    adaptive.forget(bvid)
+    leaderboard.forget(bvid)
+    alerts.forget(bvid)
+    _known_info.pop(bvid, None)
 
 
 def reschedule_video(bvid: str, seconds: int):
     """修改单个视频的采集间隔"""
-    jid = _job_id(bvid)
-    if scheduler.get_job(jid):
-        scheduler.reschedule_job(jid, trigger="interval", seconds=seconds)
-    else:
-        add_video_job(bvid)
-
-
-def reschedule_default_videos(seconds: int):
-    """全局默认间隔变更时，更新所有跟随全局的视频"""
-    for bvid in DataStore.get_monitored_bvids():
-        if DataStore.get_video_interval(bvid) is None:
-            reschedule_video(bvid, seconds)
-
-
-def start_scheduler():
-    """启动调度器，为每个已监控视频创建独立采集任务"""
-    for bvid in DataStore.get_monitored_bvids():
-        add_video_job(bvid)
+    _schedule(bvid, seconds)
+
+
+async def reschedule_default_videos(seconds: int):
+    """全局默认间隔变更时，更新所有跟随全局的视频（监控列表经读线程池查询）"""
+    for m in await adb.get_monitors():
+        if m["interval"] is None:
+            reschedule_video(m["bvid"], seconds)
+
+
+def set_auto_bounds(min_interval: int, max_interval: int):
+    """修改自动间隔的上下限，超出新范围的视频立即改期"""
+    for bvid, seconds in adaptive.set_bounds(min_interval, max_interval).items():
+        collector.retime(bvid, seconds)
+
+
+async def start_scheduler():
+    """启动采集引擎与调度器，将所有已监控视频加入采集计划"""
+    config = await adb.get_config()
+    adaptive.set_bounds(config["auto_min"], config["auto_max"])
+    alerts.load(await adb.get_alert_rules())
+    for m in await adb.get_monitors():
+        interval = m["interval"] if m["interval"] is not None else config["interval"]
+        _schedule(m["bvid"], interval, m["growth"])
+        if m["info"]:
+            _known_info[m["bvid"]] = VideoInfo(**m["info"])
+        if m["latest_stat"]:
+            stat = VideoStat(**m["latest_stat"])
+            leaderboard.observe(stat)
+            alerts.observe(stat)  # 只建立水位，不会触发
+    collector.start(_collect_video, gate=breaker.retry_after)
 
     # 每天凌晨 3:00 执行数据归档清理
     scheduler.add_job(
@@ -91,10 +173,14 @@ def start_scheduler():
         id="cleanup_data", replace_existing=True,
     )
 
+    # 启动后立即在后台迁移旧表数据、回填预聚合表、迁入分区（均已完成时第一步即返回）
+    scheduler.add_job(_background_migrations, id="background_migrations", replace_existing=True)
+
     scheduler.start()
 
 
-def shutdown_scheduler():
-    """关闭调度器"""
+async def shutdown_scheduler():
+    """关闭采集引擎与调度器"""
+    await collector.stop()
     if scheduler.running:
         scheduler.shutdown(wait=False)
@@ -1,24 +1,62 @@
-"""数据存储模块 - SQLite + JSON 持久化
+"""数据存储模块 - SQLite 持久化
 
 文件结构：
-  data/stats.db           统计数据（SQLite，所有视频共用）
-  data/{bvid}.json        视频元信息 + 采集间隔（小文件，低频读写）
-  data/_config.json        全局配置
-  data/_monitors.json      监控列表
+  data/stats.db           视频元信息、监控列表、全局配置、最新数据与预聚合数据（SQLite，所有视频共用）
+  data/stats-YYYYMM.db    原始统计数据按月（UTC）分区，每个文件一张 stats 表，按需 ATTACH；
+                          查询只涉及与时间范围重叠的分区，删除整月原始数据只需删除文件
+
+表结构：
+  videos  (id, bvid, title, pic, owner_name,  BV 号 → 整数主键，同时保存视频元信息、专属采集间隔
+           desc, interval, monitor_seq)       （NULL 跟随全局）与监控顺序（NULL 表示未监控）
+  config  (key, value)                        全局配置，value 为 JSON 编码
+  latest_stats (video_id, ts, view, ...,      每个视频最新一条统计数据及上一条的时间与播放量，
+                prev_ts, prev_view,           写入时同步更新，首页一次查询即可取得所有视频的最新值；
+                stored_ts)                    stored_ts 为 stats 中该视频最新一条的时间
+  stats   (video_id, ts, view, like, ...)     （分区文件中）按 (video_id, ts) 聚簇的 WITHOUT ROWID 表，
+                                              ts 为整数 epoch 秒；对外仍返回 "YYYY-MM-DD HH:mm:ss"。
+                                              与上一条完全相同的样本不写入（见 SKIP_UNCHANGED）
+  stats_1m / stats_5m / stats_1h / stats_1d   预聚合表：每个视频每个时间桶一行，记录各指标的
+                                              first / last / min / max，写入原始数据时同步更新
+  meta    (key, value)                        内部状态（后台任务进度等）
+  retention (video_id, width, done_ts)        归档清理水位：该视频 done_ts 之前的原始数据
+                                              已按 width 秒一条压缩过，之后的清理不再重复扫描
+  archive (video_id, month, first_ts,         冷数据：早于 90 天的整月原始数据，每个视频每月一行，
+           last_ts, samples, data)            data 为差分 + zlib 压缩的列式数据块（见 archive 模块），
+                                              查询时解码后与原始数据拼接
+  alert_rules (id, bvid, metric, "window",    告警规则：bvid 为 NULL 时作用于所有视频，window 为 0 表示
+               threshold, created_ts)         累计值达到阈值，否则为 window 秒内的增量达到阈值（见 alerts 模块）
+
+热数据缓存：
+  各视频最近几小时的原始数据另在内存中保存一份（见 ringbuf 模块），写入时同步追加，
+  近期范围查询、增量查询与最新值查询优先从内存读取
 
 迁移说明：
   启动时自动检测旧格式数据并迁移到 SQLite：
-  - 旧 JSON 文件中的 stats 数组 → SQLite
+  - 旧 JSON 元信息文件（_config.json / _monitors.json / {bvid}.json，含内嵌的 stats 数组）
+    → config / videos / stats 表，一次性导入，完成后重命名为 .json.bak
   - JSONL 文件 → SQLite（完成后重命名为 .jsonl.bak）
+  - 旧 video_stats 表（TEXT 时间戳）→ stats 表：后台分批在线迁移，每批在一个事务中
+    “复制 + 删除”，中断后重启可从剩余数据继续；迁移完成前查询同时读取旧表中剩余的数据，
+    全部迁移完成后旧表留空，下次启动（尚无查询时）再删除
+  - 主库中的 stats 表（分区之前的原始数据）→ 按月分区文件：后台分批迁移，迁移完成前
+    查询同时读取主库 stats 表
 """
 
+import calendar
 import json
 import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from itertools import groupby
+from operator import itemgetter
 from pathlib import Path
 from threading import Lock
 from dataclasses import asdict
 
+from . import archive, downsample, ringbuf
 from .bilibili import VideoStat, VideoInfo
 
 DATA_DIR = Path(__file__).resolve().parent.parent / "data"
@@ -26,20 +64,50 @@ DATA_DIR.mkdir(exist_ok=True)
 
 # 默认配置
 _DEFAULT_CONFIG = {
-    "interval": 30,  # 采集间隔（秒）
+    "interval": 30,    # 采集间隔（秒），AUTO_INTERVAL 表示自动
+    "auto_min": 10,    # 自动间隔下限（秒）
+    "auto_max": 3600,  # 自动间隔上限（秒）
 }
 
+# 采集间隔取此值表示自动：按数据变化速度在 [auto_min, auto_max] 之间调整
+AUTO_INTERVAL = 0
+
 # ── SQLite 数据库 ──
 
 _DB_PATH = DATA_DIR / "stats.db"
+
 _conn: sqlite3.Connection | None = None
 
+# 线程本地的只读连接（由数据库执行器的读线程池设置）
+_local = threading.local()
+_read_conns: list[sqlite3.Connection] = []
+
+
+class _Connection(sqlite3.Connection):
+    """记录已 ATTACH 的分区（月份 → None，按最近使用排序）的连接"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.partitions: OrderedDict[int, None] = OrderedDict()
+
 
 def _get_db() -> sqlite3.Connection:
-    """获取数据库连接（懒初始化，WAL 模式）"""
+    """获取当前线程应使用的数据库连接
+
+    读线程池中的线程使用各自的只读连接，其余情况使用共享的写连接。
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        return conn
+    return _get_write_db()
+
+
+def _get_write_db() -> sqlite3.Connection:
+    """获取写连接（懒初始化，WAL 模式）"""
     global _conn
     if _conn is None:
-        _conn = sqlite3.connect(str(_DB_PATH), check_same_thread=False)
+        _conn = sqlite3.connect(str(_DB_PATH), check_same_thread=False, factory=_Connection)
+        _conn.execute("PRAGMA auto_vacuum=INCREMENTAL")  # 新建库：清理后可逐步归还空间
         _conn.execute("PRAGMA journal_mode=WAL")        # 读写并发
         _conn.execute("PRAGMA synchronous=NORMAL")       # 平衡性能与安全
         _conn.execute("PRAGMA cache_size=-2000")         # 2MB 缓存
@@ -48,12 +116,73 @@ def _get_db() -> sqlite3.Connection:
     return _conn
 
 
+# videos 表的元信息列（列名 → 类型声明）
+_VIDEO_META_COLUMNS = {
+    "title":       "TEXT",     # 以下四列为 NULL 表示尚未获取视频信息
+    "pic":         "TEXT",
+    "owner_name":  "TEXT",
+    "desc":        "TEXT",
+    "interval":    "INTEGER",  # 专属采集间隔（秒），NULL 跟随全局默认，0 为自动
+    "monitor_seq": "INTEGER",  # 在监控列表中的顺序，NULL 表示未监控
+}
+_VIDEO_META_DDL = ",\n            ".join(f'"{k}" {v}' for k, v in _VIDEO_META_COLUMNS.items())
+_INFO_COLS = 'title, pic, owner_name, "desc"'
+
+# 原始数据表（主库与各分区文件结构相同）
+_STATS_DDL = """
+    CREATE TABLE IF NOT EXISTS {schema}stats (
+        video_id  INTEGER NOT NULL,
+        ts        INTEGER NOT NULL,
+        view      INTEGER NOT NULL,
+        "like"    INTEGER NOT NULL,
+        coin      INTEGER NOT NULL,
+        favorite  INTEGER NOT NULL,
+        share     INTEGER NOT NULL,
+        danmaku   INTEGER NOT NULL,
+        reply     INTEGER NOT NULL,
+        PRIMARY KEY (video_id, ts)
+    ) WITHOUT ROWID
+"""
+
+
 def _init_tables(conn: sqlite3.Connection):
-    """创建表结构和索引"""
+    """创建表结构
+
+    stats 以 (video_id, ts) 为主键的 WITHOUT ROWID 表：数据按视频、时间聚簇存放，
+    主键即索引，不再需要单独的 (bvid, timestamp) 索引，也不再每行重复存储 BV 号文本。
+    """
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS videos (
+            id   INTEGER PRIMARY KEY,
+            bvid TEXT    NOT NULL UNIQUE,
+            {_VIDEO_META_DDL}
+        )
+    """)
+    # 旧库的 videos 表只有 (id, bvid)，补齐元信息列
+    existing = {r[1] for r in conn.execute("PRAGMA table_info(videos)")}
+    for name, decl in _VIDEO_META_COLUMNS.items():
+        if name not in existing:
+            conn.execute(f'ALTER TABLE videos ADD COLUMN "{name}" {decl}')
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_videos_monitor ON videos (monitor_seq) "
+        "WHERE monitor_seq IS NOT NULL"
+    )
+    conn.execute(_STATS_DDL.format(schema="main."))
+    for table in _ROLLUPS.values():
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                video_id  INTEGER NOT NULL REFERENCES videos (id),
+                bucket    INTEGER NOT NULL,
+                first_ts  INTEGER NOT NULL,
+                last_ts   INTEGER NOT NULL,
+                {_ROLLUP_METRIC_DDL},
+                PRIMARY KEY (video_id, bucket)
+            ) WITHOUT ROWID
+        """)
     conn.execute("""
-        CREATE TABLE IF NOT EXISTS video_stats (
-            id        INTEGER PRIMARY KEY AUTOINCREMENT,
-            bvid      TEXT    NOT NULL,
+        CREATE TABLE IF NOT EXISTS latest_stats (
+            video_id  INTEGER PRIMARY KEY REFERENCES videos (id),
+            ts        INTEGER NOT NULL,
             view      INTEGER NOT NULL,
             "like"    INTEGER NOT NULL,
             coin      INTEGER NOT NULL,
@@ -61,106 +190,606 @@ def _init_tables(conn: sqlite3.Connection):
             share     INTEGER NOT NULL,
             danmaku   INTEGER NOT NULL,
             reply     INTEGER NOT NULL,
-            timestamp TEXT    NOT NULL
+            prev_ts   INTEGER,
+            prev_view INTEGER,
+            stored_ts INTEGER
+        ) WITHOUT ROWID
+    """)
+    # 旧库的 latest_stats 表没有 stored_ts 列（NULL 表示最新一条已写入 stats）
+    if "stored_ts" not in {r[1] for r in conn.execute("PRAGMA table_info(latest_stats)")}:
+        conn.execute("ALTER TABLE latest_stats ADD COLUMN stored_ts INTEGER")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS config (
+            key   TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS meta (
+            key   TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS retention (
+            video_id  INTEGER NOT NULL REFERENCES videos (id),
+            width     INTEGER NOT NULL,
+            done_ts   INTEGER NOT NULL,
+            PRIMARY KEY (video_id, width)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS archive (
+            video_id  INTEGER NOT NULL REFERENCES videos (id),
+            month     INTEGER NOT NULL,
+            first_ts  INTEGER NOT NULL,
+            last_ts   INTEGER NOT NULL,
+            samples   INTEGER NOT NULL,
+            data      BLOB    NOT NULL,
+            PRIMARY KEY (video_id, month)
         )
     """)
     conn.execute("""
-        CREATE INDEX IF NOT EXISTS idx_stats_bvid_ts
-        ON video_stats (bvid, timestamp)
+        CREATE TABLE IF NOT EXISTS alert_rules (
+            id         INTEGER PRIMARY KEY,
+            bvid       TEXT,
+            metric     TEXT    NOT NULL,
+            "window"   INTEGER NOT NULL,
+            threshold  INTEGER NOT NULL,
+            created_ts INTEGER NOT NULL
+        )
     """)
     conn.commit()
 
 
+# ── 预聚合（rollup）表 ──
+
+_METRICS = ("view", "like", "coin", "favorite", "share", "danmaku", "reply")
+
+# 时间桶宽度（秒） → 表名，按从细到粗排列
+_ROLLUPS: dict[int, str] = {
+    60:    "stats_1m",
+    300:   "stats_5m",
+    3600:  "stats_1h",
+    86400: "stats_1d",
+}
+
+# 各分辨率预聚合数据的保留时长（秒），None 表示永久保留
+_ROLLUP_RETENTION: dict[int, int | None] = {
+    60:    30 * 86400,
+    300:   180 * 86400,
+    3600:  None,
+    86400: None,
+}
+
+_ROLLUP_METRIC_DDL = ",\n                ".join(
+    f"{m}_{agg} INTEGER NOT NULL" for m in _METRICS for agg in ("first", "last", "min", "max")
+)
+
+# 单条样本并入时间桶：首次出现直接插入，否则按时间先后更新 first/last，取 min/max。
+# 各字段均为幂等合并，同一样本重复并入不影响结果（回填与实时写入可以重叠）。
+_ROLLUP_UPSERT = """
+    INSERT INTO {table} (video_id, bucket, first_ts, last_ts, %s)
+    VALUES (?, ?, ?, ?, %s)
+    ON CONFLICT (video_id, bucket) DO UPDATE SET
+        first_ts = min(first_ts, excluded.first_ts),
+        last_ts  = max(last_ts, excluded.last_ts),
+        %s
+""" % (
+    ", ".join(f"{m}_{agg}" for m in _METRICS for agg in ("first", "last", "min", "max")),
+    ", ".join("?" for _ in range(len(_METRICS) * 4)),
+    ",\n        ".join(
+        f"{m}_first = CASE WHEN excluded.first_ts < first_ts THEN excluded.{m}_first ELSE {m}_first END, "
+        f"{m}_last = CASE WHEN excluded.last_ts >= last_ts THEN excluded.{m}_last ELSE {m}_last END, "
+        f"{m}_min = min({m}_min, excluded.{m}_min), "
+        f"{m}_max = max({m}_max, excluded.{m}_max)"
+        for m in _METRICS
+    ),
+)
+
+
+def _rollup_params(vid: int, ts: int, values: tuple, width: int) -> tuple:
+    """单条样本 → 预聚合 upsert 参数"""
+    quad = tuple(v for v in values for _ in range(4))
+    return (vid, ts - ts % width, ts, ts, *quad)
+
+
+# 写入原始数据（主库或分区的 stats 表），同一视频同一秒的重复数据以后写入的为准
+_STATS_INSERT = (
+    'INSERT OR REPLACE INTO {table} (video_id, ts, view, "like", coin, favorite, share, danmaku, reply) '
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+# ── 最新数据表 ──
+
+# 样本更新最新值：只接受不早于当前最新值的样本；时间更新时把原最新值移入 prev_*
+# （SET 右侧引用的都是更新前的值）。最后一个参数为该样本写入后 stats 中最新一条的时间
+_LATEST_UPSERT = """
+    INSERT INTO latest_stats (video_id, ts, view, "like", coin, favorite, share, danmaku, reply, stored_ts)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (video_id) DO UPDATE SET
+        prev_ts   = CASE WHEN excluded.ts > ts THEN ts ELSE prev_ts END,
+        prev_view = CASE WHEN excluded.ts > ts THEN view ELSE prev_view END,
+        ts = excluded.ts, view = excluded.view, "like" = excluded."like", coin = excluded.coin,
+        favorite = excluded.favorite, share = excluded.share, danmaku = excluded.danmaku,
+        reply = excluded.reply, stored_ts = excluded.stored_ts
+    WHERE excluded.ts >= ts
+"""
+
+# 每小时播放增量（由最近两条数据计算），数据不足两条时为 NULL
+_GROWTH_SQL = "(l.view - l.prev_view) * 3600.0 / (l.ts - l.prev_ts)"
+
+# 监控列表排序方式 → 排序表达式
+_MONITOR_SORTS = {
+    "added":  "v.monitor_seq",
+    "view":   "l.view",
+    "growth": _GROWTH_SQL,
+    "title":  "v.title COLLATE NOCASE",
+}
+
+
+# ── 时间戳转换（库内存整数 epoch 秒，对外为本地时间字符串）──
+
+_TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+_TS_INPUT_FORMATS = (_TS_FORMAT, "%Y-%m-%d %H:%M", "%Y-%m-%d")
+
+def _ts_sql(col: str) -> str:
+    """SQL 中把 epoch 列还原为 "YYYY-MM-DD HH:mm:ss"（本地时间，与 datetime.now() 一致）"""
+    return f"strftime('%Y-%m-%d %H:%M:%S', {col}, 'unixepoch', 'localtime')"
+
+
+# 查询统计数据时读取的字段：对外返回的字段（不含 bvid，由调用方补上）+ epoch 秒 ts（列式格式使用）
+_STAT_COLS = f'view, "like", coin, favorite, share, danmaku, reply, {_ts_sql("ts")} AS timestamp, ts'
+# 逐行格式对外返回的字段
+_STAT_KEYS = (*_METRICS, "timestamp")
+
+# 从预聚合表读取时的字段：取每个时间桶的最后一个值，时间为桶内最后一条样本的时间
+_ROLLUP_STAT_COLS = (
+    ", ".join(f'{m}_last AS "{m}"' for m in _METRICS)
+    + f", {_ts_sql('last_ts')} AS timestamp, last_ts AS ts"
+)
+
+
+def _to_epoch(ts: str) -> int:
+    """本地时间字符串 → epoch 秒，格式不合法时抛出 ValueError"""
+    for fmt in _TS_INPUT_FORMATS:
+        try:
+            return int(datetime.strptime(ts, fmt).timestamp())
+        except ValueError:
+            continue
+    raise ValueError(f"无效的时间格式: {ts!r}，应为 YYYY-MM-DD HH:mm:ss")
+
+
+def _archived_stat(row: tuple) -> dict:
+    """归档数据行 (ts, view, like, ...) → 与 _STAT_COLS 相同字段的字典"""
+    return {
+        **dict(zip(_METRICS, row[1:])),
+        "timestamp": time.strftime(_TS_FORMAT, time.localtime(row[0])),
+        "ts": row[0],
+    }
+
+
+# 派生序列：图表展示的四项指标的逐点增量与每小时增速，以及点赞 / 投币 / 收藏与播放量之比
+_RATE_METRICS = ("view", "like", "coin", "favorite")
+_RATIO_METRICS = ("like", "coin", "favorite")
+
+
+def _derive(ts: list[int], cols: dict[str, list], prev=None) -> dict[str, list]:
+    """列式数组 → 派生序列（每个都与 ts 等长），逐列整体计算，不逐行构造字典
+
+    {m}_delta 为与前一个点的差值；{m}_rate 为按两点实际时间间隔折算的每小时增量
+    （采集间隔会变化、降采样后的点也不等距，直接比较差值没有意义）；
+    {m}_per_view 为与播放量之比。第一个点与 prev（增量查询时为游标处的那一行）比较，
+    没有 prev 时增量与增速为 None。
+    """
+    ts_prev = [prev["ts"] if prev is not None else None, *ts[:-1]]
+    hours = [(b - a) / 3600 if a is not None and b > a else None for a, b in zip(ts_prev, ts)]
+    out = {}
+    for m in _RATE_METRICS:
+        values = cols[m]
+        deltas = [
+            b - a if a is not None else None
+            for a, b in zip([prev[m] if prev is not None else None, *values[:-1]], values)
+        ]
+        out[f"{m}_delta"] = deltas
+        out[f"{m}_rate"] = [
+            round(d / h, 2) if d is not None and h else None for d, h in zip(deltas, hours)
+        ]
+    views = cols["view"]
+    for m in _RATIO_METRICS:
+        out[f"{m}_per_view"] = [round(x / v, 6) if v else None for x, v in zip(cols[m], views)]
+    return out
+
+
+def open_read_db():
+    """为当前线程打开只读连接（读线程池初始化时调用）
+
+    WAL 模式下只读连接读取的是事务开始时的快照，不会被写入阻塞。
+    """
+    _get_write_db()  # 确保数据库文件与表结构已创建
+    conn = sqlite3.connect(
+        f"file:{_DB_PATH}?mode=ro", uri=True, check_same_thread=False, factory=_Connection
+    )
+    conn.execute("PRAGMA query_only=1")
+    conn.execute("PRAGMA cache_size=-2000")
+    conn.row_factory = sqlite3.Row
+    _local.conn = conn
+    _read_conns.append(conn)
+
+
 def close_db():
     """关闭数据库连接（应用退出时调用）"""
     global _conn
+    while _read_conns:
+        _read_conns.pop().close()
     if _conn:
         _conn.close()
         _conn = None
 
 
+# ── 按月分区的原始数据文件 ──
+
+# 每个连接最多同时 ATTACH 的分区数（SQLite 默认上限 10）
+_ATTACH_BUDGET = 8
+
+
+def _month_of(ts: int) -> int:
+    """epoch 秒 → 所在月份 YYYYMM（UTC）"""
+    t = time.gmtime(ts)
+    return t.tm_year * 100 + t.tm_mon
+
+
+def _month_start(month: int) -> int:
+    """月份 YYYYMM → 该月第一秒的 epoch 秒（UTC）"""
+    return calendar.timegm((month // 100, month % 100, 1, 0, 0, 0))
+
+
+def _next_month(month: int) -> int:
+    year, mon = divmod(month, 100)
+    return (year + 1) * 100 + 1 if mon == 12 else month + 1
+
+
+def _partition_path(month: int) -> Path:
+    return DATA_DIR / f"stats-{month}.db"
+
+
+# 待删除的分区月份：不再出现在分区列表中，查询不会再 ATTACH 它们；
+# 所有读连接都 DETACH 之后才删除文件（见 DataStore.drop_retired_partitions）
+_retired: set[int] = set()
+# 读连接 ATTACH 分区与写线程删除分区文件互斥，删除前确认没有读连接正在使用该文件
+_attach_lock = Lock()
+
+
+def _partition_months() -> list[int]:
+    """已存在且未待删除的分区月份（升序）"""
+    months = (int(p.stem[6:]) for p in DATA_DIR.glob("stats-[0-9][0-9][0-9][0-9][0-9][0-9].db"))
+    return sorted(m for m in months if m not in _retired)
+
+
+def _create_partition(path: Path):
+    """新建分区文件（独立连接，不受调用方事务影响）
+
+    与主库一样使用 auto_vacuum=INCREMENTAL，归档清理释放的空间可由 vacuum_step 逐步归还。
+    """
+    conn = sqlite3.connect(str(path))
+    try:
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")  # 必须在建表之前设置
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(_STATS_DDL.format(schema=""))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _attach(db: _Connection, months: list[int], create: bool = False) -> list[int]:
+    """确保分区已 ATTACH 到连接上（schema 名 pYYYYMM），返回实际可用的月份
+
+    create=True 时不存在的分区会被创建，否则跳过；create=False 时同样跳过待删除的分区。
+    超过 _ATTACH_BUDGET 时 DETACH 最久未用且本次不需要的分区；该分区在当前事务中写过时
+    先提交（分区写入均为幂等的 INSERT OR REPLACE / DELETE，提交点提前不影响重试）。
+    """
+    available = []
+    for month in months:
+        if month in db.partitions:
+            db.partitions.move_to_end(month)
+            available.append(month)
+            continue
+        path = _partition_path(month)
+        while len(db.partitions) >= _ATTACH_BUDGET:
+            old = next(m for m in db.partitions if m not in months)
+            try:
+                db.execute(f"DETACH p{old}")
+            except sqlite3.OperationalError:
+                db.commit()
+                db.execute(f"DETACH p{old}")
+            del db.partitions[old]
+        with _attach_lock:
+            if not create and (month in _retired or not path.exists()):
+                continue
+            if not path.exists():
+                _create_partition(path)
+            db.execute(f"ATTACH ? AS p{month}", (str(path),))
+            db.partitions[month] = None
+        if not db.in_transaction:
+            db.execute(f"PRAGMA p{month}.synchronous=NORMAL")
+        available.append(month)
+    return available
+
+
+def _detach_missing(db: _Connection, existing: list[int]):
+    """DETACH 文件已被删除或待删除的分区"""
+    for month in [m for m in db.partitions if m not in existing]:
+        try:
+            db.execute(f"DETACH p{month}")
+        except sqlite3.OperationalError:
+            continue
+        del db.partitions[month]
+
+
+def release_partitions():
+    """DETACH 当前线程读连接上已删除或待删除的分区（数据库执行器在每个读线程上调用）"""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        _detach_missing(conn, _partition_months())
+
+
+def _union_from(tables: list[str]) -> str | None:
+    """多个结构相同的表 → FROM 子句（UNION ALL 子查询），没有表时返回 None"""
+    if len(tables) <= 1:
+        return tables[0] if tables else None
+    return "(" + " UNION ALL ".join(f"SELECT * FROM {t}" for t in tables) + ")"
+
+
+def _range_cond(t0: int | None, t1: int | None, lo: int | None, hi: int | None) -> tuple[str, tuple]:
+    """ts 过滤条件：t0 ≤ ts ≤ t1（查询范围）且 lo ≤ ts < hi（数据源覆盖范围）"""
+    cond, params = "", ()
+    if lo is not None and (t0 is None or lo > t0):
+        t0 = lo
+    if t0 is not None:
+        cond += " AND ts >= ?"
+        params += (t0,)
+    if t1 is not None:
+        cond += " AND ts <= ?"
+        params += (t1,)
+    if hi is not None:
+        cond += " AND ts < ?"
+        params += (hi,)
+    return cond, params
+
+
+# 旧 video_stats 表（BV 号 + 本地时间 TEXT 时间戳）中尚未迁移的数据，列与 stats 表一致
+_LEGACY_SOURCE = """(
+    SELECT v.id AS video_id, CAST(strftime('%s', o.timestamp, 'utc') AS INTEGER) AS ts,
+           o.view, o."like", o.coin, o.favorite, o.share, o.danmaku, o.reply
+    FROM main.video_stats o JOIN videos v ON v.bvid = o.bvid
+)"""
+
+
 class DataStore:
     """线程安全的数据存储"""
 
     _lock = Lock()
 
-    # ── 配置 ──
+    # ── 变更版本 ──
+
+    # 每次提交会改变查询结果的写入后递增（进程内计数），作为首页等聚合视图的 HTTP 校验值
+    version = 0
 
     @classmethod
-    def _config_file(cls) -> Path:
-        return DATA_DIR / "_config.json"
+    def _commit(cls, db: sqlite3.Connection):
+        """提交并递增 version（先提交再递增：读到新版本号时一定能读到对应的数据）"""
+        db.commit()
+        cls.version += 1
+
+    # ── 配置 ──
 
     @classmethod
     def get_config(cls) -> dict:
         """获取全局配置"""
-        f = cls._config_file()
-        if not f.exists():
-            return dict(_DEFAULT_CONFIG)
-        with open(f, "r", encoding="utf-8") as fh:
-            cfg = json.load(fh)
-        # 补齐默认值
-        for k, v in _DEFAULT_CONFIG.items():
-            cfg.setdefault(k, v)
+        cfg = dict(_DEFAULT_CONFIG)
+        for key, value in _get_db().execute("SELECT key, value FROM config"):
+            cfg[key] = json.loads(value)
         return cfg
 
     @classmethod
     def set_config(cls, patch: dict):
-        """更新配置（合并写入）"""
+        """更新配置（合并写入，只写入变更的键）"""
+        db = _get_write_db()
         with cls._lock:
-            cfg = cls.get_config()
-            cfg.update(patch)
-            with open(cls._config_file(), "w", encoding="utf-8") as fh:
-                json.dump(cfg, fh, ensure_ascii=False, indent=2)
+            cls._put_config(db, patch)
+            cls._commit(db)
+
+    @classmethod
+    def _put_config(cls, db: sqlite3.Connection, patch: dict):
+        db.executemany(
+            "INSERT OR REPLACE INTO config (key, value) VALUES (?, ?)",
+            [(k, json.dumps(v, ensure_ascii=False)) for k, v in patch.items()],
+        )
+
+    # ── 视频 ID ──
+
+    _video_ids: dict[str, int] = {}
+
+    @classmethod
+    def _video_id(cls, db: sqlite3.Connection, bvid: str, create: bool = False) -> int | None:
+        """BV 号 → videos.id（带进程内缓存），create=True 时不存在则创建"""
+        vid = cls._video_ids.get(bvid)
+        if vid is not None:
+            return vid
+        if create:
+            db.execute("INSERT OR IGNORE INTO videos (bvid) VALUES (?)", (bvid,))
+        row = db.execute("SELECT id FROM videos WHERE bvid = ?", (bvid,)).fetchone()
+        if row is None:
+            return None
+        cls._video_ids[bvid] = row[0]
+        return row[0]
+
+    # 跳过未变化的样本：与该视频上一条完全相同的样本不写入 stats，只更新 latest_stats；
+    # 数据变化时先补写被跳过的最后一条（游程终点），读取时把仍未写入的最后一条补在末尾，
+    # 因此还原出的序列与逐条写入时一致。距上次写入超过 HEARTBEAT 秒时照常写入一条
+    SKIP_UNCHANGED = True
+    HEARTBEAT = 600
+
+    # 计数器（写线程内更新）
+    written_samples = 0   # 写入 stats 的样本数（含补写的游程终点）
+    skipped_samples = 0   # 因未变化而跳过的样本数
+
+    @classmethod
+    def _insert_rows(cls, db: sqlite3.Connection, rows: list[tuple]):
+        """写入统计数据（调用方负责加锁与提交）
 
-    # ── 文件路径 ──
+        rows 中每项为 (bvid, view, like, coin, favorite, share, danmaku, reply, timestamp)，
+        同一视频同一秒的重复数据以后写入的为准。最新数据表与预聚合表在同一事务中同步更新，
+        已加载的热数据缓存同步追加（见 ringbuf 模块）。
+        """
+        samples = [(cls._video_id(db, r[0], create=True), _to_epoch(r[8]), *r[1:8]) for r in rows]
+        if cls.SKIP_UNCHANGED:
+            writes, latest = cls._skip_unchanged(db, samples)
+        else:
+            writes, latest = samples, [(*s, s[1]) for s in samples]
+        if cls.PARTITIONED:
+            cls._write_partitions(db, writes)
+        else:
+            db.executemany(_STATS_INSERT.format(table="main.stats"), writes)
+        db.executemany(_LATEST_UPSERT, latest)
+        cls._update_rollups(db, writes)
+        cls.written_samples += len(writes)
+        ringbuf.hot.ingest(writes, latest)
 
     @classmethod
-    def _meta_file(cls, bvid: str) -> Path:
-        """视频元信息文件（info + interval）"""
-        return DATA_DIR / f"{bvid}.json"
+    def _skip_unchanged(cls, db: sqlite3.Connection, samples: list[tuple]) -> tuple[list, list]:
+        """按 latest_stats 中的最新值过滤样本
+
+        返回 (写入 stats 的样本, latest_stats upsert 参数)：
+        - 晚于最新值且各指标都相同、距上次写入不足 HEARTBEAT 秒：跳过，只更新最新值
+        - 晚于最新值但数据有变化：若之前有被跳过的样本，先补写最后一条，再写入本条
+        - 其余（首条、心跳、迟到的旧样本）照常写入
+        """
+        cursor = db.cursor()
+        cursor.row_factory = None
+        state = {
+            r[0]: (r[1], r[2:9], r[9] if r[9] is not None else r[1])
+            for r in cursor.execute(
+                'SELECT video_id, ts, view, "like", coin, favorite, share, danmaku, reply, stored_ts '
+                "FROM latest_stats WHERE video_id IN (SELECT value FROM json_each(?))",
+                (json.dumps(list({s[0] for s in samples})),),
+            )
+        }
+        writes, latest = [], []
+        for s in sorted(samples, key=itemgetter(1)):
+            vid, ts, values = s[0], s[1], s[2:]
+            last = state.get(vid)
+            if last is not None and ts > last[0]:
+                last_ts, last_values, stored_ts = last
+                if values == last_values:
+                    if ts - stored_ts < cls.HEARTBEAT:
+                        state[vid] = (ts, values, stored_ts)
+                        latest.append((*s, stored_ts))
+                        cls.skipped_samples += 1
+                        continue
+                elif last_ts > stored_ts:
+                    writes.append((vid, last_ts, *last_values))  # 游程终点
+            writes.append(s)
+            latest.append((*s, ts))
+            if last is None or ts >= last[0]:
+                state[vid] = (ts, values, ts)
+        return writes, latest
+
+    @classmethod
+    def _update_rollups(cls, db: sqlite3.Connection, samples: list[tuple]):
+        """将样本 (video_id, ts, view, like, ...) 并入各分辨率的预聚合表"""
+        for width, table in _ROLLUPS.items():
+            db.executemany(
+                _ROLLUP_UPSERT.format(table=table),
+                [_rollup_params(s[0], s[1], s[2:], width) for s in samples],
+            )
 
     # ── 旧格式迁移 ──
 
-    _migrated: set[str] = set()
+    @classmethod
+    def migrate_all(cls):
+        """启动时迁移旧格式文件（JSON / JSONL），避免读请求中途触发写入
+
+        旧 video_stats 表不在这里迁移（数据量可能很大，会拖慢启动），只登记仍有旧数据的视频，
+        由后台任务分批迁移（见 migrate_legacy_step），迁移完成前查询同时读取旧表。
+        """
+        cls._import_json_meta()
+        for path in sorted(DATA_DIR.glob("*_stats.jsonl")):
+            cls._migrate_jsonl(path.name.removesuffix("_stats.jsonl"))
+        cls._build_latest_stats()
+        cls._legacy_videos()
 
     @classmethod
-    def _ensure_migrated(cls, bvid: str):
-        """确保旧格式数据已迁移到 SQLite（每个 bvid 只检查一次）"""
-        if bvid not in cls._migrated:
-            cls._migrate_old_json(bvid)
-            cls._migrate_jsonl(bvid)
-            cls._migrated.add(bvid)
+    def _build_latest_stats(cls):
+        """一次性用已有数据填充 latest_stats 表（之后由写入同步维护）"""
+        db = _get_write_db()
+        if cls._get_meta(db, "latest_stats_built"):
+            return
+        with cls._lock:
+            db.execute("""
+                INSERT OR REPLACE INTO latest_stats
+                    (video_id, ts, view, "like", coin, favorite, share, danmaku, reply, prev_ts, prev_view)
+                SELECT s.video_id, s.ts, s.view, s."like", s.coin, s.favorite, s.share,
+                       s.danmaku, s.reply, p.ts, p.view
+                FROM videos v
+                JOIN main.stats s
+                  ON s.video_id = v.id
+                 AND s.ts = (SELECT MAX(ts) FROM main.stats WHERE video_id = v.id)
+                LEFT JOIN main.stats p
+                  ON p.video_id = v.id
+                 AND p.ts = (SELECT MAX(ts) FROM main.stats WHERE video_id = v.id AND ts < s.ts)
+            """)
+            cls._set_meta(db, "latest_stats_built", "1")
+            db.commit()
 
     @classmethod
-    def _migrate_old_json(cls, bvid: str):
-        """若旧 JSON 文件中包含 stats 数组，迁移到 SQLite 并清除"""
-        meta_path = cls._meta_file(bvid)
-        if not meta_path.exists():
+    def _import_json_meta(cls):
+        """一次性导入旧 JSON 元信息文件（配置、监控列表、各视频元信息及内嵌的 stats）
+
+        全部导入在一个事务中完成，提交后再将原文件重命名为 .json.bak；
+        中途失败时下次启动会整体重新导入（写入均为幂等的覆盖）。
+        """
+        db = _get_write_db()
+        if cls._get_meta(db, "json_meta_imported"):
             return
+        imported: list[Path] = []
         with cls._lock:
-            with open(meta_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            stats = data.pop("stats", None)
-            if stats is None:
-                return
-            # 将 stats 导入 SQLite
-            db = _get_db()
-            batch = []
-            for r in stats:
-                batch.append((
-                    r.get("bvid", bvid), r["view"], r["like"], r["coin"],
-                    r["favorite"], r["share"], r["danmaku"], r["reply"],
-                    r["timestamp"],
-                ))
-            if batch:
-                db.executemany(
-                    'INSERT INTO video_stats (bvid, view, "like", coin, favorite, share, danmaku, reply, timestamp) '
-                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', batch
-                )
-                db.commit()
-            # 回写元信息文件（已移除 stats）
-            with open(meta_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            config_file = DATA_DIR / "_config.json"
+            if config_file.exists():
+                cls._put_config(db, json.loads(config_file.read_text(encoding="utf-8")))
+                imported.append(config_file)
+
+            monitors_file = DATA_DIR / "_monitors.json"
+            if monitors_file.exists():
+                for bvid in json.loads(monitors_file.read_text(encoding="utf-8")):
+                    cls._set_monitored(db, bvid, True)
+                imported.append(monitors_file)
+
+            for meta_path in sorted(DATA_DIR.glob("*.json")):
+                if meta_path.name.startswith("_"):
+                    continue
+                bvid = meta_path.stem
+                data = json.loads(meta_path.read_text(encoding="utf-8"))
+                vid = cls._video_id(db, bvid, create=True)
+                if data.get("info"):
+                    cls._put_info(db, vid, data["info"])
+                if data.get("interval") is not None:
+                    db.execute("UPDATE videos SET interval = ? WHERE id = ?", (data["interval"], vid))
+                # 更早版本把统计数据内嵌在 stats 数组中
+                batch = [
+                    (r.get("bvid", bvid), r["view"], r["like"], r["coin"],
+                     r["favorite"], r["share"], r["danmaku"], r["reply"],
+                     r["timestamp"])
+                    for r in data.get("stats") or ()
+                ]
+                if batch:
+                    cls._insert_rows(db, batch)
+                imported.append(meta_path)
+
+            cls._set_meta(db, "json_meta_imported", "1")
+            db.commit()
+        for path in imported:
+            path.rename(path.with_suffix(".json.bak"))
 
     @classmethod
     def _migrate_jsonl(cls, bvid: str):
@@ -169,7 +798,7 @@ class DataStore:
         if not jsonl_path.exists():
             return
         with cls._lock:
-            db = _get_db()
+            db = _get_write_db()
             batch = []
             with open(jsonl_path, "r", encoding="utf-8") as f:
                 for line in f:
@@ -186,92 +815,653 @@ class DataStore:
                     except (json.JSONDecodeError, KeyError):
                         continue
             if batch:
-                db.executemany(
-                    'INSERT INTO video_stats (bvid, view, "like", coin, favorite, share, danmaku, reply, timestamp) '
-                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', batch
-                )
+                cls._insert_rows(db, batch)
                 db.commit()
             # 迁移完成，备份原文件
             jsonl_path.rename(jsonl_path.with_suffix(".jsonl.bak"))
 
+    # 旧 video_stats 表每批迁移的行数（每批一个短事务）
+    _LEGACY_CHUNK = 5000
+    # 旧表中仍有数据待迁移的视频（video_id → BV 号）；None 表示尚未检查。
+    # 非空时查询把旧表并入原始数据（见 _raw_from），归档清理推迟到迁移完成后
+    _legacy_pending: dict[int, str] | None = None
+
+    @classmethod
+    def _legacy_videos(cls) -> dict[int, str]:
+        """旧 video_stats 表中仍待迁移的视频（首次调用时从库中读取）
+
+        同时为这些视频建立 videos 行，并用旧表中的最后两条补上缺少的 latest_stats，
+        迁移完成前首页与最新值查询也能看到旧数据。
+        """
+        if cls._legacy_pending is None:
+            db = _get_write_db()
+            with cls._lock:
+                exists = db.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'video_stats'"
+                ).fetchone()
+                pending = {}
+                if exists and not db.execute("SELECT 1 FROM video_stats LIMIT 1").fetchone():
+                    # 上次运行时已迁移完的空表：首次调用在启动时（尚无查询引用它），此时删除
+                    db.execute("DROP TABLE video_stats")
+                    db.commit()
+                elif exists:
+                    db.execute("INSERT OR IGNORE INTO videos (bvid) SELECT DISTINCT bvid FROM video_stats")
+                    pending = dict(db.execute(
+                        "SELECT id, bvid FROM videos WHERE bvid IN (SELECT DISTINCT bvid FROM video_stats)"
+                    ).fetchall())
+                    latest = []
+                    for vid, bvid in pending.items():
+                        last, *prev = db.execute(
+                            'SELECT view, "like", coin, favorite, share, danmaku, reply, timestamp '
+                            "FROM video_stats WHERE bvid = ? ORDER BY timestamp DESC LIMIT 2",
+                            (bvid,),
+                        ).fetchall()
+                        prev_ts, prev_view = (_to_epoch(prev[0][7]), prev[0][0]) if prev else (None, None)
+                        latest.append((vid, _to_epoch(last[7]), *last[:7], prev_ts, prev_view))
+                    db.executemany(
+                        'INSERT OR IGNORE INTO latest_stats (video_id, ts, view, "like", coin, favorite, '
+                        "share, danmaku, reply, prev_ts, prev_view) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        latest,
+                    )
+                    db.commit()
+                cls._legacy_pending = pending
+        return cls._legacy_pending
+
+    @classmethod
+    def _migrate_legacy_chunk(cls, vid: int, bvid: str) -> bool:
+        """迁移某视频最早的一批旧数据，返回该视频是否已全部迁移
+
+        复制与删除在同一事务中完成：旧表中剩下的始终是该视频尚未迁移的数据（迁移按时间
+        推进，旧表中剩余数据的起点即该视频的迁移水位），任何时刻中断都不会丢失或重复数据，
+        查询同时读取新旧两处也不会重复。
+        """
+        db = _get_write_db()
+        with cls._lock:
+            rows = db.execute(
+                'SELECT bvid, view, "like", coin, favorite, share, danmaku, reply, timestamp '
+                'FROM video_stats WHERE bvid = ? ORDER BY timestamp LIMIT ?',
+                (bvid, cls._LEGACY_CHUNK),
+            ).fetchall()
+            if rows:
+                cls._insert_rows(db, [tuple(r) for r in rows])
+                db.execute(
+                    "DELETE FROM video_stats WHERE bvid = ? AND timestamp <= ?",
+                    (bvid, rows[-1]["timestamp"]),
+                )
+                cls._commit(db)
+            done = len(rows) < cls._LEGACY_CHUNK
+            if done:
+                del cls._legacy_pending[vid]
+            return done
+
+    @classmethod
+    def migrate_legacy_step(cls) -> bool:
+        """后台迁移旧 video_stats 表的一步，返回 True 表示已全部完成
+
+        每次只迁移一批，由调用方循环调用，期间写入与查询照常进行。
+        最后一个视频迁移完成后查询即不再读取旧表。已清空的旧表不在运行期间删除：
+        读线程中可能仍有在此之前规划、引用旧表的查询，删除会使其报错；
+        下次启动时由 _legacy_videos 删除。
+        """
+        pending = cls._legacy_videos()
+        if pending:
+            cls._migrate_legacy_chunk(*next(iter(pending.items())))
+            return False
+        return True
+
+    # 预聚合回填每批处理的原始数据行数
+    _BACKFILL_CHUNK = 5000
+    # 预聚合表是否已完整（回填完成前查询只走原始数据）
+    _rollups_ready: bool | None = None
+
+    @classmethod
+    def _get_meta(cls, db: sqlite3.Connection, key: str) -> str | None:
+        row = db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    @classmethod
+    def _set_meta(cls, db: sqlite3.Connection, key: str, value: str):
+        db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    @classmethod
+    def _rollups_available(cls, db: sqlite3.Connection) -> bool:
+        """预聚合表是否已回填完成"""
+        if not cls._rollups_ready:
+            cls._rollups_ready = cls._get_meta(db, "rollup_backfill") == "done"
+        return cls._rollups_ready
+
+    @classmethod
+    def backfill_rollups_step(cls) -> bool:
+        """用已有原始数据回填预聚合表的一步，返回 True 表示已全部完成
+
+        按 (video_id, ts) 顺序分批重放原始数据，进度记录在 meta 表中，可中断续跑；
+        upsert 是幂等的，与实时写入重叠也不会重复累计。
+        只需读取主库 stats 表：写入分区文件的数据在写入时已同步并入预聚合表，
+        后台任务也保证回填完成后才开始把主库数据迁入分区。
+        """
+        db = _get_write_db()
+        with cls._lock:
+            state = cls._get_meta(db, "rollup_backfill")
+            if state == "done":
+                cls._rollups_ready = True
+                return True
+            vid, ts = map(int, state.split(":")) if state else (-1, -1)
+            rows = db.execute(
+                'SELECT video_id, ts, view, "like", coin, favorite, share, danmaku, reply '
+                "FROM main.stats WHERE (video_id, ts) > (?, ?) ORDER BY video_id, ts LIMIT ?",
+                (vid, ts, cls._BACKFILL_CHUNK),
+            ).fetchall()
+            if rows:
+                cls._update_rollups(db, [tuple(r) for r in rows])
+                last = rows[-1]
+                cls._set_meta(db, "rollup_backfill", f"{last[0]}:{last[1]}")
+            if len(rows) < cls._BACKFILL_CHUNK:
+                cls._set_meta(db, "rollup_backfill", "done")
+                cls._rollups_ready = True
+            db.commit()
+            return bool(cls._rollups_ready)
+
+    # ── 原始数据分区 ──
+
+    # 原始数据按月写入分区文件；False 时全部写入主库 stats 表
+    PARTITIONED = True
+    # 主库 stats 表迁入分区每批处理的行数
+    _PARTITION_CHUNK = 20_000
+    # 主库 stats 表中的数据是否已全部迁入分区
+    _partitioned: bool = False
+
+    @classmethod
+    def _main_stats_pending(cls, db: sqlite3.Connection) -> bool:
+        """主库 stats 表中是否可能有数据（未启用分区或迁移尚未完成）"""
+        if not cls.PARTITIONED:
+            return True
+        if not cls._partitioned:
+            cls._partitioned = cls._get_meta(db, "stats_partitioned") == "done"
+        return not cls._partitioned
+
+    @classmethod
+    def _raw_sources(
+        cls,
+        db: _Connection,
+        t0: int | None,
+        t1: int | None,
+    ) -> list[tuple[list[int], str, tuple]]:
+        """[t0, t1]（闭区间，None 表示不限）内原始数据的查询计划，按时间先后排列
+
+        返回 [(分区月份, ts 过滤条件, 参数)]：与范围重叠的分区每 _ATTACH_BUDGET 个一组，
+        过滤条件已限定在该组覆盖的月份内，各组结果互不重叠，依次拼接即为时间正序。
+        每组由 _raw_from 生成 FROM 子句，调用方需在处理下一组前读完该组结果。
+        """
+        if not cls.PARTITIONED:
+            return [([], *_range_cond(t0, t1, None, None))]
+        existing = _partition_months()
+        _detach_missing(db, existing)
+        months = [
+            m for m in existing
+            if (t1 is None or _month_start(m) <= t1)
+            and (t0 is None or _month_start(_next_month(m)) > t0)
+        ]
+        groups = [months[i:i + _ATTACH_BUDGET] for i in range(0, len(months), _ATTACH_BUDGET)] or [[]]
+        return [
+            (group,
+             *_range_cond(t0, t1,
+                          _month_start(group[0]) if i > 0 else None,
+                          _month_start(groups[i + 1][0]) if i + 1 < len(groups) else None))
+            for i, group in enumerate(groups)
+        ]
+
+    @classmethod
+    def _raw_tables(cls, db: _Connection, months: list[int]) -> list[str]:
+        """ATTACH 一组分区，返回其中原始数据表的表名（含尚未迁入分区的主库 stats 表）"""
+        tables = [f"p{m}.stats" for m in _attach(db, months)] if cls.PARTITIONED else []
+        if cls._main_stats_pending(db):
+            tables.append("main.stats")
+        return tables
+
+    @classmethod
+    def _raw_from(cls, db: _Connection, months: list[int]) -> str | None:
+        """ATTACH 一组分区并返回查询它们的 FROM 子句（多个表以 UNION ALL 拼接）
+
+        主库 stats 表中尚未迁入分区的数据、旧 video_stats 表中尚未迁移的数据并入每一组；
+        没有任何数据源时返回 None。
+        """
+        tables = cls._raw_tables(db, months)
+        if cls._legacy_pending:
+            tables.append(_LEGACY_SOURCE)
+        return _union_from(tables)
+
+    @classmethod
+    def _select_raw(
+        cls,
+        db: _Connection,
+        vid: int,
+        t0: int | None = None,
+        t1: int | None = None,
+        limit: int | None = None,
+        newest_first: bool = False,
+    ) -> list:
+        """读取 [t0, t1] 内的原始数据（_STAT_COLS），按时间排序，最多 limit 行
+
+        已归档的数据解码后视为最早的一段（归档的月份总是早于仍保存原始数据的月份）。
+        """
+        rows = []
+        if not newest_first:
+            archived = cls._archive_rows(db, vid, t0, t1)
+            rows = [_archived_stat(r) for r in (archived[:limit] if limit else archived)]
+        plan = cls._raw_sources(db, t0, t1)
+        for months, cond, params in reversed(plan) if newest_first else plan:
+            if limit and len(rows) >= limit:
+                return rows
+            src = cls._raw_from(db, months)
+            if src is None:
+                continue
+            sql = f"SELECT {_STAT_COLS} FROM {src} WHERE video_id = ?{cond} ORDER BY ts"
+            if newest_first:
+                sql += " DESC"
+            if limit:
+                sql += f" LIMIT {limit - len(rows)}"
+            rows += db.execute(sql, (vid, *params)).fetchall()
+        if newest_first and not (limit and len(rows) >= limit):
+            archived = cls._archive_rows(db, vid, t0, t1)
+            if limit:
+                archived = archived[len(rows) - limit:]
+            rows += [_archived_stat(r) for r in reversed(archived)]
+        return rows
+
+    @classmethod
+    def partition_step(cls) -> bool:
+        """把主库 stats 表中的旧数据迁入按月分区的一步，返回 True 表示已全部完成
+
+        按 (video_id, ts) 顺序每批复制 _PARTITION_CHUNK 行到对应分区后从主库删除；
+        复制为幂等的 INSERT OR REPLACE，中断后重启从剩余数据继续。完成后 VACUUM 可回收主库空间。
+        """
+        if not cls.PARTITIONED:
+            return True
+        db = _get_write_db()
+        with cls._lock:
+            if not cls._main_stats_pending(db):
+                return True
+            rows = db.execute(
+                'SELECT video_id, ts, view, "like", coin, favorite, share, danmaku, reply '
+                "FROM main.stats ORDER BY video_id, ts LIMIT ?",
+                (cls._PARTITION_CHUNK,),
+            ).fetchall()
+            cls._write_partitions(db, [tuple(r) for r in rows])
+            if rows:
+                db.execute(
+                    "DELETE FROM main.stats WHERE (video_id, ts) <= (?, ?)",
+                    (rows[-1][0], rows[-1][1]),
+                )
+            if len(rows) < cls._PARTITION_CHUNK:
+                cls._set_meta(db, "stats_partitioned", "done")
+                cls._partitioned = True
+            db.commit()
+            return cls._partitioned
+
+    @classmethod
+    def _write_partitions(cls, db: _Connection, samples: list[tuple]):
+        """样本 (video_id, ts, view, like, ...) 按月写入各分区（调用方负责加锁与提交）"""
+        by_month: dict[int, list[tuple]] = {}
+        for s in samples:
+            by_month.setdefault(_month_of(s[1]), []).append(s)
+        for month, rows in sorted(by_month.items()):
+            _attach(db, [month], create=True)
+            db.executemany(_STATS_INSERT.format(table=f"p{month}.stats"), rows)
+
+    @classmethod
+    def _drop_partitions(cls, db: _Connection, before: int, empty_only: bool = False) -> int:
+        """删除整月都早于 before 的分区，返回标记为待删除的分区数
+
+        empty_only=True 时只删除已没有数据的分区（数据均已归档）。分区先标记为待删除
+        （查询立即不再读取），文件在没有读连接 ATTACH 时才删除，其余由
+        drop_retired_partitions 在各读线程 DETACH 之后删除。
+        """
+        retired = 0
+        for month in _partition_months():
+            if _month_start(_next_month(month)) > before:
+                break
+            if empty_only:
+                _attach(db, [month])
+                if db.execute(f"SELECT 1 FROM p{month}.stats LIMIT 1").fetchone():
+                    continue
+            _retired.add(month)
+            retired += 1
+        if retired and not empty_only:
+            # 删除了仍有数据的分区：记下最后一个月份，使统计数据的 HTTP 校验值随之变化
+            cls._set_meta(db, "partitions_dropped", str(max(_retired)))
+            db.commit()
+        cls._unlink_retired(db)
+        return retired
+
+    @classmethod
+    def drop_retired_partitions(cls) -> bool:
+        """删除已没有读连接 ATTACH 的待删除分区文件，返回 True 表示已全部删除
+
+        由调用方在各读线程执行 release_partitions 之后调用。
+        """
+        db = _get_write_db()
+        with cls._lock:
+            return cls._unlink_retired(db)
+
+    @classmethod
+    def _unlink_retired(cls, db: _Connection) -> bool:
+        """删除待删除分区中没有读连接 ATTACH 的文件（调用方负责加锁）
+
+        仍被读连接 ATTACH 的分区保留到下次调用：直接删除正在使用的 WAL 库文件
+        （及其 -wal / -shm）可能让该连接读到错误的数据。
+        """
+        for month in sorted(_retired):
+            if month in db.partitions:
+                db.commit()
+                db.execute(f"DETACH p{month}")
+                del db.partitions[month]
+            with _attach_lock:
+                if any(month in conn.partitions for conn in _read_conns):
+                    continue
+                path = _partition_path(month)
+                for suffix in ("-wal", "-shm", ""):
+                    path.with_name(path.name + suffix).unlink(missing_ok=True)
+                _retired.discard(month)
+        return not _retired
+
+    # ── 冷数据归档 ──
+
+    # 归档清理把早于最粗一档保留策略的整月原始数据打包进 archive 表；False 时不归档
+    ARCHIVE = True
+
+    @classmethod
+    def _archive_rows(
+        cls,
+        db: sqlite3.Connection,
+        vid: int,
+        t0: int | None = None,
+        t1: int | None = None,
+    ) -> list[tuple]:
+        """解码 [t0, t1] 内的归档数据，返回按时间排序的 (ts, view, like, ...) 元组"""
+        cursor = db.cursor()
+        cursor.row_factory = None
+        cursor.execute(
+            "SELECT data FROM archive WHERE video_id = ? AND month BETWEEN ? AND ? "
+            "AND last_ts >= ? AND first_ts <= ? ORDER BY month",
+            (vid,
+             0 if t0 is None else _month_of(t0), 999999 if t1 is None else _month_of(t1),
+             -1 if t0 is None else t0, 2 ** 62 if t1 is None else t1),
+        )
+        rows = []
+        for (blob,) in cursor:
+            rows += archive.decode(blob)
+        if t0 is not None or t1 is not None:
+            lo = -1 if t0 is None else t0
+            hi = 2 ** 62 if t1 is None else t1
+            rows = [r for r in rows if lo <= r[0] <= hi]
+        return rows
+
+    @classmethod
+    def _archive_chunk(cls, db: _Connection, vid: int, now: int) -> bool:
+        """把视频最早的几个整月原始数据打包进 archive 表，没有待归档数据时返回 False
+
+        只处理整月都早于最粗一档保留线（已压缩为每小时一条）的月份，从最早的月份开始，
+        每步至多约 _CLEANUP_CHUNK 行；归档的月份总是早于仍保存原始数据的月份。
+        该月已有归档块（迟到的迁移数据）时与之合并，同一时间以原始数据为准。
+        预聚合回填完成前不归档（回填需要读取主库中的原始数据）。
+        """
+        if not cls.ARCHIVE or not cls._rollups_available(db):
+            return False
+        cutoff = now - cls._RETENTION_TIERS[-1][0]
+        done = 0
+        while done < cls._CLEANUP_CHUNK:
+            first = cls._first_ts(db, vid)
+            if first is None:
+                break
+            month = _month_of(first)
+            lo, hi = _month_start(month), _month_start(_next_month(month))
+            if hi > cutoff:
+                break
+            (months, cond, params), = cls._raw_sources(db, lo, hi - 1)
+            tables = cls._raw_tables(db, months)
+            cursor = db.cursor()
+            cursor.row_factory = None
+            rows = {
+                r[0]: r for r in cursor.execute(
+                    'SELECT ts, view, "like", coin, favorite, share, danmaku, reply '
+                    f"FROM {_union_from(tables)} WHERE video_id = ?{cond}",
+                    (vid, *params),
+                )
+            }
+            old = db.execute(
+                "SELECT data FROM archive WHERE video_id = ? AND month = ?", (vid, month)
+            ).fetchone()
+            if old is not None:
+                rows = {r[0]: r for r in archive.decode(old[0])} | rows
+            merged = sorted(rows.values())
+            db.execute(
+                "INSERT OR REPLACE INTO archive (video_id, month, first_ts, last_ts, samples, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (vid, month, merged[0][0], merged[-1][0], len(merged), archive.encode(merged)),
+            )
+            for table in tables:
+                db.execute(
+                    f"DELETE FROM {table} WHERE video_id = ? AND ts >= ? AND ts < ?", (vid, lo, hi)
+                )
+            done += len(merged)
+        return done > 0
+
     # ── 视频信息 ──
 
     @classmethod
     def save_info(cls, info: VideoInfo):
         """保存视频基本信息"""
-        filepath = cls._meta_file(info.bvid)
+        db = _get_write_db()
         with cls._lock:
-            data = cls._load_meta(filepath)
-            data["info"] = asdict(info)
-            cls._save_meta(filepath, data)
+            cls._put_info(db, cls._video_id(db, info.bvid, create=True), asdict(info))
+            cls._commit(db)
+
+    @classmethod
+    def _put_info(cls, db: sqlite3.Connection, vid: int, info: dict):
+        db.execute(
+            'UPDATE videos SET title = ?, pic = ?, owner_name = ?, "desc" = ? WHERE id = ?',
+            (info["title"], info["pic"], info["owner_name"], info["desc"], vid),
+        )
 
     @classmethod
     def get_info(cls, bvid: str) -> dict | None:
         """获取视频基本信息"""
-        filepath = cls._meta_file(bvid)
-        data = cls._load_meta(filepath)
-        return data.get("info")
+        row = _get_db().execute(
+            f"SELECT bvid, {_INFO_COLS} FROM videos WHERE bvid = ?", (bvid,)
+        ).fetchone()
+        return cls._info_dict(row)
+
+    @staticmethod
+    def _info_dict(row) -> dict | None:
+        """videos 行 → 视频信息字典，尚未获取信息时返回 None"""
+        if row is None or row["title"] is None:
+            return None
+        return {k: row[k] for k in ("bvid", "title", "pic", "owner_name", "desc")}
 
     # ── 统计数据（SQLite）──
 
     @classmethod
     def save_stat(cls, stat: VideoStat):
-        """保存一条统计数据"""
-        bvid = stat.bvid
-        cls._ensure_migrated(bvid)
-        db = _get_db()
+        """保存一条统计数据（立即提交）"""
+        cls.save_stats([stat])
+
+    @classmethod
+    def save_stats(cls, stats: list[VideoStat]):
+        """批量保存统计数据：一次 executemany，一个事务只提交一次"""
+        if not stats:
+            return
+        db = _get_write_db()
         with cls._lock:
-            db.execute(
-                'INSERT INTO video_stats (bvid, view, "like", coin, favorite, share, danmaku, reply, timestamp) '
-                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
-                (bvid, stat.view, stat.like, stat.coin, stat.favorite,
-                 stat.share, stat.danmaku, stat.reply, stat.timestamp),
-            )
-            db.commit()
+            try:
+                cls._insert_rows(db, [
+                    (s.bvid, s.view, s.like, s.coin, s.favorite,
+                     s.share, s.danmaku, s.reply, s.timestamp) for s in stats
+                ])
+                cls._commit(db)
+            except BaseException:
+                # 回滚已执行的部分写入，否则会被写线程上的下一次提交一并提交；
+                # 热数据缓存可能已追加了未能提交的数据，本事务新建的视频 ID 也随之作废
+                db.rollback()
+                bvids = {s.bvid for s in stats}
+                ringbuf.hot.invalidate(
+                    {vid for b in bvids if (vid := cls._video_ids.pop(b, None)) is not None}
+                )
+                raise
 
     @classmethod
-    def get_stats(cls, bvid: str, limit: int | None = None) -> list[dict]:
+    def get_stats(
+        cls,
+        bvid: str,
+        limit: int | None = None,
+        columnar: bool = False,
+        derived: bool = False,
+    ) -> list[dict] | dict:
         """获取统计数据
 
         Args:
             bvid: 视频 BV 号
             limit: 最多返回最近 N 条记录。None 表示全部。
+            columnar: 返回列式格式（见 _to_columns），默认逐行返回字典列表
+            derived: 附带增量、每小时增速、互动率等派生序列（见 _derive）
         """
-        cls._ensure_migrated(bvid)
         db = _get_db()
+        vid = cls._video_id(db, bvid)
+        if vid is None:
+            return cls.format_stats(bvid, [], columnar, derived)
+        tail = cls._unstored_tail(db, vid)
         if limit is not None and limit > 0:
-            rows = db.execute(
-                'SELECT bvid, view, "like", coin, favorite, share, danmaku, reply, timestamp '
-                'FROM video_stats WHERE bvid = ? ORDER BY timestamp DESC LIMIT ?',
-                (bvid, limit),
-            ).fetchall()
+            rows = cls._select_raw(db, vid, limit=limit - len(tail), newest_first=True) \
+                if limit > len(tail) else []
             # 反转为时间正序
-            return [dict(r) for r in reversed(rows)]
+            return cls.format_stats(bvid, [*reversed(rows), *tail], columnar, derived)
         else:
-            rows = db.execute(
-                'SELECT bvid, view, "like", coin, favorite, share, danmaku, reply, timestamp '
-                'FROM video_stats WHERE bvid = ? ORDER BY timestamp',
-                (bvid,),
-            ).fetchall()
-            return [dict(r) for r in rows]
+            return cls.format_stats(bvid, cls._select_raw(db, vid) + tail, columnar, derived)
 
     @classmethod
     def get_latest_stat(cls, bvid: str) -> dict | None:
-        """获取最新一条统计数据"""
-        cls._ensure_migrated(bvid)
+        """获取最新一条统计数据（已加载热数据缓存的视频直接从内存读取）"""
         db = _get_db()
+        vid = cls._video_id(db, bvid)
+        if vid is None:
+            return None
+        latest = ringbuf.hot.latest(vid)
+        if latest is not None:
+            return cls._to_dicts(bvid, [_archived_stat(latest)])[0]
         row = db.execute(
-            'SELECT bvid, view, "like", coin, favorite, share, danmaku, reply, timestamp '
-            'FROM video_stats WHERE bvid = ? ORDER BY timestamp DESC LIMIT 1',
-            (bvid,),
+            f"SELECT {_STAT_COLS} FROM latest_stats WHERE video_id = ?", (vid,)
         ).fetchone()
-        return dict(row) if row else None
+        return cls._to_dicts(bvid, [row])[0] if row else None
+
+    @classmethod
+    def get_stats_version(
+        cls, bvid: str, range_start: str | None = None
+    ) -> tuple[int, int, int] | None:
+        """视频统计数据的版本 (最新一条数据的 epoch 秒, 视频信息与保留水位的 CRC32, 窗口起点)，
+        没有数据时返回 None
+
+        只按主键读取几行，用作 HTTP 校验值：有新数据（即使因未变化而未写入 stats）、标题、封面等
+        信息变化、归档清理压缩了该视频的数据（retention 水位前移）或按月删除了分区时版本随之改变，
+        无需执行范围查询。
+
+        range_start 为相对时间范围（如 24h）解析出的起点：窗口随时间滑动，即使没有新数据返回的
+        序列也会变化，因此起点按所用数据源的时间桶（读取原始数据时按最细的预聚合桶）取整后计入
+        版本；不传时为 0。
+        """
+        db = _get_db()
+        row = db.execute(f"""
+            SELECT v.id, l.ts, {_INFO_COLS},
+                   (SELECT COALESCE(SUM(done_ts), 0) FROM retention WHERE video_id = v.id) AS retained
+            FROM videos v JOIN latest_stats l ON l.video_id = v.id
+            WHERE v.bvid = ?
+        """, (bvid,)).fetchone()
+        if row is None:
+            return None
+        info = "\0".join(str(row[k]) for k in ("title", "pic", "owner_name", "desc", "retained"))
+        info += f"\0{cls._get_meta(db, 'partitions_dropped')}"
+        window = 0
+        if range_start is not None:
+            t0 = _to_epoch(range_start)
+            width = cls._pick_rollup(db, [row["id"]], t0, None, cls.MAX_POINTS) or min(_ROLLUPS)
+            window = t0 - t0 % width
+        return row["ts"], zlib.crc32(info.encode()), window
+
+    @staticmethod
+    def _unstored_tail(
+        db: sqlite3.Connection,
+        vid: int,
+        after: int | None = None,
+        until: int | None = None,
+    ) -> list:
+        """因未变化而跳过写入、尚未补写的最后一条样本（只存在于 latest_stats）
+
+        读取时补在序列末尾，使序列延伸到最近一次采集；没有或不在 (after, until] 内时返回空列表。
+        """
+        sql = f"SELECT {_STAT_COLS} FROM latest_stats WHERE video_id = ? AND ts > stored_ts"
+        params: tuple = (vid,)
+        if after is not None:
+            sql += " AND ts > ?"
+            params += (after,)
+        if until is not None:
+            sql += " AND ts <= ?"
+            params += (until,)
+        return db.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _to_dicts(bvid: str, rows) -> list[dict]:
+        """查询结果 → 逐行格式（补上 bvid 字段）"""
+        return [{"bvid": bvid, **{k: r[k] for k in _STAT_KEYS}} for r in rows]
+
+    @staticmethod
+    def _to_columns(bvid: str, rows) -> dict:
+        """查询结果 → 列式格式：每个指标一个数组，时间为 epoch 秒的起点 + 逐点差分
+
+        {"bvid", "count", "ts_base", "ts_delta": [0, Δ1, Δ2, ...], "view": [...], ...,
+         "last_timestamp"}，第 i 个点的时间 = ts_base + ts_delta[0..i] 之和；
+        last_timestamp 为最后一个点的时间字符串（与逐行格式的 timestamp 相同，可作为 since 游标）。
+        """
+        ts = [r["ts"] for r in rows]
+        return {
+            "bvid": bvid,
+            "count": len(rows),
+            "ts_base": ts[0] if ts else None,
+            "ts_delta": [b - a for a, b in zip(ts[:1] + ts, ts)],
+            **{m: [r[m] for r in rows] for m in _METRICS},
+            "last_timestamp": rows[-1]["timestamp"] if rows else None,
+        }
+
+    @classmethod
+    def format_stats(
+        cls,
+        bvid: str,
+        rows,
+        columnar: bool = False,
+        derived: bool = False,
+        prev=None,
+    ) -> list[dict] | dict:
+        """查询结果（或空列表）→ 逐行 / 列式格式
+
+        derived=True 时附带派生序列（见 _derive）：列式格式中每项一个数组，
+        逐行格式中每行多出对应字段；prev 为 rows 之前的一行，用于计算第一个点的增量。
+        """
+        if not derived:
+            return cls._to_columns(bvid, rows) if columnar else cls._to_dicts(bvid, rows)
+        columns = cls._to_columns(bvid, rows)
+        extra = _derive([r["ts"] for r in rows], columns, prev)
+        if columnar:
+            return {**columns, **extra}
+        return [
+            {**row, **dict(zip(extra, values))}
+            for row, values in zip(cls._to_dicts(bvid, rows), zip(*extra.values()))
+        ]
 
     # ── 时间范围查询 + 降采样 ──
 
-    # 降采样：前端图表有效分辨率有限，超过此数量则等间隔取点
+    # 降采样：前端图表有效分辨率有限，超过此数量则降采样
     MAX_POINTS = 1000
 
+    # 默认降采样方法（见 downsample.METHODS）
+    DOWNSAMPLE = "lttb"
+
     # range 字符串 → timedelta 映射
     _RANGE_MAP: dict[str, timedelta] = {
         "1h":  timedelta(hours=1),
@@ -290,7 +1480,10 @@ class DataStore:
         start: str | None = None,
         end: str | None = None,
         max_points: int | None = None,
-    ) -> list[dict]:
+        method: str | None = None,
+        columnar: bool = False,
+        derived: bool = False,
+    ) -> list[dict] | dict:
         """按时间范围查询统计数据，自动降采样
 
         Args:
@@ -299,58 +1492,385 @@ class DataStore:
             start: 起始时间 "YYYY-MM-DD HH:mm:ss"（与 end 配合使用）
             end:   结束时间 "YYYY-MM-DD HH:mm:ss"
             max_points: 最大返回数据点数，默认 MAX_POINTS
+            method: 降采样方法 "lttb"/"minmax"/"stride"，默认 DOWNSAMPLE
+            columnar: 返回列式格式（见 _to_columns）
+            derived: 附带派生序列（见 _derive），按降采样后相邻两点计算
+
+        读取原始数据的近期范围（1 小时、6 小时等）由热数据缓存回答（见 ringbuf 模块），
+        选点方式与读取数据库时相同。
         """
-        cls._ensure_migrated(bvid)
+        if method is None:
+            method = cls.DOWNSAMPLE
+        if method not in downsample.METHODS:
+            raise ValueError(f"无效的降采样方法: {method!r}，可选 {'/'.join(downsample.METHODS)}")
+
         db = _get_db()
 
         if max_points is None:
             max_points = cls.MAX_POINTS
 
+        vid = cls._video_id(db, bvid)
+        if vid is None:
+            return cls.format_stats(bvid, [], columnar, derived)
+
         # 确定时间范围
-        ts_start, ts_end = cls._resolve_time_range(range_str, start, end)
-
-        # 构建查询
-        cols = 'bvid, view, "like", coin, favorite, share, danmaku, reply, timestamp'
-        if ts_start and ts_end:
-            where = "WHERE bvid = ? AND timestamp >= ? AND timestamp <= ?"
-            params: tuple = (bvid, ts_start, ts_end)
-        elif ts_start:
-            where = "WHERE bvid = ? AND timestamp >= ?"
-            params = (bvid, ts_start)
+        ts_start, ts_end = cls.resolve_time_range(range_str, start, end)
+        t0 = _to_epoch(ts_start) if ts_start else None
+        t1 = _to_epoch(ts_end) if ts_end else None
+        if t0 is not None and cls._pick_rollup(db, [vid], t0, t1, max_points) is None:
+            cached = ringbuf.hot.range(vid, t0, t1)
+            if cached is not None:
+                hot_rows, tail = cached
+                end = t1 if t1 is not None else int(datetime.now().timestamp())
+                rows = cls._sample_rows(hot_rows, max_points, method, end) + tail
+                return cls.format_stats(bvid, [_archived_stat(r) for r in rows], columnar, derived)
+        rows = cls._query_range(db, vid, t0, t1, max_points, method)
+        tail = cls._unstored_tail(db, vid, None if t0 is None else t0 - 1, t1)
+        return cls.format_stats(bvid, rows + tail, columnar, derived)
+
+    @classmethod
+    def _query_range(
+        cls,
+        db: sqlite3.Connection,
+        vid: int,
+        t0: int | None,
+        t1: int | None,
+        max_points: int,
+        method: str,
+    ) -> list:
+        """查询 [t0, t1] 内的数据并降采样到约 max_points 个点（不含 bvid 字段）"""
+        end = t1 if t1 is not None else int(datetime.now().timestamp())
+        # 按时间跨度选择数据源：跨度大时直接读预聚合表，只扫描与点数相当的行数
+        width = cls._pick_rollup(db, [vid], t0, t1, max_points)
+        if width:
+            if t0 is not None:
+                t0 -= t0 % width  # 包含起点所在的时间桶
+            cond, params = "", ()
+            if t0 is not None:
+                cond += " AND bucket >= ?"
+                params += (t0,)
+            if t1 is not None:
+                cond += " AND bucket <= ?"
+                params += (t1,)
+            return cls._select_sampled(
+                db, vid, _ROLLUPS[width], "bucket", _ROLLUP_STAT_COLS, cond, params,
+                max_points, method, end, "last_ts, view_last",
+            )
+
+        # 原始数据：归档数据与各组分区逐段查询（通常只涉及一两个分区），点数按段平分
+        plan = cls._raw_sources(db, t0, t1)
+        archived = cls._archive_rows(db, vid, t0, t1)
+        points = max(max_points // (len(plan) + bool(archived)), 2)
+        rows = [_archived_stat(r) for r in cls._sample_rows(archived, points, method, end)]
+        for months, cond, params in plan:
+            src = cls._raw_from(db, months)
+            if src is not None:
+                rows += cls._select_sampled(
+                    db, vid, src, "ts", _STAT_COLS, cond, params,
+                    points, method, end, "ts, view",
+                )
+        return rows
+
+    # 批量查询一次最多的视频数
+    BATCH_MAX = 100
+
+    @classmethod
+    def get_stats_batch(
+        cls,
+        bvids: list[str],
+        range_str: str | None = None,
+        start: str | None = None,
+        end: str | None = None,
+        max_points: int | None = None,
+        method: str | None = None,
+        columnar: bool = False,
+        derived: bool = False,
+    ) -> list[tuple[str, list[dict] | dict]]:
+        """多个视频同一时间范围的统计数据，每个视频各自降采样到约 max_points 个点
+
+        参数同 get_stats_ranged。所有视频在每个数据源上只查询一次（video_id IN (...)），
+        而不是每个视频各查一遍；返回 [(bvid, stats)]，顺序与 bvids 相同，不存在的视频 stats 为空。
+        """
+        if method is None:
+            method = cls.DOWNSAMPLE
+        if method not in downsample.METHODS:
+            raise ValueError(f"无效的降采样方法: {method!r}，可选 {'/'.join(downsample.METHODS)}")
+        if max_points is None:
+            max_points = cls.MAX_POINTS
+
+        ts_start, ts_end = cls.resolve_time_range(range_str, start, end)
+        t0 = _to_epoch(ts_start) if ts_start else None
+        t1 = _to_epoch(ts_end) if ts_end else None
+
+        db = _get_db()
+        ids = {bvid: cls._video_id(db, bvid) for bvid in bvids}
+        vids = sorted({vid for vid in ids.values() if vid is not None})
+        rows = cls._query_batch(db, vids, t0, t1, max_points, method) if vids else {}
+        return [
+            (bvid, cls.format_stats(bvid, rows.get(ids[bvid], []), columnar, derived))
+            for bvid in bvids
+        ]
+
+    @classmethod
+    def _query_batch(
+        cls,
+        db: _Connection,
+        vids: list[int],
+        t0: int | None,
+        t1: int | None,
+        max_points: int,
+        method: str,
+    ) -> dict[int, list]:
+        """多个视频的 _query_range + _unstored_tail，返回 {video_id: 行}
+
+        与 _select_sampled 一样分两遍：第一遍一次读出全部视频的 (时间, 播放量, 主键) 元组，
+        按视频分组在内存中降采样（同一视频跨分区组、归档数据合在一起选点）；
+        第二遍以 {video_id: [主键]} 一次取回全部选中的完整行。
+        """
+        end = t1 if t1 is not None else int(datetime.now().timestamp())
+        in_vids = "video_id IN (SELECT value FROM json_each(?))"
+        ids = json.dumps(vids)
+
+        # 候选点 (video_id, 时间, 播放量, 主键, 数据源序号)，归档数据的数据源序号为 -1、主键为解码出的行
+        candidates: dict[int, list[tuple]] = {vid: [] for vid in vids}
+        width = cls._pick_rollup(db, vids, t0, t1, max_points)
+        if width:
+            lo = t0 - t0 % width if t0 is not None else None  # 包含起点所在的时间桶
+            cond, params = "", ()
+            if lo is not None:
+                cond += " AND bucket >= ?"
+                params += (lo,)
+            if t1 is not None:
+                cond += " AND bucket <= ?"
+                params += (t1,)
+            sources = [([], cond, params)]
+            key, cols, time_view = "bucket", _ROLLUP_STAT_COLS, "last_ts, view_last"
         else:
-            where = "WHERE bvid = ?"
-            params = (bvid,)
+            sources = cls._raw_sources(db, t0, t1)
+            key, cols, time_view = "ts", _STAT_COLS, "ts, view"
+            for vid in vids:
+                candidates[vid] = [(vid, r[0], r[1], r, -1) for r in cls._archive_rows(db, vid, t0, t1)]
+
+        def table_of(months: list[int]) -> str | None:
+            return _ROLLUPS[width] if width else cls._raw_from(db, months)
+
+        cursor = db.cursor()
+        cursor.row_factory = None
+        for i, (months, cond, params) in enumerate(sources):
+            table = table_of(months)
+            if table is None:
+                continue
+            cursor.execute(
+                f"SELECT video_id, {time_view}, {key}, {i} FROM {table} WHERE {in_vids}{cond} "
+                f"ORDER BY video_id, {key}",
+                (ids, *params),
+            )
+            for vid, group in groupby(cursor, itemgetter(0)):
+                candidates[vid] += group
+
+        result: dict[int, list] = {}
+        wanted: list[dict[int, list]] = [{} for _ in sources]
+        for vid, rows in candidates.items():
+            result[vid] = []
+            for _, _, _, k, i in cls._sample_rows(rows, max_points, method, end, (1, 2)):
+                if i < 0:
+                    result[vid].append(_archived_stat(k))
+                else:
+                    wanted[i].setdefault(vid, []).append(k)
+
+        # 各数据源按时间先后排列，依次追加即为每个视频的时间正序
+        for (months, cond, params), keys in zip(sources, wanted):
+            if not keys:
+                continue
+            for vid, group in groupby(db.execute(
+                f"SELECT video_id, {cols} FROM {table_of(months)} WHERE (video_id, {key}) IN "
+                f"(SELECT CAST(v.key AS INTEGER), k.value FROM json_each(?) AS v, json_each(v.value) AS k)"
+                f"{cond} ORDER BY video_id, {key}",
+                (json.dumps(keys), *params),
+            ), itemgetter(0)):
+                result[vid] += group
+
+        # 尚未补写的最后一条样本（见 _unstored_tail）
+        sql = f"SELECT video_id, {_STAT_COLS} FROM latest_stats WHERE {in_vids} AND ts > stored_ts"
+        params = (ids,)
+        if t0 is not None:
+            sql += " AND ts >= ?"
+            params += (t0,)
+        if t1 is not None:
+            sql += " AND ts <= ?"
+            params += (t1,)
+        for vid, group in groupby(db.execute(sql, params), itemgetter(0)):
+            result[vid] += group
+        return result
+
+    @classmethod
+    def _select_sampled(
+        cls,
+        db: sqlite3.Connection,
+        vid: int,
+        table: str,
+        key: str,
+        cols: str,
+        cond: str,
+        params: tuple,
+        max_points: int,
+        method: str,
+        end: int,
+        time_view: str,
+    ) -> list:
+        """从单个数据源读取满足条件的行并降采样到约 max_points 个点
+
+        table 为表名或子查询，key 为排序主键列，time_view 为选点使用的 (时间, 播放量) 列。
+        """
+        where = f"WHERE video_id = ?{cond}"
+        params = (vid, *params)
+
+        if method != "stride":
+            # 第一遍只读 (主键, 时间, 播放量) 元组，单次遍历游标按时间分桶选点，无需 COUNT；
+            # 第二遍按选中的主键取完整行，时间格式化只作用于返回的行
+            cursor = db.cursor()
+            cursor.row_factory = None
+            cursor.execute(f"SELECT {key}, {time_view} FROM {table} {where} ORDER BY {key}", params)
+            engine = downsample.lttb if method == "lttb" else downsample.minmax
+            picked = engine(cursor, max_points, end, itemgetter(1), itemgetter(2))
+            return db.execute(
+                f"SELECT {cols} FROM {table} {where} "
+                f"AND {key} IN (SELECT value FROM json_each(?)) ORDER BY {key}",
+                (*params, json.dumps([r[0] for r in picked])),
+            ).fetchall()
 
         # 统计总数，决定是否降采样
         total = db.execute(
-            f"SELECT COUNT(*) FROM video_stats {where}", params
+            f"SELECT COUNT(*) FROM {table} {where}", params
         ).fetchone()[0]
 
         if total <= max_points:
             # 不需要降采样，直接返回
-            rows = db.execute(
-                f"SELECT {cols} FROM video_stats {where} ORDER BY timestamp",
+            return db.execute(
+                f"SELECT {cols} FROM {table} {where} ORDER BY {key}",
                 params,
             ).fetchall()
-            return [dict(r) for r in rows]
 
         # 需要降采样：等间隔取点
         step = total // max_points
-        rows = db.execute(
+        return db.execute(
             f"""
             SELECT {cols} FROM (
-                SELECT *, ROW_NUMBER() OVER (ORDER BY timestamp) AS _rn
-                FROM video_stats {where}
+                SELECT *, ROW_NUMBER() OVER (ORDER BY {key}) AS _rn
+                FROM {table} {where}
             )
             WHERE _rn = 1 OR _rn % ? = 0 OR _rn = ?
-            ORDER BY timestamp
+            ORDER BY {key}
             """,
             (*params, step, total),
         ).fetchall()
-        return [dict(r) for r in rows]
+
+    @staticmethod
+    def _sample_rows(
+        rows: list[tuple],
+        max_points: int,
+        method: str,
+        end: int,
+        columns: tuple[int, int] = (0, 1),
+    ) -> list[tuple]:
+        """内存中的 (ts, view, ...) 行降采样到约 max_points 个点（与 _select_sampled 选点一致）
+
+        columns 为时间、播放量在行中的位置。
+        """
+        if method != "stride":
+            engine = downsample.lttb if method == "lttb" else downsample.minmax
+            return engine(rows, max_points, end, itemgetter(columns[0]), itemgetter(columns[1]))
+        total = len(rows)
+        if total <= max_points:
+            return rows
+        step = total // max_points
+        return [r for i, r in enumerate(rows, 1) if i == 1 or i % step == 0 or i == total]
 
     @classmethod
-    def _resolve_time_range(
+    def _pick_rollup(
+        cls,
+        db: sqlite3.Connection,
+        vids: list[int],
+        t0: int | None,
+        t1: int | None,
+        max_points: int,
+    ) -> int | None:
+        """选择时间跨度下仍能提供约 max_points 个点的最粗预聚合分辨率
+
+        返回时间桶宽度（秒），None 表示应读取原始数据；vids 中的视频使用同一分辨率。
+        跨度内桶数不少于 max_points / 2 的分辨率才会被选用；
+        预聚合行数不会超过原始行数，因此数据稀疏时选用也不会更慢。
+        """
+        if not cls._rollups_available(db):
+            return None
+        if t0 is None:
+            # 全部范围：以最粗预聚合表中最早的时间桶作为起点
+            t0 = db.execute(
+                f"SELECT MIN(bucket) FROM {_ROLLUPS[86400]} "
+                "WHERE video_id IN (SELECT value FROM json_each(?))", (json.dumps(vids),)
+            ).fetchone()[0]
+            if t0 is None:
+                return None
+        span = (t1 if t1 is not None else int(datetime.now().timestamp())) - t0
+        for width in sorted(_ROLLUPS, reverse=True):
+            retention = _ROLLUP_RETENTION[width]
+            if retention is not None and t0 < int(datetime.now().timestamp()) - retention:
+                continue  # 该分辨率已不覆盖起点
+            if span / width >= max_points / 2:
+                return width
+        return None
+
+    @classmethod
+    def get_stats_since(
+        cls,
+        bvid: str,
+        since: str,
+        end: str | None = None,
+        limit: int | None = None,
+        columnar: bool = False,
+        derived: bool = False,
+    ) -> list[dict] | dict:
+        """增量查询：返回时间戳晚于 since 的统计数据（时间正序）
+
+        供图表页轮询使用：只读取 (video_id, ts) 主键尾部的新数据，
+        无需 COUNT 与窗口函数，开销与新增行数成正比而非与时间范围成正比。
+
+        Args:
+            bvid: 视频 BV 号
+            since: 客户端已获取到的最新时间戳 "YYYY-MM-DD HH:mm:ss"
+            end:   结束时间（可选），晚于此时间的数据不返回
+            limit: 最多返回 N 条，None 表示不限
+            columnar: 返回列式格式（见 _to_columns）
+            derived: 附带派生序列（见 _derive），第一个点与游标处的那一行比较
+
+        游标在热数据缓存覆盖范围内时直接从内存读取。
+        """
+        db = _get_db()
+        vid = cls._video_id(db, bvid)
+        if vid is None:
+            return cls.format_stats(bvid, [], columnar, derived)
+        after = _to_epoch(since)
+        until = _to_epoch(end) if end else None
+        cached = ringbuf.hot.since(vid, after, until, derived)
+        if cached is not None:
+            rows, prev = cached
+            if limit and limit > 0:
+                rows = rows[:limit]
+            return cls.format_stats(
+                bvid, [_archived_stat(r) for r in rows], columnar, derived,
+                _archived_stat(prev) if prev is not None else None,
+            )
+        rows = cls._select_raw(db, vid, after + 1, until, limit if limit and limit > 0 else None)
+        if not limit or len(rows) < limit:
+            rows += cls._unstored_tail(db, vid, after, until)
+        prev = None
+        if derived:
+            seed = cls._select_raw(db, vid, t1=after, limit=1, newest_first=True)
+            prev = seed[0] if seed else None
+        return cls.format_stats(bvid, rows, columnar, derived, prev)
+
+    @classmethod
+    def resolve_time_range(
         cls,
         range_str: str | None,
         start: str | None,
@@ -374,139 +1894,413 @@ class DataStore:
 
     @classmethod
     def get_monitored_bvids(cls) -> list[str]:
-        """获取所有正在监控的BV号"""
-        monitor_file = DATA_DIR / "_monitors.json"
-        if not monitor_file.exists():
-            return []
-        with open(monitor_file, "r", encoding="utf-8") as f:
-            return json.load(f)
+        """获取所有正在监控的BV号（按添加顺序）"""
+        return [r[0] for r in _get_db().execute(
+            "SELECT bvid FROM videos WHERE monitor_seq IS NOT NULL ORDER BY monitor_seq"
+        )]
+
+    @classmethod
+    def count_monitors(cls) -> int:
+        """监控视频数"""
+        return _get_db().execute(
+            "SELECT COUNT(*) FROM videos WHERE monitor_seq IS NOT NULL"
+        ).fetchone()[0]
+
+    @classmethod
+    def get_monitors(
+        cls,
+        sort: str = "added",
+        desc: bool = False,
+        offset: int = 0,
+        limit: int | None = None,
+    ) -> list[dict]:
+        """一次查询获取监控视频的信息、专属间隔与最新数据（首页使用）
+
+        Args:
+            sort: 排序方式 "added"（添加顺序）/"view"（播放量）/"growth"（每小时播放增量）/"title"
+            desc: 是否倒序；缺少排序字段的视频总是排在最后
+            offset / limit: 分页
+
+        返回 [{"bvid", "info", "interval", "latest_stat", "growth"}, ...]
+        """
+        expr = _MONITOR_SORTS.get(sort)
+        if expr is None:
+            raise ValueError(f"无效的排序方式: {sort!r}，可选 {'/'.join(_MONITOR_SORTS)}")
+        rows = _get_db().execute(f"""
+            SELECT v.bvid, {_INFO_COLS}, v.interval, l.video_id AS _has_stat, {_STAT_COLS},
+                   {_GROWTH_SQL} AS growth
+            FROM videos v
+            LEFT JOIN latest_stats l ON l.video_id = v.id
+            WHERE v.monitor_seq IS NOT NULL
+            ORDER BY ({expr}) IS NULL, {expr} {"DESC" if desc else "ASC"}, v.monitor_seq
+            LIMIT ? OFFSET ?
+        """, (-1 if limit is None else limit, offset)).fetchall()
+        return [
+            {
+                "bvid": r["bvid"],
+                "info": cls._info_dict(r),
+                "interval": r["interval"],
+                "latest_stat": {
+                    "bvid": r["bvid"],
+                    **{m: r[m] for m in _METRICS},
+                    "timestamp": r["timestamp"],
+                } if r["_has_stat"] is not None else None,
+                "growth": round(r["growth"], 1) if r["growth"] is not None else None,
+            }
+            for r in rows
+        ]
 
     @classmethod
     def add_monitor(cls, bvid: str):
         """添加监控"""
+        db = _get_write_db()
         with cls._lock:
-            monitors = cls.get_monitored_bvids()
-            if bvid not in monitors:
-                monitors.append(bvid)
-                with open(DATA_DIR / "_monitors.json", "w", encoding="utf-8") as f:
-                    json.dump(monitors, f)
+            cls._set_monitored(db, bvid, True)
+            cls._commit(db)
 
     @classmethod
     def remove_monitor(cls, bvid: str):
         """移除监控"""
+        db = _get_write_db()
         with cls._lock:
-            monitors = cls.get_monitored_bvids()
-            if bvid in monitors:
-                monitors.remove(bvid)
-                with open(DATA_DIR / "_monitors.json", "w", encoding="utf-8") as f:
-                    json.dump(monitors, f)
+            cls._set_monitored(db, bvid, False)
+            cls._commit(db)
+
+    @classmethod
+    def _set_monitored(cls, db: sqlite3.Connection, bvid: str, monitored: bool):
+        """加入（排在末尾）/ 移出监控列表（调用方负责加锁与提交）"""
+        if monitored:
+            db.execute(
+                "UPDATE videos SET monitor_seq = ("
+                "  SELECT COALESCE(MAX(monitor_seq), 0) + 1 FROM videos WHERE monitor_seq IS NOT NULL"
+                ") WHERE id = ? AND monitor_seq IS NULL",
+                (cls._video_id(db, bvid, create=True),),
+            )
+        else:
+            db.execute("UPDATE videos SET monitor_seq = NULL WHERE bvid = ?", (bvid,))
 
     # ── 单视频采集间隔 ──
 
     @classmethod
     def get_video_interval(cls, bvid: str) -> int | None:
         """获取视频专属采集间隔，None 表示跟随全局默认"""
-        filepath = cls._meta_file(bvid)
-        data = cls._load_meta(filepath)
-        return data.get("interval")
+        row = _get_db().execute("SELECT interval FROM videos WHERE bvid = ?", (bvid,)).fetchone()
+        return row[0] if row else None
 
     @classmethod
     def set_video_interval(cls, bvid: str, interval: int | None):
         """设置视频专属采集间隔，None 表示跟随全局默认"""
-        filepath = cls._meta_file(bvid)
+        db = _get_write_db()
         with cls._lock:
-            data = cls._load_meta(filepath)
-            if interval is None:
-                data.pop("interval", None)
-            else:
-                data["interval"] = interval
-            cls._save_meta(filepath, data)
+            db.execute(
+                "UPDATE videos SET interval = ? WHERE id = ?",
+                (interval, cls._video_id(db, bvid, create=True)),
+            )
+            cls._commit(db)
 
     @classmethod
     def get_effective_interval(cls, bvid: str) -> int:
-        """获取视频的实际采集间隔（专属间隔优先，否则用全局默认）"""
+        """获取视频的实际采集间隔（专属间隔优先，否则用全局默认；AUTO_INTERVAL 表示自动）"""
         vi = cls.get_video_interval(bvid)
         if vi is not None:
             return vi
         return cls.get_config().get("interval", 30)
 
+    # ── 涨幅排行基线 ──
+
+    @staticmethod
+    def baseline_width(seconds: int) -> int:
+        """时间窗口为 seconds 秒时读取基线使用的预聚合分辨率（保留时长足以覆盖窗口起点的最细一档）"""
+        for width in sorted(_ROLLUPS):
+            retention = _ROLLUP_RETENTION[width]
+            if retention is None or retention >= seconds + width:
+                return width
+        return max(_ROLLUPS)
+
+    @classmethod
+    def get_baselines(cls, metric: str, start: int) -> dict[str, tuple[str | None, int, int]]:
+        """各监控视频在时间 start 的指标值，作为涨幅排行的基线
+
+        返回 {bvid: (标题, 基线值, 基线时间 epoch 秒)}。基线取 start 所在时间桶之前最后一个桶的末值
+        （预聚合表按主键直接定位，每个视频一次查找）；start 之后才开始采集的视频取窗口内的第一个值，
+        没有任何数据的视频不出现在结果中。分辨率见 baseline_width，基线时间最多早于 start 一个桶宽。
+        """
+        if metric not in _METRICS:
+            raise ValueError(f"无效的指标: {metric!r}，可选 {'/'.join(_METRICS)}")
+        width = cls.baseline_width(int(datetime.now().timestamp()) - start)
+        table = _ROLLUPS[width]
+        bucket = start - start % width
+        rows = _get_db().execute(f"""
+            SELECT v.bvid, v.title,
+                   COALESCE(b."{metric}_last", f."{metric}_first") AS base,
+                   COALESCE(b.last_ts, f.first_ts) AS base_ts
+            FROM videos v
+            LEFT JOIN {table} b ON b.video_id = v.id AND b.bucket =
+                (SELECT MAX(bucket) FROM {table} WHERE video_id = v.id AND bucket < ?)
+            LEFT JOIN {table} f ON b.video_id IS NULL AND f.video_id = v.id AND f.bucket =
+                (SELECT MIN(bucket) FROM {table} WHERE video_id = v.id AND bucket >= ?)
+            WHERE v.monitor_seq IS NOT NULL
+        """, (bucket, bucket))
+        return {r[0]: (r[1], r[2], r[3]) for r in rows if r[2] is not None}
+
+    # ── 告警规则 ──
+
+    @classmethod
+    def get_alert_rules(cls) -> list[dict]:
+        """所有告警规则（按添加顺序）"""
+        return [dict(r) for r in _get_db().execute(
+            'SELECT id, bvid, metric, "window", threshold, '
+            f'{_ts_sql("created_ts")} AS created_at FROM alert_rules ORDER BY id'
+        )]
+
+    @classmethod
+    def add_alert_rule(cls, bvid: str | None, metric: str, window: int, threshold: int) -> dict:
+        """添加告警规则，返回新规则；指标或阈值不合法时抛出 ValueError（窗口由调用方校验）"""
+        if metric not in _METRICS:
+            raise ValueError(f"无效的指标: {metric!r}，可选 {'/'.join(_METRICS)}")
+        if threshold <= 0:
+            raise ValueError("阈值必须为正整数")
+        db = _get_write_db()
+        now = int(time.time())
+        with cls._lock:
+            cur = db.execute(
+                'INSERT INTO alert_rules (bvid, metric, "window", threshold, created_ts) '
+                "VALUES (?, ?, ?, ?, ?)",
+                (bvid, metric, window, threshold, now),
+            )
+            cls._commit(db)
+        return {
+            "id": cur.lastrowid, "bvid": bvid, "metric": metric, "window": window,
+            "threshold": threshold, "created_at": datetime.fromtimestamp(now).strftime(_TS_FORMAT),
+        }
+
+    @classmethod
+    def remove_alert_rule(cls, rule_id: int) -> bool:
+        """删除告警规则，返回规则是否存在"""
+        db = _get_write_db()
+        with cls._lock:
+            removed = db.execute("DELETE FROM alert_rules WHERE id = ?", (rule_id,)).rowcount
+            cls._commit(db)
+        return removed > 0
+
+    # ── 热数据缓存 ──
+
+    # 热数据缓存的默认内存上限（MB），配置 hot_cache_mb 可覆盖，0 表示关闭
+    HOT_CACHE_MB = 64
+    # 每步最多加载的视频数
+    HOT_LOAD_BATCH = 20
+    # 启动预热尚未加载的视频（倒序，从末尾取出；None 表示尚未开始）
+    _hot_queue: list[int] | None = None
+
+    @classmethod
+    def warm_hot_step(cls) -> bool:
+        """加载热数据缓存的一步（在写线程中执行，与写入不会交错），返回 True 表示暂无需要加载的视频
+
+        优先加载查询未命中而登记的视频，其次是启动预热：按监控顺序加载，内存达到上限后停止。
+        每个视频读取最近 HOT_SECONDS 的原始数据与 latest_stats 中的最新一条。
+        """
+        db = _get_write_db()
+        cache = ringbuf.hot
+        cache.set_max_bytes(int(cls.get_config().get("hot_cache_mb", cls.HOT_CACHE_MB) * 2**20))
+        if cls._hot_queue is None:
+            cls._hot_queue = [r[0] for r in db.execute(
+                "SELECT id FROM videos WHERE monitor_seq IS NOT NULL ORDER BY monitor_seq DESC"
+            )]
+        if not cache.max_bytes:
+            cls._hot_queue.clear()
+            return True
+        vids = cache.take_wanted(cls.HOT_LOAD_BATCH)
+        while len(vids) < cls.HOT_LOAD_BATCH and cls._hot_queue:
+            if cache.nbytes >= cache.max_bytes:
+                cls._hot_queue.clear()
+                break
+            vid = cls._hot_queue.pop()
+            if vid not in cache:
+                vids.append(vid)
+        start = int(time.time()) - ringbuf.HOT_SECONDS
+        for vid in vids:
+            rows = [(r["ts"], *(r[m] for m in _METRICS)) for r in cls._select_raw(db, vid, start)]
+            latest = db.execute(
+                'SELECT ts, view, "like", coin, favorite, share, danmaku, reply '
+                "FROM latest_stats WHERE video_id = ?", (vid,)
+            ).fetchone()
+            cache.load(vid, rows, start, tuple(latest) if latest else None)
+        return not cls._hot_queue and not cache.has_wanted()
+
     # ── 数据归档清理 ──
 
+    # 原始数据保留策略：(数据年龄超过, 每多少秒保留一条)
+    _RETENTION_TIERS: tuple[tuple[int, int], ...] = (
+        (7 * 86400, 300),     # 7 ~ 30 天：每 5 分钟一条
+        (30 * 86400, 1800),   # 30 ~ 90 天：每 30 分钟一条
+        (90 * 86400, 3600),   # > 90 天：每小时一条
+    )
+    # 每个清理事务最多处理的原始数据行数
+    _CLEANUP_CHUNK = 20_000
+    # 没有待清理数据时，每步最多检查的视频数
+    _CLEANUP_SCAN = 200
+    # 每步 incremental_vacuum 归还的页数
+    _VACUUM_PAGES = 2000
+    # 进行中的一轮空间归还尚未处理完的库（"main" 或分区 schema 名 pYYYYMM）
+    _vacuum_queue: list[str] | None = None
+
+    # 进行中的一轮清理：{"now": 本轮的时间基准, "vid": 下一个要处理的视频 id}
+    _cleanup_pass: dict | None = None
+
     @classmethod
     def cleanup_old_data(cls):
-        """定期清理：保留近期原始数据，远期数据降采样
+        """一次性执行完整的归档清理（逐步执行 cleanup_step，直到完成）"""
+        while not cls.cleanup_step():
+            pass
+
+    @classmethod
+    def cleanup_step(cls) -> bool:
+        """定期清理的一步：保留近期原始数据，远期数据降采样；返回 True 表示本轮已完成
 
         策略（默认）：
         - 最近 7 天   → 保留全部原始数据
         - 7 ~ 30 天   → 降采样为每 5 分钟一条
         - 30 ~ 90 天  → 降采样为每 30 分钟一条
-        - > 90 天     → 降采样为每小时一条
+        - > 90 天     → 降采样为每小时一条，整月都超过 90 天后打包进 archive 表（见 ARCHIVE），
+                        数据均已归档的分区文件随后删除
+
+        预聚合表：1 分钟粒度保留 30 天，5 分钟粒度保留 180 天，1 小时 / 1 天粒度永久保留。
+
+        逐个视频、按时间分段处理，每步只在一个短事务内压缩至多 _CLEANUP_CHUNK 行，
+        步与步之间写线程可以处理采集写入；每个视频每一档的进度记在 retention 表中，
+        已压缩过的时间段不再重复扫描，中断后下次从水位继续。
         """
         config = cls.get_config()
         if config.get("retention_enabled") is False:
-            return  # 用户可在配置中禁用
-
-        db = _get_db()
-        now = datetime.now()
+            return True  # 用户可在配置中禁用
+        if cls._legacy_videos():
+            return True  # 旧表数据迁移完成前不清理（迁入的数据可能落在已清理过的时间段）
 
-        cutoff_7d  = (now - timedelta(days=7)).strftime("%Y-%m-%d %H:%M:%S")
-        cutoff_30d = (now - timedelta(days=30)).strftime("%Y-%m-%d %H:%M:%S")
-        cutoff_90d = (now - timedelta(days=90)).strftime("%Y-%m-%d %H:%M:%S")
+        db = _get_write_db()
+        if cls._cleanup_pass is None:
+            cls._cleanup_pass = {"now": int(datetime.now().timestamp()), "vid": 0}
+        now = cls._cleanup_pass["now"]
 
         with cls._lock:
-            # 7~30 天：每 5 分钟保留一条
-            cls._downsample(db, cutoff_30d, cutoff_7d, 5)
-
-            # 30~90 天：每 30 分钟保留一条
-            cls._downsample(db, cutoff_90d, cutoff_30d, 30)
-
-            # > 90 天：每小时保留一条
-            cls._downsample(db, None, cutoff_90d, 60)
-
+            vids = [r[0] for r in db.execute(
+                "SELECT id FROM videos WHERE id >= ? ORDER BY id LIMIT ?",
+                (cls._cleanup_pass["vid"], cls._CLEANUP_SCAN),
+            )]
+            for vid in vids:
+                if cls._compact_chunk(db, vid, now) or cls._archive_chunk(db, vid, now):
+                    db.commit()
+                    return False  # 该视频可能还有未处理的数据，下一步从它继续
+                # 该视频已全部压缩：细粒度预聚合数据超过保留时长后删除（粗粒度表永久保留）
+                for width, retention in _ROLLUP_RETENTION.items():
+                    if retention is not None:
+                        db.execute(
+                            f"DELETE FROM {_ROLLUPS[width]} WHERE video_id = ? AND bucket < ?",
+                            (vid, now - retention),
+                        )
+                cls._cleanup_pass["vid"] = vid + 1
             db.commit()
+            if len(vids) == cls._CLEANUP_SCAN:
+                return False  # 还有视频未检查
+            # 原始数据只保留最近 N 个月时，整月删除更早的分区文件
+            keep = config.get("partition_keep_months")
+            if cls.PARTITIONED and keep:
+                year, mon = divmod(_month_of(now), 100)
+                first = year * 12 + mon - keep  # 保留的最早月份（从 0 计的月序号）
+                cls._drop_partitions(db, _month_start(first // 12 * 100 + first % 12 + 1))
+            # 数据已全部归档的旧分区文件直接删除
+            if cls.PARTITIONED and cls.ARCHIVE:
+                cls._drop_partitions(db, now - cls._RETENTION_TIERS[-1][0], empty_only=True)
+            cls._cleanup_pass = None
             db.execute("PRAGMA optimize")
+            return True
 
     @classmethod
-    def _downsample(cls, db: sqlite3.Connection, ts_start: str | None, ts_end: str, minutes: int):
-        """删除某时间段中多余的数据，每 `minutes` 分钟只保留第一条
+    def _compact_chunk(cls, db: sqlite3.Connection, vid: int, now: int) -> bool:
+        """压缩一个视频最早一段未处理的原始数据，没有待处理数据时返回 False
 
-        通过按 (bvid, 时间窗口) 分组，保留每组中 id 最小的记录，删除其余记录。
+        从最粗的一档开始处理；每一档从水位（没有水位时从最早的数据）开始，且不早于更粗一档
+        的水位（之前的数据已更稀疏），向后取至多 _CLEANUP_CHUNK 行，且不跨月（每段只涉及
+        一个分区）。分段边界按该档窗口对齐（各档窗口与月份边界互为整数倍），
+        保证每个窗口只在一段中处理、只保留时间最早的一条。
         """
-        if ts_start:
-            where = "timestamp >= ? AND timestamp < ?"
-            params = (ts_start, ts_end)
-        else:
-            where = "timestamp < ?"
-            params = (ts_end,)
-
-        # 构建时间窗口表达式：将分钟数截断到 `minutes` 的整数倍
-        # strftime('%M') 返回 "00"~"59"，CAST 为整数后整除再乘回
-        window_expr = (
-            "bvid || strftime('%Y-%m-%d %H:', timestamp) || "
-            f"CAST(CAST(strftime('%M', timestamp) AS INTEGER) / {minutes} * {minutes} AS TEXT)"
-        )
-
-        db.execute(f"""
-            DELETE FROM video_stats
-            WHERE {where}
-              AND id NOT IN (
-                  SELECT MIN(id)
-                  FROM video_stats
-                  WHERE {where}
-                  GROUP BY {window_expr}
-              )
-        """, params + params)
-
-    # ── 私有方法 ──
+        marks = dict(db.execute("SELECT width, done_ts FROM retention WHERE video_id = ?", (vid,)).fetchall())
+        floor = None
+        for age, width in reversed(cls._RETENTION_TIERS):
+            cutoff = (now - age) // width * width
+            start = marks.get(width)
+            if start is None:
+                start = cls._first_ts(db, vid)
+                if start is None:
+                    return False  # 没有数据
+                start -= start % width
+            if floor is not None:
+                start = max(start, floor)
+            floor = start
+            if start >= cutoff:
+                continue
+            hi = min(cutoff, _month_start(_next_month(_month_of(start))))
+            (months, cond, params), = cls._raw_sources(db, start, hi - 1)
+            tables = cls._raw_tables(db, months)
+            end = hi
+            if tables:
+                src = _union_from(tables)
+                nxt = db.execute(
+                    f"SELECT ts FROM {src} WHERE video_id = ?{cond} ORDER BY ts LIMIT 1 OFFSET ?",
+                    (vid, *params, cls._CLEANUP_CHUNK),
+                ).fetchone()
+                if nxt is not None:
+                    end = min(max(nxt[0] // width * width, start + width), hi)
+                for table in tables:
+                    db.execute(f"""
+                        DELETE FROM {table}
+                        WHERE video_id = ? AND ts >= ? AND ts < ?
+                          AND ts NOT IN (
+                              SELECT MIN(ts) FROM {src}
+                              WHERE video_id = ? AND ts >= ? AND ts < ?
+                              GROUP BY ts / {width}
+                          )
+                    """, (vid, start, end) * 2)
+            db.execute(
+                "INSERT OR REPLACE INTO retention (video_id, width, done_ts) VALUES (?, ?, ?)",
+                (vid, width, end),
+            )
+            return True
+        return False
 
     @classmethod
-    def _load_meta(cls, filepath: Path) -> dict:
-        if not filepath.exists():
-            return {}
-        with open(filepath, "r", encoding="utf-8") as f:
-            return json.load(f)
+    def _first_ts(cls, db: _Connection, vid: int) -> int | None:
+        """视频最早一条原始数据的时间，没有数据时返回 None"""
+        for months, cond, params in cls._raw_sources(db, None, None):
+            src = cls._raw_from(db, months)
+            if src is not None:
+                ts = db.execute(
+                    f"SELECT MIN(ts) FROM {src} WHERE video_id = ?{cond}", (vid, *params)
+                ).fetchone()[0]
+                if ts is not None:
+                    return ts
+        return None
 
     @classmethod
-    def _save_meta(cls, filepath: Path, data: dict):
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+    def vacuum_step(cls) -> bool:
+        """归还一批空闲页给文件系统（incremental_vacuum），返回 True 表示主库与各分区都已无空闲页
+
+        依次处理主库与各分区文件（原始数据所在），每步只处理一个库的至多 _VACUUM_PAGES 页。
+        只对 auto_vacuum=INCREMENTAL 的库生效（新建的主库与分区默认如此；旧库需离线执行一次
+        `PRAGMA auto_vacuum=INCREMENTAL; VACUUM;` 后才支持，未转换的分区在整月删除时才归还空间）。
+        """
+        db = _get_write_db()
+        with cls._lock:
+            if cls._vacuum_queue is None:
+                cls._vacuum_queue = ["main", *(f"p{m}" for m in _partition_months())]
+            while cls._vacuum_queue:
+                schema = cls._vacuum_queue[0]
+                if schema == "main" or _attach(db, [int(schema[1:])]):
+                    if db.execute(f"PRAGMA {schema}.auto_vacuum").fetchone()[0] == 2 \
+                            and db.execute(f"PRAGMA {schema}.freelist_count").fetchone()[0]:
+                        # execute 只执行一步（只归还一页），executescript 才会执行到结束
+                        db.executescript(f"PRAGMA {schema}.incremental_vacuum({cls._VACUUM_PAGES});")
+                        if db.execute(f"PRAGMA {schema}.freelist_count").fetchone()[0]:
+                            return False
+                cls._vacuum_queue.pop(0)
+            cls._vacuum_queue = None
+            return True
@@ -0,0 +1,129 @@
+"""告警基准 - 单条数据的规则评估耗时随规则数的变化
+
+用法: python benchmarks/alerts.py [视频数] [每个视频的数据条数]
+
+为每个视频生成每 30 秒一条、带随机增长的数据，在规则数从 0 到 10 万的告警引擎上依次评估，
+统计平均每条数据的耗时与触发数。“评估”列把触发换成只计数，为查找待触发规则本身的耗时；
+“含触发”列另含生成告警、写入最近告警列表的耗时，随触发数增长。规则随机分布在各指标、各窗口（含累计值）上，
+5% 作用于所有视频，其余针对单个视频；阈值大多高于数据实际达到的水平，触发只占少数。
+
+“键数”列为平均每条数据涉及的 (指标, 窗口) 数（至多 7 个指标 × 7 个窗口 = 49），
+“离开区间”列为平均每条数据中水位离开原阈值区间、需要二分查找规则的次数；
+评估耗时主要由这两者与触发数决定，而不是规则总数。
+
+作为对照，“逐条检查”列为每条数据遍历全部规则、只比较阈值（不维护窗口）的耗时，
+即不建索引时评估代价的下限。
+"""
+
+import logging
+import random
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.alerts import AlertEngine, Rule  # noqa: E402
+from app.bilibili import VideoStat  # noqa: E402
+from app.leaderboard import WINDOWS  # noqa: E402
+
+VIDEOS = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+SAMPLES = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+RULE_COUNTS = (0, 10, 100, 1_000, 10_000, 100_000)
+METRICS = ("view", "like", "coin", "favorite", "share", "danmaku", "reply")
+INTERVAL = 30
+
+
+def build_samples() -> list[VideoStat]:
+    """生成测试数据：各视频轮流采集，按时间排序"""
+    rng = random.Random(42)
+    t_start = int(time.time()) - SAMPLES * INTERVAL
+    views = [rng.randint(1_000, 5_000_000) for _ in range(VIDEOS)]
+    rates = [rng.choice((0, 1, 10, 100, 1000)) for _ in range(VIDEOS)]
+    samples = []
+    for i in range(SAMPLES):
+        ts = datetime.fromtimestamp(t_start + i * INTERVAL).strftime("%Y-%m-%d %H:%M:%S")
+        for n in range(VIDEOS):
+            views[n] += rng.randint(0, rates[n] * 2 * INTERVAL)
+            v = views[n]
+            samples.append(VideoStat(f"BV{n}", v, v // 20, v // 80, v // 40,
+                                     v // 200, v // 100, v // 150, ts))
+    return samples
+
+
+def build_rules(count: int) -> list[Rule]:
+    """随机规则：累计值阈值取 10 万 ~ 1 亿，窗口增量阈值取 1000 ~ 100 万（对数均匀）"""
+    rng = random.Random(count)
+    windows = (0, *WINDOWS.values())
+    rules = []
+    for i in range(count):
+        window = rng.choice(windows)
+        threshold = int(10 ** rng.uniform(3, 6) if window else 10 ** rng.uniform(5, 8))
+        bvid = None if rng.random() < 0.05 else f"BV{rng.randrange(VIDEOS)}"
+        rules.append(Rule(i + 1, bvid, rng.choice(METRICS), window, threshold))
+    return rules
+
+
+class CountingEngine(AlertEngine):
+    """触发时只计数的告警引擎，用于单独测量评估耗时"""
+
+    keys = 0
+    exits = 0
+
+    def _fire(self, rule, stat, ts, level):
+        self.fired += 1
+
+    def _video_keys(self, bvid):
+        keys = super()._video_keys(bvid)
+        self.keys += len(keys)
+        return keys
+
+    def _gap(self, bvid, key, level):
+        self.exits += 1
+        return super()._gap(bvid, key, level)
+
+
+def run(engine_cls, rules: list[Rule], samples: list[VideoStat]) -> tuple[float, AlertEngine]:
+    """依次评估全部数据，返回 (每条耗时秒数, 引擎)"""
+    engine = engine_cls()
+    for rule in rules:
+        engine.add(rule)
+    t = time.perf_counter()
+    for stat in samples:
+        engine.observe(stat)
+    return (time.perf_counter() - t) / len(samples), engine
+
+
+def scan(rules: list[Rule], samples: list[VideoStat]) -> float:
+    """对照：每条数据遍历全部规则比较阈值，返回总耗时（秒）"""
+    t = time.perf_counter()
+    for stat in samples:
+        for rule in rules:
+            if (rule.bvid is None or rule.bvid == stat.bvid) \
+                    and getattr(stat, rule.metric) >= rule.threshold:
+                pass
+    return time.perf_counter() - t
+
+
+def main():
+    logging.getLogger("app.alerts").setLevel(logging.ERROR)  # 触发的告警不输出日志
+    samples = build_samples()
+    print(f"{VIDEOS} 个视频 × {SAMPLES} 条，共 {len(samples):,} 条数据")
+    print(f"{'规则数':>8}{'评估':>10}{'含触发':>10}{'触发数':>10}{'键数':>8}{'离开区间':>8}"
+          f"{'逐条检查':>10}")
+    for count in RULE_COUNTS:
+        rules = build_rules(count)
+        evaluate, counting = run(CountingEngine, rules, samples)
+        total, engine = run(AlertEngine, rules, samples)
+        # 视频的 keys 只在规则增删后重新计算一次，这里按视频数平均
+        keys = counting.keys / VIDEOS
+        exits = counting.exits / len(samples)
+        # 逐条检查耗时与规则数成正比，只取前 200 条数据估算
+        scanned = scan(rules, samples[:200]) / 200 if rules else 0.0
+        print(f"{count:>10,}{evaluate * 1e6:>10.1f}µs{total * 1e6:>10.1f}µs{engine.fired:>11,}"
+              f"{keys:>10.1f}{exits:>12.1f}{scanned * 1e6:>10.1f}µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""归档基准 - 比较冷数据以 SQLite 行存放与归档数据块存放的体积和编解码耗时
+
+用法: python benchmarks/archive.py [视频数] [月数]
+
+为每个视频生成按小时一条（与 > 90 天的保留策略一致）、带随机增长的数据，分别：
+
+- 写入 WITHOUT ROWID 的 stats 表（与分区文件结构相同），统计数据库文件大小
+- 每个视频每个月编码为一个数据块，写入 archive 表，统计数据库文件大小
+- 编码 / 解码全部数据块的耗时
+"""
+
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import archive  # noqa: E402
+from app.store import _STATS_DDL, _STATS_INSERT  # noqa: E402
+
+VIDEOS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+MONTHS = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+HOURS = 730  # 每月约 730 小时
+
+
+def build_months() -> list[list[tuple]]:
+    """生成测试数据：每个视频每个月一组按时间排序的 (ts, view, like, ...) 行"""
+    rng = random.Random(42)
+    t_start = int(time.time()) - MONTHS * HOURS * 3600
+    blocks = []
+    for _ in range(VIDEOS):
+        view = rng.randint(1_000, 5_000_000)
+        rate = rng.choice((0, 1, 5, 30, 200))  # 每小时平均播放增量，0 为已不再增长
+        ts = t_start + rng.randint(0, 3599)
+        for _ in range(MONTHS):
+            rows = []
+            for _ in range(HOURS):
+                view += rng.randint(0, rate * 2) if rate else 0
+                rows.append((ts, view, view // 20, view // 80, view // 40,
+                             view // 200, view // 100, view // 150))
+                ts += 3600 + rng.randint(-2, 2)  # 采集时刻的抖动
+            blocks.append(rows)
+    return blocks
+
+
+def file_size(build) -> int:
+    """在临时文件中建库并写入数据，返回 VACUUM 后的文件大小"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.db"
+        conn = sqlite3.connect(path)
+        build(conn)
+        conn.commit()
+        conn.execute("VACUUM")
+        conn.close()
+        return path.stat().st_size
+
+
+def main():
+    blocks = build_months()
+    total = sum(len(b) for b in blocks)
+    print(f"{VIDEOS} 个视频 × {MONTHS} 个月，共 {total:,} 行")
+
+    def rows_db(conn):
+        conn.execute(_STATS_DDL.format(schema=""))
+        for i, rows in enumerate(blocks):
+            conn.executemany(
+                _STATS_INSERT.format(table="stats"), [(i // MONTHS, *r) for r in rows]
+            )
+
+    t = time.perf_counter()
+    encoded = [archive.encode(rows) for rows in blocks]
+    encode_s = time.perf_counter() - t
+    t = time.perf_counter()
+    for blob, rows in zip(encoded, blocks):
+        assert archive.decode(blob) == rows
+    decode_s = time.perf_counter() - t
+
+    def archive_db(conn):
+        conn.execute("CREATE TABLE archive (video_id INTEGER, month INTEGER, data BLOB, "
+                     "PRIMARY KEY (video_id, month))")
+        conn.executemany(
+            "INSERT INTO archive VALUES (?, ?, ?)",
+            [(i // MONTHS, i % MONTHS, blob) for i, blob in enumerate(encoded)],
+        )
+
+    raw_size = file_size(rows_db)
+    archive_size = file_size(archive_db)
+    print(f"{'存放方式':<10}{'文件大小':>12}{'每行字节':>10}")
+    print(f"{'SQLite 行':<10}{raw_size / 1024:>10.0f}KB{raw_size / total:>10.1f}")
+    print(f"{'归档数据块':<10}{archive_size / 1024:>10.0f}KB{archive_size / total:>10.1f}")
+    print(f"体积比 {archive_size / raw_size:.1%}")
+    print(f"编码 {encode_s * 1000:.0f} ms，解码 {decode_s * 1000:.0f} ms"
+          f"（每个视频月 {decode_s / len(blocks) * 1000:.2f} ms）")
+
+
+if __name__ == "__main__":
+    main()
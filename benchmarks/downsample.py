@@ -0,0 +1,107 @@
+"""降采样基准 - 比较 stride / minmax / lttb 的耗时与保真度
+
+用法: python benchmarks/downsample.py [行数] [目标点数]
+
+在内存数据库中生成一条带突增与瞬时尖峰的播放量曲线，
+分别用三种方法把同一时间范围降采样到目标点数，输出：
+
+- 耗时：DataStore._query_range 的单次查询耗时（取多次运行的最小值）
+- 平均误差 / 最大误差：降采样曲线线性插值后与原始曲线的偏差，占取值范围的百分比
+- 尖峰保留：注入的瞬时尖峰中，峰值点仍出现在结果里的个数
+"""
+
+import random
+import sqlite3
+import sys
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import downsample  # noqa: E402
+from app.store import DataStore, _Connection, _init_tables, _to_epoch  # noqa: E402
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+POINTS = int(sys.argv[2]) if len(sys.argv) > 2 else DataStore.MAX_POINTS
+INTERVAL = 60
+SPIKES = 20
+RUNS = 5
+
+
+def build_db() -> tuple[sqlite3.Connection, list[int], list[int], set[int]]:
+    """生成测试数据，返回 (连接, 时间列表, 播放量列表, 尖峰时间集合)
+
+    数据只写入内存库的 stats 表：关闭按月分区，查询不会读取 data/ 下的分区文件。
+    """
+    DataStore.PARTITIONED = False
+    rng = random.Random(42)
+    conn = sqlite3.connect(":memory:", factory=_Connection)
+    conn.row_factory = sqlite3.Row
+    _init_tables(conn)
+    conn.execute("INSERT INTO videos (id, bvid) VALUES (1, 'BVbench')")
+
+    t_start = int(time.time()) - ROWS * INTERVAL
+    ts = [t_start + i * INTERVAL for i in range(ROWS)]
+    views, v = [], 0
+    for _ in range(ROWS):
+        v += rng.randint(0, 5)
+        if rng.random() < 0.001:
+            v += rng.randint(2_000, 20_000)  # 突增（被推荐）
+        views.append(v)
+    # 瞬时尖峰：单个样本异常偏高，随后回落
+    spikes = set()
+    for i in rng.sample(range(1, ROWS - 1), SPIKES):
+        views[i] += 50_000
+        spikes.add(ts[i])
+
+    conn.executemany(
+        'INSERT INTO stats (video_id, ts, view, "like", coin, favorite, share, danmaku, reply) '
+        "VALUES (1, ?, ?, 0, 0, 0, 0, 0, 0)",
+        zip(ts, views),
+    )
+    conn.commit()
+    return conn, ts, views, spikes
+
+
+def fidelity(ts: list[int], views: list[int], picked: list[tuple[int, int]]) -> tuple[float, float]:
+    """降采样结果线性插值后相对原始曲线的 (平均误差, 最大误差)，单位为取值范围的百分比"""
+    pt = [p[0] for p in picked]
+    span = (max(views) - min(views)) or 1
+    total = worst = 0.0
+    for t, y in zip(ts, views):
+        j = bisect_left(pt, t)
+        if j < len(pt) and pt[j] == t:
+            est = picked[j][1]
+        elif j == 0:
+            est = picked[0][1]
+        elif j == len(pt):
+            est = picked[-1][1]
+        else:
+            (ta, ya), (tb, yb) = picked[j - 1], picked[j]
+            est = ya + (yb - ya) * (t - ta) / (tb - ta)
+        err = abs(est - y)
+        total += err
+        worst = max(worst, err)
+    return total / len(views) / span * 100, worst / span * 100
+
+
+def main():
+    conn, ts, views, spikes = build_db()
+    t0, t1 = ts[0], ts[-1]
+    print(f"原始 {ROWS} 行 → 目标 {POINTS} 点，注入尖峰 {SPIKES} 个\n")
+    print(f"{'方法':<8}{'耗时(ms)':>10}{'点数':>8}{'平均误差%':>12}{'最大误差%':>12}{'尖峰保留':>10}")
+    for method in downsample.METHODS:
+        best = float("inf")
+        for _ in range(RUNS):
+            start = time.perf_counter()
+            rows = DataStore._query_range(conn, 1, t0, t1, POINTS, method)
+            best = min(best, time.perf_counter() - start)
+        picked = [(_to_epoch(r["timestamp"]), r["view"]) for r in rows]
+        mean_err, max_err = fidelity(ts, views, picked)
+        kept = sum(1 for t, _ in picked if t in spikes)
+        print(f"{method:<8}{best * 1000:>10.1f}{len(rows):>8}{mean_err:>12.3f}{max_err:>12.2f}{kept:>7}/{SPIKES}")
+
+
+if __name__ == "__main__":
+    main()
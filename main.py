@@ -1,6 +1,7 @@
 """B站视频数据实时监控工具 - 主入口"""
 
 import argparse
+import os
 import setproctitle
 setproctitle.setproctitle("bv-monitor")
 
@@ -15,8 +16,17 @@ def start():
     parser = argparse.ArgumentParser(description="B站视频数据实时监控工具")
     parser.add_argument("-p", "--port", type=int, default=8000, help="监听端口 (默认: 8000)")
     parser.add_argument("--dev", action="store_true", help="开发模式（启用热重载，内存占用翻倍）")
+    parser.add_argument("--api-base", help="B 站接口地址（默认 https://api.bilibili.com，测试时可指向模拟服务器）")
+    parser.add_argument("--alert-webhook", help="告警 webhook 地址，触发告警时 POST JSON（默认只写日志）")
     args = parser.parse_args()
-    uvicorn.run("main:app", host="127.0.0.1", port=args.port, reload=args.dev)
+    # 经环境变量传递，热重载的子进程同样生效
+    if args.api_base:
+        os.environ["BV_MONITOR_API_BASE"] = args.api_base
+    if args.alert_webhook:
+        os.environ["BV_MONITOR_ALERT_WEBHOOK"] = args.alert_webhook
+    # 实时推送（SSE）为长连接，限定优雅退出等待时间，避免关闭服务时一直挂起
+    uvicorn.run("main:app", host="127.0.0.1", port=args.port, reload=args.dev,
+                timeout_graceful_shutdown=3)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,86 @@
+"""模拟 B 站视频接口 - 本地测试采集、重试与熔断
+
+用法:
+    python scripts/fake_bilibili.py [--port 9100] [--latency 50] [--error-rate 0.1] [--rate-limit-rate 0.05]
+    python main.py --api-base http://127.0.0.1:9100
+
+提供 /x/web-interface/view?bvid=...，返回与真实接口相同结构的数据：
+- 统计数据随时间增长，每个 BV 号的基数与增速由 BV 号决定
+- 以 BVnotfound 开头的 BV 号返回 -404（视频不存在）
+- 按比例随机返回 HTTP 503 或 -412（风控），可选固定延迟
+- POST /_control 可在运行中调整参数，如 {"error_rate": 1.0} 模拟上游故障
+"""
+
+import argparse
+import asyncio
+import random
+import time
+import zlib
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+app = FastAPI(title="fake bilibili")
+settings = {"latency": 0.0, "error_rate": 0.0, "rate_limit_rate": 0.0}
+started = time.time()
+
+
+@app.get("/x/web-interface/view")
+async def view(bvid: str):
+    if settings["latency"]:
+        await asyncio.sleep(settings["latency"] / 1000)
+    r = random.random()
+    if r < settings["error_rate"]:
+        return JSONResponse(status_code=503, content={"code": -503, "message": "服务暂不可用"})
+    if r < settings["error_rate"] + settings["rate_limit_rate"]:
+        return {"code": -412, "message": "请求被拦截"}
+    if bvid.startswith("BVnotfound"):
+        return {"code": -404, "message": "啥都木有"}
+
+    seed = zlib.crc32(bvid.encode())
+    elapsed = time.time() - started
+    view_count = seed % 100_000 + int(elapsed * (1 + seed % 50) / 10)
+    return {
+        "code": 0,
+        "message": "0",
+        "data": {
+            "bvid": bvid,
+            "title": f"测试视频 {bvid}",
+            "pic": "http://i0.hdslb.com/bfs/archive/placeholder.jpg",
+            "desc": "本地模拟数据",
+            "owner": {"name": "模拟UP主"},
+            "stat": {
+                "view": view_count,
+                "like": view_count // 20,
+                "coin": view_count // 80,
+                "favorite": view_count // 40,
+                "share": view_count // 200,
+                "danmaku": view_count // 100,
+                "reply": view_count // 150,
+            },
+        },
+    }
+
+
+@app.post("/_control")
+async def control(patch: dict):
+    """运行中调整模拟参数"""
+    settings.update({k: float(v) for k, v in patch.items() if k in settings})
+    return settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模拟 B 站视频接口")
+    parser.add_argument("-p", "--port", type=int, default=9100, help="监听端口 (默认: 9100)")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的固定延迟（毫秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 HTTP 503 的比例")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="返回 -412 的比例")
+    args = parser.parse_args()
+    settings.update(latency=args.latency, error_rate=args.error_rate,
+                    rate_limit_rate=args.rate_limit_rate)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+"""测试公共夹具"""
+
+import pytest
+
+from app import ringbuf, store
+from app.store import DataStore
+
+
+@pytest.fixture
+def datastore(tmp_path, monkeypatch) -> type[DataStore]:
+    """数据目录指向临时目录的 DataStore（全新的库、进程内状态与热数据缓存）"""
+    monkeypatch.setattr(store, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(store, "_DB_PATH", tmp_path / "stats.db")
+    monkeypatch.setattr(store, "_retired", set())
+    monkeypatch.setattr(ringbuf, "hot", ringbuf.HotCache())
+    for name, value in (
+        ("_video_ids", {}), ("_legacy_pending", None), ("_rollups_ready", None),
+        ("_partitioned", False), ("_hot_queue", None), ("_vacuum_queue", None),
+        ("_cleanup_pass", None),
+    ):
+        monkeypatch.setattr(DataStore, name, value)
+    store.close_db()
+    yield DataStore
+    store.close_db()
@@ -0,0 +1,49 @@
+"""归档数据块编解码：差分 + zigzag + varint + zlib"""
+
+import zlib
+
+import pytest
+
+from app import archive
+
+
+def test_round_trip():
+    rows = [(1_760_000_000 + i * 30, 1000 + i * 7, 50 + i, 3, 2, 1, 0, 9) for i in range(500)]
+    assert archive.decode(archive.encode(rows)) == rows
+
+
+def test_negative_deltas_and_large_values():
+    # 计数回落（删评、取消点赞）、跨多个 varint 字节的大数与 0 交替
+    rows = [
+        (1_760_000_000, 2**40, 100, 0, 5, 0, 0, 7),
+        (1_760_000_030, 2**40 - 1, 90, 2**31, 4, 0, 0, 0),
+        (1_760_000_060, 3, 200, 0, 5, 1, 0, 2**20),
+        (1_760_000_090, 2**40, 0, 1, 0, 0, 0, 0),
+    ]
+    assert archive.decode(archive.encode(rows)) == rows
+
+
+def test_single_sample():
+    rows = [(1_760_000_000, 12345, 67, 8, 9, 1, 2, 3)]
+    assert archive.decode(archive.encode(rows)) == rows
+
+
+def test_empty():
+    assert archive.decode(archive.encode([])) == []
+
+
+def test_corrupted_block():
+    blob = archive.encode([(1_760_000_000, 1, 2, 3, 4, 5, 6, 7)])
+    with pytest.raises(ValueError):
+        archive.decode(blob[:-3])
+    # 解压成功但少了一个值
+    data = zlib.decompress(blob)
+    with pytest.raises(ValueError):
+        archive.decode(zlib.compress(data[:-1]))
+
+
+def test_unknown_version():
+    data = bytearray(zlib.decompress(archive.encode([(1, 2)])))
+    data[0] = archive.VERSION + 1
+    with pytest.raises(ValueError):
+        archive.decode(zlib.compress(bytes(data)))
@@ -0,0 +1,111 @@
+"""熔断器：打开、半开探测、探测请求异常或被取消时释放名额"""
+
+import asyncio
+
+import pytest
+
+from app import bilibili
+from app.bilibili import CircuitBreaker, CircuitOpen, UpstreamError
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(bilibili.time, "monotonic", clock)
+    return clock
+
+
+def tripped(min_calls: int = 4, cooldown: float = 10.0) -> CircuitBreaker:
+    breaker = CircuitBreaker(min_calls=min_calls, cooldown=cooldown, max_cooldown=40.0)
+    for _ in range(min_calls):
+        breaker.before_call()
+        breaker.record(False)
+    assert breaker.state == "open"
+    return breaker
+
+
+def test_open_rejects_until_cooldown(clock):
+    breaker = tripped()
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+    clock.now += 10
+    breaker.before_call()
+    assert breaker.state == "half_open"
+
+
+def test_half_open_allows_single_probe(clock):
+    breaker = tripped()
+    clock.now += 10
+    breaker.before_call()
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()  # 探测结果出来之前不放行第二个请求
+    breaker.record(True)
+    assert breaker.state == "closed"
+    breaker.before_call()
+
+
+def test_failed_probe_reopens_with_longer_cooldown(clock):
+    breaker = tripped()
+    clock.now += 10
+    breaker.before_call()
+    breaker.record(False)
+    assert breaker.state == "open" and breaker.trips == 2
+    clock.now += 10
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+    clock.now += 10
+    breaker.before_call()
+    assert breaker.state == "half_open"
+
+
+def test_release_frees_probe(clock):
+    breaker = tripped()
+    clock.now += 10
+    breaker.before_call()
+    breaker.release()
+    breaker.before_call()  # 未得出结果的探测不占着名额
+
+
+@pytest.fixture
+def probing(monkeypatch, clock) -> CircuitBreaker:
+    """替换全局熔断器为已到半开状态的熔断器，请求不重试"""
+    breaker = tripped()
+    clock.now += 10
+    monkeypatch.setattr(bilibili, "breaker", breaker)
+    monkeypatch.setattr(bilibili, "RETRIES", 0)
+    return breaker
+
+
+def test_unexpected_error_in_probe_reopens(monkeypatch, probing):
+    async def broken(bvid):
+        raise KeyError("data")
+
+    monkeypatch.setattr(bilibili, "_get_view", broken)
+    with pytest.raises(UpstreamError):
+        asyncio.run(bilibili._request_view("BV1"))
+    assert probing.state == "open"
+
+
+def test_cancelled_probe_releases_slot(monkeypatch, probing):
+    async def hang(bvid):
+        await asyncio.sleep(3600)
+
+    async def main():
+        task = asyncio.create_task(bilibili._request_view("BV1"))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    monkeypatch.setattr(bilibili, "_get_view", hang)
+    asyncio.run(main())
+    assert probing.state == "half_open"
+    probing.before_call()
@@ -0,0 +1,43 @@
+"""降采样算法：稀疏 / 有大段空白的数据"""
+
+from operator import itemgetter
+
+import pytest
+
+from app import downsample
+
+DAY = 86400
+NOW = 1_760_000_000
+
+
+def gappy_rows() -> list[tuple[int, int]]:
+    """一年前的 300 条 + 最近一天的 300 条 (ts, view)，中间没有数据"""
+    old = [(NOW - 365 * DAY + i * 60, i) for i in range(300)]
+    recent = [(NOW - DAY + i * 288, 1000 + i) for i in range(300)]
+    return old + recent
+
+
+@pytest.mark.parametrize("engine", [downsample.lttb, downsample.minmax])
+def test_rows_within_budget_returned_unchanged(engine):
+    rows = gappy_rows()
+    assert engine(rows, 1000, NOW, itemgetter(0), itemgetter(1)) == rows
+
+
+@pytest.mark.parametrize("engine", [downsample.lttb, downsample.minmax])
+def test_accepts_iterator_within_budget(engine):
+    rows = gappy_rows()
+    assert engine(iter(rows), len(rows), NOW, itemgetter(0), itemgetter(1)) == rows
+
+
+@pytest.mark.parametrize("engine", [downsample.lttb, downsample.minmax])
+def test_empty(engine):
+    assert engine([], 1000, NOW, itemgetter(0), itemgetter(1)) == []
+
+
+@pytest.mark.parametrize("engine", [downsample.lttb, downsample.minmax])
+def test_reduces_when_over_budget(engine):
+    rows = gappy_rows()
+    picked = engine(rows, 100, NOW, itemgetter(0), itemgetter(1))
+    assert picked[0] == rows[0] and picked[-1] == rows[-1]
+    assert len(picked) <= 100
+    assert picked == sorted(picked)
@@ -0,0 +1,62 @@
+"""热数据缓存：环形缓冲的覆盖与扩容、按最近查询淘汰（LRU）"""
+
+from app import ringbuf
+from app.ringbuf import HotCache, Ring
+
+NOW = 1_760_000_000
+
+
+def rows(start: int, count: int, step: int = 30) -> list[tuple]:
+    return [(start + i * step, i, 0, 0, 0, 0, 0, 0) for i in range(count)]
+
+
+def test_ring_overwrites_oldest_outside_hot_window():
+    # 每行间隔一小时：写满时最旧的一行已超出 HOT_SECONDS，覆盖而不扩容
+    data = rows(NOW, ringbuf.MIN_ROWS, step=3600)
+    ring = Ring(data, NOW, None)
+    extra = (NOW + ringbuf.MIN_ROWS * 3600, 99, 0, 0, 0, 0, 0, 0)
+    assert ring.append(extra) == 0
+    assert ring.cap == ringbuf.MIN_ROWS
+    assert ring.covered == data[0][0] + 1
+    assert ring.select(0, None) == data[1:] + [extra]
+
+
+def test_ring_grows_within_hot_window():
+    data = rows(NOW, ringbuf.MIN_ROWS)
+    ring = Ring(data, NOW, None)
+    extra = (NOW + ringbuf.MIN_ROWS * 30, 99, 0, 0, 0, 0, 0, 0)
+    assert ring.append(extra) == ringbuf.MIN_ROWS * ringbuf.WIDTH * 8
+    assert ring.cap == ringbuf.MIN_ROWS * 2
+    assert ring.select(0, None) == data + [extra]
+
+
+def test_ring_rejects_late_sample():
+    ring = Ring(rows(NOW, 3), NOW, None)
+    assert ring.append((NOW - 1, 0, 0, 0, 0, 0, 0, 0)) is None
+
+
+def test_lru_evicts_least_recently_queried():
+    size = Ring([], 0, None).nbytes
+    cache = HotCache(max_bytes=2 * size)
+    cache.load(1, rows(NOW, 10), NOW, None)
+    cache.load(2, rows(NOW, 10), NOW, None)
+    assert cache.range(1, NOW, None) is not None  # 1 最近被查询，2 最久未查询
+    cache.load(3, rows(NOW, 10), NOW, None)
+    assert 1 in cache and 3 in cache and 2 not in cache
+    assert cache.evictions == 1
+    assert cache.nbytes == 2 * size
+
+
+def test_lru_keeps_just_loaded_video():
+    size = Ring([], 0, None).nbytes
+    cache = HotCache(max_bytes=size)
+    cache.load(1, rows(NOW, 10), NOW, None)
+    cache.load(2, rows(NOW, 10), NOW, None)
+    assert 2 in cache and 1 not in cache
+
+
+def test_query_before_covered_misses():
+    cache = HotCache()
+    cache.load(1, rows(NOW, 10), NOW, None)
+    assert cache.range(1, NOW - 1, None) is None
+    assert cache.range(1, NOW, NOW + 60) == (rows(NOW, 3), [])
@@ -0,0 +1,76 @@
+"""跳过未变化的样本：写入的行数减少，读取时还原出与逐条写入相同的序列"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.bilibili import VideoStat
+
+START = datetime(2025, 10, 1, 12, 0, 0)
+
+
+def stat(i: int, view: int, like: int = 0) -> VideoStat:
+    ts = (START + timedelta(seconds=30 * i)).strftime("%Y-%m-%d %H:%M:%S")
+    return VideoStat("BV1", view, like, 0, 0, 0, 0, 0, ts)
+
+
+def series(result: list[dict]) -> list[tuple[str, int, int]]:
+    return [(r["timestamp"], r["view"], r["like"]) for r in result]
+
+
+def expected(stats: list[VideoStat], keep: list[int]) -> list[tuple[str, int, int]]:
+    return [(stats[i].timestamp, stats[i].view, stats[i].like) for i in keep]
+
+
+@pytest.fixture
+def store(datastore, monkeypatch):
+    monkeypatch.setattr(datastore, "SKIP_UNCHANGED", True)
+    monkeypatch.setattr(datastore, "written_samples", 0)
+    monkeypatch.setattr(datastore, "skipped_samples", 0)
+    return datastore
+
+
+def test_run_keeps_start_and_end(store):
+    # 10,10,10,10,20：只写入游程起点、终点（变化时补写）与新值
+    stats = [stat(0, 10), stat(1, 10), stat(2, 10), stat(3, 10), stat(4, 20)]
+    store.save_stats(stats)
+    # 游程终点先被跳过，数据变化时才补写
+    assert store.written_samples == 3 and store.skipped_samples == 3
+    assert series(store.get_stats("BV1")) == expected(stats, [0, 3, 4])
+
+
+def test_unwritten_tail_is_appended(store):
+    # 游程尚未结束：最后一条只在 latest_stats 中，读取时补在末尾
+    stats = [stat(0, 10), stat(1, 11), stat(2, 11), stat(3, 11)]
+    for s in stats:
+        store.save_stat(s)
+    assert store.written_samples == 2
+    assert series(store.get_stats("BV1")) == expected(stats, [0, 1, 3])
+    assert series(store.get_stats("BV1", limit=2)) == expected(stats, [1, 3])
+    assert series(store.get_stats_since("BV1", stats[1].timestamp)) == expected(stats, [3])
+    ranged = store.get_stats_ranged("BV1", start=stats[0].timestamp, end=stats[3].timestamp)
+    assert series(ranged) == expected(stats, [0, 1, 3])
+    assert store.get_latest_stat("BV1")["timestamp"] == stats[3].timestamp
+
+
+def test_tail_outside_range_not_appended(store):
+    stats = [stat(0, 10), stat(1, 10), stat(2, 10)]
+    store.save_stats(stats)
+    ranged = store.get_stats_ranged("BV1", start=stats[0].timestamp, end=stats[1].timestamp)
+    assert series(ranged) == expected(stats, [0])
+
+
+def test_heartbeat_written(store, monkeypatch):
+    monkeypatch.setattr(store, "HEARTBEAT", 60)
+    stats = [stat(i, 10) for i in range(5)]
+    store.save_stats(stats)
+    # 距上次写入满 60 秒（两个间隔）时照常写入一条
+    assert store.written_samples == 3
+    assert series(store.get_stats("BV1")) == expected(stats, [0, 2, 4])
+
+
+def test_any_metric_change_is_written(store):
+    stats = [stat(0, 10), stat(1, 10, like=1), stat(2, 10, like=1)]
+    store.save_stats(stats)
+    assert series(store.get_stats("BV1")) == expected(stats, [0, 1, 2])
+    assert store.written_samples == 2